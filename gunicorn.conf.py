@@ -3,6 +3,9 @@ Configuração do Gunicorn com log de acesso incluindo tempo de resposta.
 
 O formato de log inclui o tempo em segundos no final (ex: 0.234).
 Para usar: gunicorn trader_portal.wsgi:application -c gunicorn.conf.py
+Com o push do Painel SMC (SSE em /macro/stream/, MACRO_SSE_ENABLED=true), sirva o ASGI:
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn trader_portal.asgi:application
+-c gunicorn.conf.py (workers sync ficariam presos a cada conexão aberta).
 """
 
 import os
@@ -10,7 +13,7 @@ import os
 # Bind
 bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
 workers = int(os.environ.get("GUNICORN_WORKERS", 2))
-worker_class = "sync"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
 threads = int(os.environ.get("GUNICORN_THREADS", 1))
 
 # Log: inclui tempo de resposta em microsegundos no final (ex: 234000 = 234ms)
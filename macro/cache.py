@@ -0,0 +1,216 @@
+"""
+Cache das APIs JSON do painel (/macro/scores/ e /macro/variations/; CACHES["default"]).
+
+Os dados só mudam quando um ciclo de coleta (ou a retenção) grava no banco, então há uma
+única versão global: o instante (ns) da última gravação. publish_cycle() troca a versão no
+fim de execute_cycle e já monta os payloads que os painéis pedem; os demais são montados
+na primeira requisição. A versão também é o ETag/Last-Modified das respostas, então o
+polling dos painéis costuma terminar em 304 com uma única leitura no cache.
+
+Linhas em cache por (versão, endpoint, limit, balde de since): since é arredondado para
+baixo no intervalo de coleta e o corte exato é feito em Python. Como os resultados vêm em
+ordem decrescente de measurement_time, as linhas >= since são um prefixo das linhas do
+balde, e o resultado é idêntico ao da consulta exata.
+
+Formatos (?format=): "rows" (padrão, uma lista de objetos) ou "columnar": os ativos e os
+textos repetidos (status, block_reason, market_phase) vão uma vez em dicionários, e as
+linhas viram arrays paralelos com measurement_time em segundos Unix. Com orjson
+instalado a serialização usa ele; sem ele, cai no json da stdlib.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import UTC, datetime
+from typing import Callable, List, Optional
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from macro.models import MacroScore, MacroVariation
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, json da stdlib
+    orjson = None
+from macro.services import config
+from macro.services.utils import align_measurement_time
+
+VERSION_KEY = "macro:api:version"
+FORMATS = ("rows", "columnar")
+
+# (endpoint, limit, formato) pedidos pelos painéis (painel_smc*.html) e defaults das views
+PREWARM = (
+    ("scores", 40, "columnar"),
+    ("variations", 200, "columnar"),
+    ("scores", 100, "rows"),
+    ("variations", 200, "rows"),
+)
+
+
+def _timeout() -> int:
+    return config.API_CACHE_TIMEOUT
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Versão despejada do cache: recomeça em "agora" (clientes revalidam uma vez)
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version() -> int:
+    version = time.time_ns()
+    cache.set(VERSION_KEY, version, timeout=None)
+    return version
+
+
+def last_modified() -> datetime:
+    return datetime.fromtimestamp(get_version() / 1e9, tz=UTC)
+
+
+def normalize_since(since: Optional[datetime]) -> Optional[datetime]:
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def _since_bucket(since: Optional[datetime]) -> Optional[datetime]:
+    return align_measurement_time(since, config.TARGET_INTERVAL_MINUTES) if since else None
+
+
+def _params_key(name: str, limit: int, since: Optional[datetime], fmt: str) -> str:
+    return f"{name}:{fmt}:{limit}:{since.isoformat() if since else ''}"
+
+
+def etag(name: str, limit: int, since: Optional[datetime], fmt: str = "rows") -> str:
+    raw = f"{get_version()}:{_params_key(name, limit, since, fmt)}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def encode(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def _score_rows(limit: int, since: Optional[datetime]) -> List[dict]:
+    qs = MacroScore.objects.order_by("-measurement_time")
+    if since:
+        qs = qs.filter(measurement_time__gte=since)
+    return list(qs.values("measurement_time", "total_score", "variation_sum")[:limit])
+
+
+def _variation_rows(limit: int, since: Optional[datetime]) -> List[dict]:
+    qs = MacroVariation.objects.order_by("-measurement_time")
+    if since:
+        qs = qs.filter(measurement_time__gte=since)
+    rows = qs.values(
+        "asset__name",
+        "asset__category",
+        "asset__source_key",
+        "measurement_time",
+        "variation_text",
+        "variation_decimal",
+        "status",
+        "block_reason",
+        "market_phase",
+    )[:limit]
+    return [
+        {
+            "asset": row.pop("asset__name"),
+            "category": row.pop("asset__category"),
+            "source_key": row.pop("asset__source_key"),
+            **row,
+        }
+        for row in rows
+    ]
+
+
+ROW_BUILDERS: dict[str, Callable[[int, Optional[datetime]], List[dict]]] = {
+    "scores": _score_rows,
+    "variations": _variation_rows,
+}
+
+
+def _rows(version: int, name: str, limit: int, since: Optional[datetime]) -> List[dict]:
+    bucket = _since_bucket(since)
+    key = f"macro:api:{version}:{name}:rows:{limit}:{bucket.isoformat() if bucket else ''}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = ROW_BUILDERS[name](limit, bucket)
+        cache.set(key, rows, _timeout())
+    if since is None:
+        return rows
+    cut = next((i for i, row in enumerate(rows) if row["measurement_time"] < since), len(rows))
+    return rows[:cut]
+
+
+def _dictionary(values: List) -> dict:
+    """Codificação por dicionário: valores distintos uma vez + índice por linha."""
+    positions: dict = {}
+    index = [positions.setdefault(value, len(positions)) for value in values]
+    return {"values": list(positions), "index": index}
+
+
+def _epoch(rows: List[dict]) -> List[int]:
+    return [int(row["measurement_time"].timestamp()) for row in rows]
+
+
+def _columnar_scores(rows: List[dict]) -> dict:
+    return {
+        "format": "columnar",
+        "count": len(rows),
+        "measurement_time": _epoch(rows),
+        "total_score": [row["total_score"] for row in rows],
+        "variation_sum": [row["variation_sum"] for row in rows],
+    }
+
+
+def _columnar_variations(rows: List[dict]) -> dict:
+    assets = _dictionary([(row["asset"], row["category"], row["source_key"]) for row in rows])
+    names, categories, sources = zip(*assets["values"]) if rows else ((), (), ())
+    return {
+        "format": "columnar",
+        "count": len(rows),
+        "assets": {"name": list(names), "category": list(categories), "source_key": list(sources)},
+        "asset": assets["index"],
+        "measurement_time": _epoch(rows),
+        "variation_text": [row["variation_text"] for row in rows],
+        "variation_decimal": [row["variation_decimal"] for row in rows],
+        "status": _dictionary([row["status"] for row in rows]),
+        "block_reason": _dictionary([row["block_reason"] for row in rows]),
+        "market_phase": _dictionary([row["market_phase"] for row in rows]),
+    }
+
+
+COLUMNAR_BUILDERS: dict[str, Callable[[List[dict]], dict]] = {
+    "scores": _columnar_scores,
+    "variations": _columnar_variations,
+}
+
+
+def payload(name: str, limit: int, since: Optional[datetime] = None, fmt: str = "rows") -> bytes:
+    """Corpo JSON em cache para a versão atual ({"results": [...]} ou colunar)."""
+    version = get_version()
+    key = f"macro:api:{version}:body:{_params_key(name, limit, since, fmt)}"
+    body = cache.get(key)
+    if body is None:
+        rows = _rows(version, name, limit, since)
+        data = COLUMNAR_BUILDERS[name](rows) if fmt == "columnar" else {"results": rows}
+        body = encode(data)
+        cache.set(key, body, _timeout())
+    return body
+
+
+def publish_cycle() -> int:
+    """Nova versão após gravar no banco, com os payloads dos painéis já montados."""
+    version = bump_version()
+    for name, limit, fmt in PREWARM:
+        payload(name, limit, fmt=fmt)
+    return version
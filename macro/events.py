@@ -0,0 +1,153 @@
+"""
+Canal de push do Painel SMC: Server-Sent Events em /macro/stream/ sobre Redis pub/sub.
+
+No fim de cada ciclo, execute_cycle publica um delta compacto no canal CHANNEL: o score
+novo e só as variações que mudaram em relação à última conhecida de cada ativo. O quadro
+SSE é montado uma vez no publicador, e cada conexão só repassa o texto recebido.
+
+O stream segura a conexão aberta, então só faz sentido com um servidor ASGI (ex.: gunicorn
+com worker uvicorn servindo trader_portal.asgi). Com MACRO_SSE_ENABLED desligado, ou sem
+Redis, /macro/stream/ responde 204 (o EventSource não reconecta) e o painel continua no
+polling de /macro/scores/ e /macro/variations/.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+from django.core.serializers.json import DjangoJSONEncoder
+
+from macro.models import MacroVariation
+from macro.services import config
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "macro:events"
+RETRY_MS = 5000
+HEARTBEAT_SECONDS = 15
+COMPARED_FIELDS = ("variation_text", "variation_decimal", "market_phase", "status")
+
+
+def enabled() -> bool:
+    return config.SSE_ENABLED and bool(config.EVENTS_REDIS_URL)
+
+
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(config.EVENTS_REDIS_URL)
+
+
+def _async_redis() -> aioredis.Redis:
+    return aioredis.Redis.from_url(config.EVENTS_REDIS_URL)
+
+
+def format_sse(data: str, event: str = "message", event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines())
+    return "\n".join(lines) + "\n\n"
+
+
+def changed_variations(
+    variations: List[MacroVariation], last_variations: Dict[int, dict]
+) -> List[MacroVariation]:
+    """Variações cujo texto/valor/fase/status difere da última conhecida do ativo."""
+    changed = []
+    for variation in variations:
+        previous = last_variations.get(variation.asset_id)
+        if previous is None or any(
+            previous[field] != getattr(variation, field) for field in COMPARED_FIELDS
+        ):
+            changed.append(variation)
+    return changed
+
+
+def _variation_row(variation: MacroVariation) -> dict:
+    # Mesmo formato das linhas de /macro/variations/
+    return {
+        "asset": variation.asset.name,
+        "category": variation.asset.category,
+        "source_key": variation.asset.source_key,
+        "measurement_time": variation.measurement_time,
+        "variation_text": variation.variation_text,
+        "variation_decimal": variation.variation_decimal,
+        "status": variation.status,
+        "block_reason": variation.block_reason,
+        "market_phase": variation.market_phase,
+    }
+
+
+def cycle_frame(
+    version: int,
+    measurement_time: datetime,
+    total_score: int,
+    variation_sum: float,
+    variations: List[MacroVariation],
+) -> str:
+    delta = {
+        "score": {
+            "measurement_time": measurement_time,
+            "total_score": total_score,
+            "variation_sum": variation_sum,
+        },
+        "variations": [_variation_row(variation) for variation in variations],
+    }
+    data = json.dumps(delta, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return format_sse(data, event="cycle", event_id=str(version))
+
+
+def publish_cycle(
+    version: int,
+    measurement_time: datetime,
+    total_score: int,
+    variation_sum: float,
+    variations: List[MacroVariation],
+    last_variations: Dict[int, dict],
+) -> bool:
+    """Publica o delta do ciclo; falha no Redis só gera aviso (o painel revalida depois)."""
+    if not enabled():
+        return False
+    changed = changed_variations(variations, last_variations)
+    frame = cycle_frame(version, measurement_time, total_score, variation_sum, changed)
+    try:
+        client = _redis()
+        try:
+            client.publish(CHANNEL, frame)
+        finally:
+            client.close()
+    except redis.RedisError as exc:
+        logger.warning("[macro] Falha ao publicar evento do ciclo: %s", exc)
+        return False
+    return True
+
+
+async def stream(max_seconds: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Quadros SSE do canal até max_seconds (config.SSE_MAX_SECONDS); depois fecha e o
+    navegador reconecta sozinho. Comentários ": ping" mantêm proxies com a conexão viva.
+    """
+    max_seconds = config.SSE_MAX_SECONDS if max_seconds is None else max_seconds
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    client = _async_redis()
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(CHANNEL)
+        yield f"retry: {RETRY_MS}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=min(HEARTBEAT_SECONDS, remaining)
+            )
+            if message is None:
+                yield ": ping\n\n"
+                continue
+            data = message["data"]
+            yield data.decode() if isinstance(data, bytes) else data
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
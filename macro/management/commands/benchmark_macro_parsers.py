@@ -0,0 +1,138 @@
+"""
+Mede o custo de parsing das páginas macro salvas (variação + trecho relevante), comparando
+o caminho antigo (duas árvores html.parser por ativo, variação achada percorrendo a árvore)
+com a ParsedPage (pré-scan + uma árvore compartilhada) em cada tree builder disponível.
+Uso: python manage.py benchmark_macro_parsers [--path=DIR_OU_ARQUIVO] [--iterations=N]
+Arquivos cujo nome começa com "tradingview" usam o parser do TradingView; os demais, o do
+Investing.
+"""
+
+from __future__ import annotations
+
+import pathlib
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand, CommandError
+
+from macro.services.parsers import (
+    ParsedPage,
+    _lxml_installed,
+    _normalize_percent_text,
+    _normalize_tradingview,
+    parse_investing_variation,
+    parse_tradingview_variation,
+)
+from macro.services.utils import extract_relevant_text
+
+DEFAULT_PATH = pathlib.Path(__file__).resolve().parents[2] / "fixtures" / "pages"
+
+
+def _legacy_investing(html: str):
+    """Parser de variação do Investing antes da ParsedPage (árvore html.parser própria)."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    def _has_premarket_class(classes: object) -> bool:
+        if not classes:
+            return False
+        class_list = classes if isinstance(classes, list) else str(classes).split()
+        return "notranslate" in class_list and "order-4" in class_list
+
+    candidate = next(
+        (
+            span
+            for span in soup.find_all("span", class_=_has_premarket_class)
+            if "%" in span.get_text()
+        ),
+        None,
+    )
+    if candidate is None:
+        candidate = soup.find("span", {"data-test": "instrument-price-change-percent"})
+        if candidate is None:
+            return None
+    return _normalize_percent_text(candidate.get_text(separator="", strip=True))
+
+
+def _legacy_tradingview(html: str):
+    """Parser de variação do TradingView antes da ParsedPage (árvore html.parser própria)."""
+    soup = BeautifulSoup(html, "html.parser")
+    ext_span = soup.find("span", class_="js-symbol-ext-hrs-change-pt")
+    if ext_span and ext_span.get_text(strip=True):
+        return f"EXT:{_normalize_tradingview(ext_span.get_text(strip=True))}"
+    reg_span = soup.find("span", class_="js-symbol-change-pt")
+    if reg_span and reg_span.get_text(strip=True):
+        return f"REG:{_normalize_tradingview(reg_span.get_text(strip=True))}"
+    return None
+
+
+LEGACY_PARSERS = {
+    parse_investing_variation: _legacy_investing,
+    parse_tradingview_variation: _legacy_tradingview,
+}
+
+
+def _legacy(html: str, parser) -> str:
+    """Caminho de antes: árvore do parser de variação + outra árvore para o trecho."""
+    variation = LEGACY_PARSERS[parser](html)
+    excerpt = extract_relevant_text(ParsedPage(html, "html.parser"))
+    return f"{variation} | {len(excerpt)}"
+
+
+def _shared(features: str):
+    def run(html: str, parser) -> str:
+        page = ParsedPage(html, features)
+        return f"{parser(page)} | {len(extract_relevant_text(page))}"
+
+    return run
+
+
+class Command(BaseCommand):
+    help = "Benchmark dos parsers macro (pré-scan + árvore única) sobre páginas salvas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            type=str,
+            default=str(DEFAULT_PATH),
+            help="Arquivo .html ou diretório com páginas salvas (padrão: macro/fixtures/pages).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Repetições por página e modo.",
+        )
+
+    def handle(self, *args, **options):
+        path = pathlib.Path(options["path"]).resolve()
+        if path.is_dir():
+            pages = sorted(path.glob("*.html"))
+        elif path.exists():
+            pages = [path]
+        else:
+            raise CommandError(f"Caminho não encontrado: {path}")
+        if not pages:
+            raise CommandError(f"Nenhuma página .html em {path}")
+        iterations = max(1, options["iterations"])
+
+        modes = [("antes (2x html.parser)", _legacy), ("html.parser", _shared("html.parser"))]
+        if _lxml_installed():
+            modes.append(("lxml", _shared("lxml")))
+        else:
+            self.stdout.write(self.style.WARNING("lxml não instalado: modo lxml omitido."))
+
+        for page_path in pages:
+            html = page_path.read_text(encoding="utf-8")
+            parser = (
+                parse_tradingview_variation
+                if page_path.name.startswith("tradingview")
+                else parse_investing_variation
+            )
+            self.stdout.write(f"\n{page_path.name} ({len(html.encode('utf-8')) / 1024:.1f} KB)")
+            for label, run in modes:
+                result = run(html, parser)
+                start = perf_counter()
+                for _ in range(iterations):
+                    run(html, parser)
+                elapsed_ms = (perf_counter() - start) * 1000 / iterations
+                self.stdout.write(f"  {label:<24} {elapsed_ms:8.2f} ms/página  [{result}]")
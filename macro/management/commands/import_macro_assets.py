@@ -3,7 +3,9 @@ import pathlib
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 
+from macro import cache as api_cache
 from macro.models import MacroAsset, SourceChoices
+from macro.services.scoring import recompute_scores
 
 
 class Command(BaseCommand):
@@ -21,6 +23,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Zera a tabela antes de importar.",
         )
+        parser.add_argument(
+            "--skip-recompute",
+            action="store_true",
+            help="Não refaz o histórico de MacroScore quando algum ValorBase mudar.",
+        )
 
     def handle(self, *args, **options):
         path = pathlib.Path(options["path"]).resolve()
@@ -38,6 +45,8 @@ class Command(BaseCommand):
 
         created = 0
         updated = 0
+        previous_bases = dict(MacroAsset.objects.values_list("name", "value_base"))
+        bases_changed = False
         for _, row in df.iterrows():
             name = str(row["Ativo"]).strip()
             value_base = float(row["ValorBase"])
@@ -65,9 +74,15 @@ class Command(BaseCommand):
                 created += 1
             else:
                 updated += 1
+                bases_changed |= previous_bases.get(name) != value_base
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"Importação concluída: {created} criados, {updated} atualizados (arquivo: {path})"
             )
         )
+        if bases_changed and not options["skip_recompute"]:
+            rescored = recompute_scores()
+            if rescored:
+                api_cache.publish_cycle()
+            self.stdout.write(f"ValorBase alterado: {rescored} MacroScore recalculados.")
@@ -0,0 +1,78 @@
+"""
+Refaz o histórico de MacroScore com os value_base atuais dos ativos (após mudar limiares).
+Uso: python manage.py recompute_macro_scores [--start=AAAA-MM-DD] [--end=AAAA-MM-DD]
+     [--chunk-days=N] [--batch-size=N] [--dry-run]
+Lê MacroVariation janela a janela (cursor no servidor no PostgreSQL), então a memória fica
+limitada ao tamanho da janela mesmo com meses de dados de 5 em 5 minutos. --end é exclusivo.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from macro import cache as api_cache
+from macro.services.scoring import UPDATE_BATCH_SIZE, WindowProgress, recompute_scores
+
+
+def _parse_day(value: str | None, option: str) -> datetime | None:
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"Data inválida em {option}: {value} (use AAAA-MM-DD)")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Command(BaseCommand):
+    help = "Recalcula total_score/variation_sum dos MacroScore com os value_base atuais."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=str, default=None, help="Primeiro dia (AAAA-MM-DD).")
+        parser.add_argument(
+            "--end", type=str, default=None, help="Dia final, exclusivo (AAAA-MM-DD)."
+        )
+        parser.add_argument(
+            "--chunk-days", type=int, default=1, help="Dias de variações lidos por janela."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=UPDATE_BATCH_SIZE,
+            help="MacroScore por UPDATE em lote (bulk_update).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Só conta o que mudaria, sem gravar."
+        )
+
+    def handle(self, *args, **options):
+        start = _parse_day(options["start"], "--start")
+        end = _parse_day(options["end"], "--end")
+        if start and end and start >= end:
+            raise CommandError("--start deve ser anterior a --end.")
+        write = not options["dry_run"]
+
+        def report(progress: WindowProgress) -> None:
+            self.stdout.write(
+                f"[{progress.index}/{progress.windows}] "
+                f"{timezone.localtime(progress.start):%Y-%m-%d %H:%M} → "
+                f"{timezone.localtime(progress.end):%Y-%m-%d %H:%M}: "
+                f"{progress.variations} variações, {progress.scores} horários, "
+                f"{progress.updated} alterados"
+            )
+
+        updated = recompute_scores(
+            start=start,
+            end=end,
+            chunk_days=max(1, options["chunk_days"]),
+            batch_size=max(1, options["batch_size"]),
+            write=write,
+            progress=report,
+        )
+        if write and updated:
+            api_cache.publish_cycle()
+        verb = "alterados" if write else "seriam alterados (dry-run)"
+        self.stdout.write(self.style.SUCCESS(f"MacroScore {verb}: {updated}"))
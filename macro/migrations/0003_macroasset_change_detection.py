@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('macro', '0002_macrovariation_payload_bytes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='macroasset',
+            name='content_bytes',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='macroasset',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='macroasset',
+            name='etag',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='macroasset',
+            name='last_modified',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
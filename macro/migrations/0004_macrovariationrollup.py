@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('macro', '0003_macroasset_change_detection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MacroVariationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('samples', models.IntegerField()),
+                ('valid_samples', models.IntegerField()),
+                ('variation_first', models.FloatField(blank=True, null=True)),
+                ('variation_last', models.FloatField(blank=True, null=True)),
+                ('variation_min', models.FloatField(blank=True, null=True)),
+                ('variation_max', models.FloatField(blank=True, null=True)),
+                ('variation_avg', models.FloatField(blank=True, null=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='macro.macroasset')),
+            ],
+            options={
+                'ordering': ['-bucket_start', 'asset__name'],
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='macro_macro_granula_791209_idx')],
+                'constraints': [models.UniqueConstraint(fields=('asset', 'granularity', 'bucket_start'), name='macro_rollup_asset_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_latest(apps, schema_editor):
+    MacroAsset = apps.get_model("macro", "MacroAsset")
+    MacroVariation = apps.get_model("macro", "MacroVariation")
+    MacroAssetLatest = apps.get_model("macro", "MacroAssetLatest")
+    latest = []
+    for asset_id in MacroAsset.objects.values_list("id", flat=True):
+        row = (
+            MacroVariation.objects.filter(asset_id=asset_id, variation_decimal__isnull=False)
+            .order_by("-measurement_time")
+            .values("measurement_time", "variation_text", "variation_decimal", "market_phase")
+            .first()
+        )
+        if row:
+            latest.append(MacroAssetLatest(asset_id=asset_id, **row))
+    MacroAssetLatest.objects.bulk_create(latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('macro', '0004_macrovariationrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MacroAssetLatest',
+            fields=[
+                ('asset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest', serialize=False, to='macro.macroasset')),
+                ('measurement_time', models.DateTimeField()),
+                ('variation_text', models.CharField(blank=True, max_length=50, null=True)),
+                ('variation_decimal', models.FloatField()),
+                ('market_phase', models.CharField(blank=True, max_length=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_latest, migrations.RunPython.noop),
+    ]
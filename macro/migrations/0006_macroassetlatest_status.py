@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:22
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_status(apps, schema_editor):
+    # Status da variação que originou cada registro: sem isso, o primeiro ciclo após o
+    # deploy veria todos os ativos como alterados e mandaria um delta completo ao painel
+    MacroVariation = apps.get_model("macro", "MacroVariation")
+    MacroAssetLatest = apps.get_model("macro", "MacroAssetLatest")
+    status = MacroVariation.objects.filter(
+        asset_id=OuterRef("asset_id"), measurement_time=OuterRef("measurement_time")
+    ).values("status")[:1]
+    MacroAssetLatest.objects.update(status=Coalesce(Subquery(status), Value("")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('macro', '0005_macroassetlatest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='macroassetlatest',
+            name='status',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,11 @@ class MacroAsset(models.Model):
     source_key = models.CharField(max_length=20, choices=SourceChoices.choices)
     category = models.CharField(max_length=120, blank=True)
     active = models.BooleanField(default=True)
+    # Detecção de mudança: validadores HTTP e hash/tamanho do último payload com variação
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    content_bytes = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -51,6 +56,62 @@ class MacroVariation(models.Model):
         return f"{self.asset.name} @ {self.measurement_time:%Y-%m-%d %H:%M}"
 
 
+class MacroAssetLatest(models.Model):
+    """
+    Última variação conhecida (variation_decimal não nulo) por ativo, atualizada na mesma
+    transação do bulk_create do ciclo; é o fallback do ciclo sem varrer o histórico.
+    """
+
+    asset = models.OneToOneField(
+        MacroAsset, on_delete=models.CASCADE, primary_key=True, related_name="latest"
+    )
+    measurement_time = models.DateTimeField()
+    variation_text = models.CharField(max_length=50, null=True, blank=True)
+    variation_decimal = models.FloatField()
+    market_phase = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=30, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.asset.name} (último) @ {self.measurement_time:%Y-%m-%d %H:%M}"
+
+
+class RollupGranularity(models.TextChoices):
+    HOUR = "hour", "Hora"
+    DAY = "day", "Dia"
+
+
+class MacroVariationRollup(models.Model):
+    """
+    Variações antigas agregadas por hora/dia (retenção: macro.services.retention). Médias
+    e extremos consideram só as amostras com variation_decimal.
+    """
+
+    asset = models.ForeignKey(MacroAsset, on_delete=models.CASCADE, related_name="rollups")
+    granularity = models.CharField(max_length=4, choices=RollupGranularity.choices)
+    bucket_start = models.DateTimeField()
+    samples = models.IntegerField()
+    valid_samples = models.IntegerField()
+    variation_first = models.FloatField(null=True, blank=True)
+    variation_last = models.FloatField(null=True, blank=True)
+    variation_min = models.FloatField(null=True, blank=True)
+    variation_max = models.FloatField(null=True, blank=True)
+    variation_avg = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-bucket_start", "asset__name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["asset", "granularity", "bucket_start"],
+                name="macro_rollup_asset_bucket_uniq",
+            )
+        ]
+        indexes = [models.Index(fields=["granularity", "bucket_start"])]
+
+    def __str__(self) -> str:
+        return f"{self.asset.name} {self.granularity} @ {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
 class MacroScore(models.Model):
     measurement_time = models.DateTimeField(unique=True)
     total_score = models.IntegerField()
@@ -0,0 +1,238 @@
+"""
+Backend assíncrono de coleta (config.HTTP_BACKEND = "async").
+
+Um event loop por processo, numa thread dedicada, mantém um httpx.AsyncClient por host
+(conexões keep-alive reaproveitadas entre ativos e ciclos) e um semáforo por host
+(HTTP_MAX_CONNECTIONS_PER_HOST). As threads do ciclo chamam AsyncFetcher.fetch(asset), que
+agenda a corrotina no loop e espera o resultado.
+
+Tentativas, fallback via FALLBACK_HOST, detecção de captcha, cache/descoberta de XHR e
+fallback para Playwright seguem exatamente network.fetch_html; as partes síncronas
+(Playwright) rodam em asyncio.to_thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import random
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from macro.models import MacroAsset
+from macro.services import config, network
+from macro.services.network import FetchOutcome
+
+
+class AsyncFetcher:
+    """Clientes httpx por host num event loop próprio. transport: injetável nos testes."""
+
+    def __init__(
+        self,
+        max_per_host: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_per_host = max(1, max_per_host or config.HTTP_MAX_CONNECTIONS_PER_HOST)
+        self._transport = transport
+        self._clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # -- event loop ---------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="macro-async-fetch", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def fetch(self, asset: MacroAsset) -> FetchOutcome:
+        """Versão bloqueante (para as threads do ciclo) de fetch_async."""
+        future = asyncio.run_coroutine_threadsafe(self.fetch_async(asset), self._ensure_loop())
+        return future.result()
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._aclose(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+    async def _aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client, _ in clients.values():
+            await client.aclose()
+
+    # -- HTTP ---------------------------------------------------------------
+
+    def _client_for(self, url: str) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        host = urlsplit(url).netloc
+        entry = self._clients.get(host)
+        if entry is None:
+            proxies = network._get_requests_proxies()
+            client = httpx.AsyncClient(
+                timeout=config.FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_per_host,
+                    max_keepalive_connections=self.max_per_host,
+                ),
+                proxy=proxies["https"] if proxies else None,
+                transport=self._transport,
+            )
+            entry = self._clients[host] = (client, asyncio.Semaphore(self.max_per_host))
+        return entry
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> httpx.Response:
+        client, slots = self._client_for(url)
+        async with slots:
+            return await client.get(url, headers=headers)
+
+    async def _fetch_xhr(self, xhr_url: str) -> FetchOutcome:
+        try:
+            response = await self._get(xhr_url, network._build_headers(1))
+            if response.status_code in network.BLOCK_STATUS_CODES:
+                return FetchOutcome(html=None, status="blocked", block_reason="xhr_block")
+            response.raise_for_status()
+            if network._is_captcha(response.text):
+                return FetchOutcome(html=None, status="blocked", block_reason="xhr_captcha")
+            return FetchOutcome(html=response.text, status="ok")
+        except httpx.HTTPError:
+            return FetchOutcome(html=None, status="fetch_error", block_reason="xhr_error")
+
+    # -- fluxo por fonte (espelha network.fetch_html) ------------------------
+
+    async def fetch_async(self, asset: MacroAsset) -> FetchOutcome:
+        if asset.source_key == "tradingview":
+            return await self._fetch_tradingview(asset)
+        return await self._fetch_investing(asset)
+
+    async def _fetch_tradingview(self, asset: MacroAsset) -> FetchOutcome:
+        if config.TRADINGVIEW_XHR_ENABLED:
+            cached_xhr = network._get_cached_tradingview_xhr_endpoint(asset)
+            if cached_xhr:
+                xhr_outcome = await self._fetch_xhr(cached_xhr)
+                if xhr_outcome.html or xhr_outcome.status == "ok":
+                    return xhr_outcome
+                network._clear_cached_tradingview_xhr_endpoint(asset)
+
+        outcome = await asyncio.to_thread(network._fetch_tradingview_playwright, asset)
+        if outcome.html or outcome.status == "ok":
+            return outcome
+
+        if config.TRADINGVIEW_XHR_ENABLED and outcome.status in ("fetch_error", "no_data"):
+            discovery = await asyncio.to_thread(network._discover_tradingview_xhr_endpoint, asset)
+            if discovery:
+                xhr_url, body = discovery
+                network._set_cached_tradingview_xhr_endpoint(asset, xhr_url)
+                if body:
+                    return FetchOutcome(html=body, status="ok")
+                xhr_outcome = await self._fetch_xhr(xhr_url)
+                if xhr_outcome.html or xhr_outcome.status == "ok":
+                    return xhr_outcome
+
+        return outcome
+
+    async def _fetch_investing(self, asset: MacroAsset) -> FetchOutcome:
+        block_reason: Optional[str] = None
+
+        if config.INVESTING_XHR_ENABLED:
+            cached_xhr = network._get_cached_investing_xhr_endpoint(asset)
+            if cached_xhr:
+                xhr_outcome = await self._fetch_xhr(cached_xhr)
+                if xhr_outcome.html or xhr_outcome.status == "ok":
+                    return xhr_outcome
+                network._clear_cached_investing_xhr_endpoint(asset)
+
+        for attempt in range(1, config.MAX_FETCH_ATTEMPTS + 1):
+            headers = network._build_headers(attempt)
+            try:
+                response = await self._get(
+                    asset.url, {**headers, **network._conditional_headers(asset)}
+                )
+                if response.status_code == 304:
+                    return FetchOutcome(html=None, status="not_modified")
+                if response.status_code in network.BLOCK_STATUS_CODES:
+                    block_reason = await self._fetch_fallback(asset, headers)
+                    if isinstance(block_reason, FetchOutcome):
+                        return block_reason
+                else:
+                    response.raise_for_status()
+                    if network._is_captcha(response.text):
+                        block_reason = "captcha"
+                    else:
+                        return network._response_outcome(response)
+            except httpx.HTTPError:
+                block_reason = "fetch_error"
+
+            if attempt < config.MAX_FETCH_ATTEMPTS:
+                delay_min, delay_max = config.RETRY_BACKOFF_RANGE
+                await asyncio.sleep(random.uniform(delay_min, delay_max))
+
+        if config.INVESTING_XHR_ENABLED and block_reason in (
+            "fallback_error",
+            "captcha",
+            "fetch_error",
+        ):
+            discovery = await asyncio.to_thread(network._discover_investing_xhr_endpoint, asset)
+            if discovery:
+                xhr_url, body = discovery
+                network._set_cached_investing_xhr_endpoint(asset, xhr_url)
+                if body:
+                    return FetchOutcome(html=body, status="ok")
+                xhr_outcome = await self._fetch_xhr(xhr_url)
+                if xhr_outcome.html or xhr_outcome.status == "ok":
+                    return xhr_outcome
+
+        if block_reason in ("fallback_error", "captcha", "fetch_error"):
+            fallback = await asyncio.to_thread(network._fetch_investing_playwright, asset)
+            if fallback.html or fallback.status == "ok":
+                return fallback
+
+        status = "blocked" if block_reason in ("fallback_error", "captcha") else "fetch_error"
+        return FetchOutcome(html=None, status=status, block_reason=block_reason)
+
+    async def _fetch_fallback(self, asset: MacroAsset, headers: Dict[str, str]):
+        """Resposta bloqueada (403/429/503): tenta via FALLBACK_HOST. Outcome ou block_reason."""
+        try:
+            response = await self._get(network._build_fallback_url(asset.url), headers)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            return "fallback_error"
+        if not network._is_captcha(response.text):
+            return FetchOutcome(html=response.text, status="ok")
+        return "captcha"
+
+
+_fetcher: Optional[AsyncFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_async_fetcher() -> AsyncFetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = AsyncFetcher()
+        return _fetcher
+
+
+@atexit.register
+def shutdown_async_fetcher() -> None:
+    global _fetcher
+    with _fetcher_lock:
+        fetcher, _fetcher = _fetcher, None
+    if fetcher is not None:
+        fetcher.close()
@@ -0,0 +1,116 @@
+"""
+Disjuntor (circuit breaker) da coleta macro, por fonte e por ativo, no cache do Django
+(Redis em produção, compartilhado entre workers).
+
+Cada chave conta falhas consecutivas de rede (status "blocked" ou "fetch_error"). Ao
+chegar no limite, abre por um tempo que dobra a cada reabertura sem sucesso (até
+BREAKER_MAX_COOLDOWN_SECONDS): ativos que falham sempre passam a ser sondados cada vez
+menos. Enquanto a fonte ou o ativo está aberto, o ciclo repete a última variação conhecida
+sem tocar a rede (sem retries, fallback, XHR ou Playwright). Quando o prazo da fonte vence,
+um único ativo (trava via cache.add) faz a sondagem; o sucesso fecha o disjuntor.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.core.cache import cache
+
+from macro.models import MacroAsset
+from macro.services import config
+from trader_portal.observability import log_event
+
+logger = logging.getLogger(__name__)
+
+FAILURE_STATUSES = ("blocked", "fetch_error")
+CIRCUIT_OPEN_REASON = "circuit_open"
+# Prazo da trava de sondagem: uma busca completa com retries/fallbacks
+PROBE_TIMEOUT_SECONDS = 180
+
+_lock = threading.Lock()
+
+
+def _source_key(asset: MacroAsset) -> str:
+    return f"macro:breaker:source:{asset.source_key}"
+
+
+def _asset_key(asset: MacroAsset) -> str:
+    return f"macro:breaker:asset:{asset.pk}"
+
+
+def _state_timeout() -> int:
+    # Estado esquecido depois de um tempo sem atualizações (volta a fechado)
+    return config.BREAKER_MAX_COOLDOWN_SECONDS * 4
+
+
+def _cooldown(opens: int) -> int:
+    return min(config.BREAKER_MAX_COOLDOWN_SECONDS, config.BREAKER_BASE_COOLDOWN_SECONDS * 2**opens)
+
+
+def _is_tripped(state: Optional[dict], threshold: int) -> bool:
+    return bool(state) and state.get("failures", 0) >= threshold
+
+
+def allow(asset: MacroAsset) -> bool:
+    """False se a fonte ou o ativo estiver aberto (o ciclo usa a última variação)."""
+    if not config.BREAKER_ENABLED:
+        return True
+    now = time.time()
+    source_key, asset_key = _source_key(asset), _asset_key(asset)
+    states = cache.get_many([source_key, asset_key])
+    source, own = states.get(source_key), states.get(asset_key)
+    if own and own.get("open_until", 0) > now:
+        return False
+    if _is_tripped(source, config.BREAKER_SOURCE_THRESHOLD):
+        if source.get("open_until", 0) > now:
+            return False
+        # Meio aberto: só um ativo sonda a fonte por vez
+        return cache.add(f"{source_key}:probe", asset.pk, timeout=PROBE_TIMEOUT_SECONDS)
+    return True
+
+
+def _fail(key: str, threshold: int, reason: str, now: float) -> Optional[dict]:
+    state = cache.get(key) or {"failures": 0, "opens": 0, "open_until": 0}
+    state["failures"] += 1
+    state["reason"] = reason
+    opened = None
+    if state["failures"] >= threshold and state["open_until"] <= now:
+        cooldown = _cooldown(state["opens"])
+        state["open_until"] = now + cooldown
+        state["opens"] += 1
+        opened = {"failures": state["failures"], "cooldown_s": cooldown, "reason": reason}
+    cache.set(key, state, timeout=_state_timeout())
+    return opened
+
+
+def record(asset: MacroAsset, status: str, block_reason: Optional[str] = "") -> None:
+    """Registra o resultado da busca: falha de rede conta; qualquer outro status fecha."""
+    if not config.BREAKER_ENABLED:
+        return
+    source_key, asset_key = _source_key(asset), _asset_key(asset)
+    if status not in FAILURE_STATUSES:
+        with _lock:
+            cache.delete_many([source_key, asset_key, f"{source_key}:probe"])
+        return
+    now = time.time()
+    reason = block_reason or status
+    with _lock:
+        for key, threshold, scope in (
+            (source_key, config.BREAKER_SOURCE_THRESHOLD, "source"),
+            (asset_key, config.BREAKER_ASSET_THRESHOLD, "asset"),
+        ):
+            opened = _fail(key, threshold, reason, now)
+            if opened:
+                log_event(
+                    logger,
+                    event="macro_breaker_opened",
+                    message="Circuit breaker opened",
+                    scope=scope,
+                    asset=asset.name,
+                    source=asset.source_key,
+                    **opened,
+                )
+        cache.delete(f"{source_key}:probe")
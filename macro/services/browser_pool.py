@@ -0,0 +1,201 @@
+"""
+Pool de navegadores Playwright de longa duração (um por processo/worker Celery).
+
+A API síncrona do Playwright só pode ser usada na thread que a criou; por isso cada vaga
+do pool é uma thread dedicada que mantém seu Chromium, contexto e página abertos entre
+coletas. Quem precisa do navegador envia uma função job(page) e espera o resultado, de
+qualquer thread (inclusive das threads do ciclo concorrente).
+
+Cada vaga verifica a saúde do navegador antes de cada job e o recicla após
+PLAYWRIGHT_MAX_PAGES_PER_BROWSER navegações ou quando ele cai (crash/desconexão).
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from macro.services import config
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[Any], Any]
+
+
+def playwright_installed() -> bool:
+    try:
+        import playwright.sync_api  # type: ignore  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class BrowserHandle:
+    """Chromium + contexto + página reutilizados por uma vaga do pool."""
+
+    def __init__(self, proxy: Optional[dict] = None):
+        from playwright.sync_api import sync_playwright  # type: ignore
+
+        self._playwright = sync_playwright().start()
+        try:
+            self.browser = self._playwright.chromium.launch(headless=True, proxy=proxy)
+            self.context = self.browser.new_context(user_agent=random.choice(config.USER_AGENTS))
+            self.page = self.context.new_page()
+        except Exception:
+            self._playwright.stop()
+            raise
+
+    def is_healthy(self) -> bool:
+        return self.browser.is_connected() and not self.page.is_closed()
+
+    def reset_page(self) -> None:
+        """Troca a página (ex.: após erro de navegação) mantendo navegador e contexto."""
+        try:
+            self.page.close()
+        except Exception:
+            pass
+        self.page = self.context.new_page()
+
+    def close(self) -> None:
+        for closer in (self.context.close, self.browser.close, self._playwright.stop):
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+class BrowserPool:
+    """
+    size threads, cada uma com um navegador; run(job) executa job(page) na próxima vaga
+    livre. launcher cria o BrowserHandle (injetável nos testes).
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_pages: int,
+        launcher: Optional[Callable[[], Any]] = None,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._launcher = launcher or BrowserHandle
+        self._jobs: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.launches = 0
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BrowserPool encerrado")
+            while len(self._threads) < self.size:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"macro-browser-{len(self._threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def run(self, job: Job, timeout: Optional[float] = None) -> Any:
+        """Executa job(page) numa vaga do pool; exceções do job são repassadas a quem chamou."""
+        self._ensure_started()
+        future: Future = Future()
+        self._jobs.put((job, future))
+        return future.result(timeout=timeout)
+
+    def _launch(self):
+        handle = self._launcher()
+        with self._lock:
+            self.launches += 1
+        return handle
+
+    def _worker(self) -> None:
+        handle = None
+        pages = 0
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            job, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if handle is not None and (pages >= self.max_pages or not handle.is_healthy()):
+                    logger.info(
+                        "[macro] Reciclando navegador (%s)",
+                        "limite de páginas" if pages >= self.max_pages else "não saudável",
+                    )
+                    handle.close()
+                    handle = None
+                if handle is None:
+                    handle = self._launch()
+                    pages = 0
+                pages += 1
+                result = job(handle.page)
+            except Exception as exc:
+                future.set_exception(exc)
+                handle = self._recover(handle)
+            else:
+                future.set_result(result)
+        if handle is not None:
+            handle.close()
+
+    def _recover(self, handle):
+        """Após falha no job: descarta o navegador se caiu, senão troca só a página."""
+        if handle is None:
+            return None
+        try:
+            if handle.is_healthy():
+                handle.reset_page()
+                return handle
+        except Exception:
+            pass
+        handle.close()
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._jobs.put(None)
+        for thread in threads:
+            thread.join(timeout=10)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Pool do processo atual (criado na primeira coleta com Playwright)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from macro.services.network import _get_playwright_proxy
+
+            proxy = _get_playwright_proxy()
+            _pool = BrowserPool(
+                size=config.PLAYWRIGHT_POOL_SIZE,
+                max_pages=config.PLAYWRIGHT_MAX_PAGES_PER_BROWSER,
+                launcher=lambda: BrowserHandle(proxy=proxy),
+            )
+        return _pool
+
+
+@atexit.register
+def shutdown_browser_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -1,16 +1,30 @@
+import contextvars
+import hashlib
 import logging
 import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from django.db import transaction
 from django.utils import timezone
 
-from macro.models import MacroAsset, MacroScore, MacroVariation, SourceChoices
-from macro.services import config
+from macro import cache as api_cache
+from macro import events
+from macro.models import (
+    MacroAsset,
+    MacroAssetLatest,
+    MacroScore,
+    MacroVariation,
+    SourceChoices,
+)
+from macro.services import breaker, config, scoring, xhr_registry
 from macro.services.network import fetch_html
-from macro.services.parsers import PARSER_BY_SOURCE
+from macro.services.parsers import PARSER_BY_SOURCE, ParsedPage
 from macro.services.utils import (
     align_measurement_time,
     extract_relevant_text,
@@ -30,20 +44,10 @@ logger = logging.getLogger(__name__)
 def _compute_score_and_adjusted_variation(asset, variation_decimal: Optional[float]) -> tuple:
     """
     Calcula score (-1, 0 ou 1) e variação ajustada para um ativo.
-    Retorna (score, adjusted_variation).
+    Retorna (score, adjusted_variation). O ciclo usa scoring.score_variations no vetor todo.
     """
-    direction = 1 if asset.value_base >= 0 else -1
-    adjusted_variation = (variation_decimal or 0.0) * direction
-    threshold = abs(asset.value_base)
-    if variation_decimal is None:
-        score = 0
-    elif adjusted_variation >= threshold:
-        score = 1
-    elif adjusted_variation <= -threshold:
-        score = -1
-    else:
-        score = 0
-    return score, adjusted_variation
+    scores, adjusted = scoring.score_variations([variation_decimal], [asset.value_base])
+    return int(scores[0]), float(adjusted[0])
 
 
 def _tradingview_window_open(measurement_time: datetime) -> bool:
@@ -56,6 +60,333 @@ def _tradingview_window_open(measurement_time: datetime) -> bool:
     return True
 
 
+@dataclass
+class AssetResult:
+    """Resultado da coleta de um ativo (ainda não persistido)."""
+
+    variation: Optional[MacroVariation]
+    payload_bytes: int = 0
+    # Payload igual ao do ciclo anterior (304 ou mesmo hash): parsing pulado
+    unchanged: bool = False
+    bytes_saved: int = 0
+    # Novos etag/last_modified/content_hash/content_bytes do ativo (None = manter)
+    change_markers: Optional[Dict[str, object]] = None
+
+
+CHANGE_MARKER_FIELDS = ("etag", "last_modified", "content_hash", "content_bytes")
+
+
+def _last_known_result(
+    asset, measurement_time: datetime, last_variations: dict, block_reason: str
+) -> AssetResult:
+    """Sem rede (TradingView fora da janela, disjuntor aberto): repete a última variação."""
+    fallback = last_variations.get(asset.id)
+    variation_decimal = fallback["variation_decimal"] if fallback else None
+    variation_text = fallback["variation_text"] if fallback else None
+    market_phase = fallback["market_phase"] if fallback else ""
+
+    variation = MacroVariation(
+        asset=asset,
+        measurement_time=measurement_time,
+        variation_text=variation_text,
+        variation_decimal=variation_decimal,
+        status="fallback" if fallback else "no_data",
+        block_reason=block_reason,
+        source_excerpt="",
+        market_phase=market_phase or "",
+        payload_bytes=None,
+    )
+    return AssetResult(variation)
+
+
+def _unchanged_result(
+    asset, measurement_time: datetime, previous: dict, outcome, payload_bytes: int
+) -> AssetResult:
+    """Conteúdo igual ao último com variação: repete a variação, sem parsing."""
+    not_modified = outcome.status == "not_modified"
+    variation = MacroVariation(
+        asset=asset,
+        measurement_time=measurement_time,
+        variation_text=previous["variation_text"],
+        variation_decimal=previous["variation_decimal"],
+        status="ok",
+        block_reason="not_modified" if not_modified else "unchanged",
+        source_excerpt="",
+        market_phase=previous["market_phase"] or "",
+        payload_bytes=payload_bytes or None,
+    )
+    change_markers = None
+    if not not_modified and (outcome.etag or outcome.last_modified):
+        change_markers = {"etag": outcome.etag, "last_modified": outcome.last_modified}
+    return AssetResult(
+        variation,
+        payload_bytes,
+        unchanged=True,
+        bytes_saved=(asset.content_bytes or 0) if not_modified else 0,
+        change_markers=change_markers,
+    )
+
+
+def _fetch_and_parse(asset, measurement_time: datetime, last_variations: dict) -> AssetResult:
+    log_event(
+        logger,
+        event="macro_fetch_started",
+        message="External fetch",
+        asset=asset.name,
+        source=asset.source_key,
+        status="started",
+    )
+    fetch_timer = Timer()
+    try:
+        with fetch_timer:
+            outcome = fetch_html(asset)
+    except Exception as fetch_exc:
+        breaker.record(asset, "fetch_error", type(fetch_exc).__name__)
+        log_event(
+            logger,
+            event="macro_fetch_failed",
+            message="fetch_html raised",
+            asset=asset.name,
+            source=asset.source_key,
+            status="error",
+            step="fetch_html",
+            elapsed_ms=fetch_timer.duration_ms,
+            error=str(fetch_exc),
+            exception_type=type(fetch_exc).__name__,
+            level=logging.ERROR,
+        )
+        raise
+    breaker.record(asset, outcome.status, outcome.block_reason)
+    log_event(
+        logger,
+        event="macro_fetch_completed",
+        message="Fetch returned",
+        asset=asset.name,
+        source=asset.source_key,
+        status="success" if outcome.status == "ok" else "error",
+        elapsed_ms=fetch_timer.duration_ms,
+        fetch_status=outcome.status,
+        error=outcome.block_reason,
+    )
+    payload = outcome.html.encode("utf-8") if outcome.html else b""
+    payload_bytes = len(payload)
+    content_hash = hashlib.sha256(payload).hexdigest() if payload else ""
+    previous = last_variations.get(asset.id)
+    if previous and (
+        outcome.status == "not_modified" or (content_hash and content_hash == asset.content_hash)
+    ):
+        return _unchanged_result(asset, measurement_time, previous, outcome, payload_bytes)
+    if outcome.status == "not_modified":
+        # 304 sem variação anterior para repetir: limpa os validadores e busca tudo no próximo
+        outcome.status = "no_data"
+        outcome.block_reason = "not_modified"
+
+    page = ParsedPage(outcome.html, key=asset.url) if outcome.html else None
+    parser = PARSER_BY_SOURCE.get(asset.source_key)
+    variation_text = parser(page) if parser and page else None
+    market_phase = ""
+
+    if asset.source_key == SourceChoices.TRADINGVIEW and variation_text:
+        text = str(variation_text).strip()
+        if text.startswith("EXT:"):
+            market_phase = "ext"
+            variation_text = text.replace("EXT:", "", 1).strip()
+        elif text.startswith("REG:"):
+            market_phase = "reg"
+            variation_text = text.replace("REG:", "", 1).strip()
+
+    variation_decimal = parse_variation_percent(variation_text)
+    status = outcome.status
+    if variation_text is None and status == "ok":
+        status = "no_data"
+
+    if status == "ok" and variation_decimal is not None:
+        change_markers = {
+            "etag": outcome.etag,
+            "last_modified": outcome.last_modified,
+            "content_hash": content_hash,
+            "content_bytes": payload_bytes,
+        }
+    elif payload or outcome.block_reason == "not_modified":
+        # Payload sem variação: esquece os marcadores para não repetir dado inválido
+        change_markers = dict.fromkeys(CHANGE_MARKER_FIELDS, "")
+        change_markers["content_bytes"] = None
+    else:
+        change_markers = None
+
+    if variation_decimal is None:
+        fallback = last_variations.get(asset.id)
+        if fallback:
+            variation_decimal = fallback["variation_decimal"]
+            if not variation_text:
+                variation_text = fallback["variation_text"]
+            if not market_phase:
+                market_phase = fallback["market_phase"] or ""
+            status = "fallback"
+            if not outcome.block_reason:
+                outcome.block_reason = "last_known"
+
+    excerpt = extract_relevant_text(page) if page else ""
+    variation = MacroVariation(
+        asset=asset,
+        measurement_time=measurement_time,
+        variation_text=variation_text,
+        variation_decimal=variation_decimal,
+        status=status,
+        block_reason=outcome.block_reason or "",
+        source_excerpt=excerpt,
+        market_phase=market_phase,
+        payload_bytes=payload_bytes or None,
+    )
+    return AssetResult(variation, payload_bytes, change_markers=change_markers)
+
+
+def _changed_assets(assets: List[MacroAsset], results: List[AssetResult]) -> List[MacroAsset]:
+    """Aplica change_markers nos ativos; devolve só os que mudaram (para bulk_update)."""
+    changed = []
+    for asset, result in zip(assets, results):
+        markers = result.change_markers or {}
+        if any(getattr(asset, field) != value for field, value in markers.items()):
+            for field, value in markers.items():
+                setattr(asset, field, value)
+            changed.append(asset)
+    return changed
+
+
+def _politeness_delay() -> None:
+    delay_min, delay_max = config.FETCH_DELAY_RANGE
+    time.sleep(random.uniform(delay_min, delay_max))
+
+
+def _collect_asset(
+    asset,
+    measurement_time: datetime,
+    last_variations: dict,
+    source_slots: Optional[Dict[str, threading.Semaphore]] = None,
+) -> AssetResult:
+    """
+    Coleta um ativo; falhas viram score 0 sem variação (o ciclo segue com os demais).
+    Com source_slots, a requisição e o intervalo de cortesia ocupam uma vaga da fonte.
+    """
+    try:
+        if asset.source_key == SourceChoices.TRADINGVIEW and not _tradingview_window_open(
+            measurement_time
+        ):
+            return _last_known_result(
+                asset, measurement_time, last_variations, "tradingview_off_hours"
+            )
+        if not breaker.allow(asset):
+            return _last_known_result(
+                asset, measurement_time, last_variations, breaker.CIRCUIT_OPEN_REASON
+            )
+
+        slot = (source_slots or {}).get(asset.source_key)
+        with slot if slot is not None else nullcontext():
+            result = _fetch_and_parse(asset, measurement_time, last_variations)
+            _politeness_delay()
+        return result
+    except Exception as exc:
+        log_event(
+            logger,
+            event="macro_fetch_failed",
+            message="Asset processing failed",
+            asset=asset.name,
+            source=asset.source_key,
+            status="error",
+            step="asset_processing",
+            error=str(exc),
+            exception_type=type(exc).__name__,
+            level=logging.ERROR,
+        )
+        logger.error(
+            "[macro] Erro ao coletar ativo %s (ID: %d): %s",
+            asset.name,
+            asset.id,
+            str(exc),
+            exc_info=True,
+        )
+        return AssetResult(None)
+
+
+def _collect_all(
+    assets: List[MacroAsset], measurement_time: datetime, last_variations: dict
+) -> List[AssetResult]:
+    """
+    Coleta os ativos em paralelo (até COLLECT_CONCURRENCY threads, SOURCE_CONCURRENCY por
+    fonte); resultados na ordem de assets. As threads só fazem rede e parsing: o acesso ao
+    banco fica na thread do ciclo.
+    """
+    workers = min(max(1, config.COLLECT_CONCURRENCY), len(assets))
+    if workers <= 1:
+        return [_collect_asset(asset, measurement_time, last_variations) for asset in assets]
+
+    source_slots = {
+        source: threading.Semaphore(max(1, limit))
+        for source, limit in config.SOURCE_CONCURRENCY.items()
+    }
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="macro-collect") as pool:
+        # copy_context: correlation/task id dos logs estruturados seguem para as threads
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,
+                _collect_asset,
+                asset,
+                measurement_time,
+                last_variations,
+                source_slots,
+            )
+            for asset in assets
+        ]
+        return [future.result() for future in futures]
+
+
+LAST_VARIATION_FIELDS = ("variation_decimal", "variation_text", "market_phase", "status")
+
+
+def _load_last_variations(assets: List[MacroAsset]) -> Dict[int, dict]:
+    """
+    Última variação conhecida por ativo, lida de MacroAssetLatest (uma linha por ativo, sem
+    varrer o histórico). A tabela é mantida por _update_latest e preenchida na migração 0005.
+    """
+    if not assets:
+        return {}
+    rows = MacroAssetLatest.objects.filter(asset__in=assets).values(
+        "asset_id", *LAST_VARIATION_FIELDS
+    )
+    return {row["asset_id"]: row for row in rows}
+
+
+def _update_latest(variations: List[MacroVariation]) -> None:
+    """Upsert de MacroAssetLatest com as variações válidas do ciclo (nunca retrocede)."""
+    candidates = {v.asset_id: v for v in variations if v.variation_decimal is not None}
+    if not candidates:
+        return
+    current = dict(
+        MacroAssetLatest.objects.filter(asset_id__in=candidates).values_list(
+            "asset_id", "measurement_time"
+        )
+    )
+    rows = [
+        MacroAssetLatest(
+            asset_id=asset_id,
+            measurement_time=variation.measurement_time,
+            variation_text=variation.variation_text,
+            variation_decimal=variation.variation_decimal,
+            market_phase=variation.market_phase,
+            status=variation.status,
+        )
+        for asset_id, variation in candidates.items()
+        if asset_id not in current or current[asset_id] <= variation.measurement_time
+    ]
+    if rows:
+        MacroAssetLatest.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["asset"],
+            update_fields=["measurement_time", *LAST_VARIATION_FIELDS, "updated_at"],
+        )
+
+
 def execute_cycle(measurement_time: Optional[datetime] = None) -> None:
     """Executa coleta e persiste no banco."""
     try:
@@ -71,179 +402,26 @@ def execute_cycle(measurement_time: Optional[datetime] = None) -> None:
     label = measurement_time.strftime("%Y-%m-%d %H:%M")
 
     assets = list(_iter_assets())
-    last_variations = {}
-    if assets:
-        last_qs = (
-            MacroVariation.objects.filter(asset__in=assets, variation_decimal__isnull=False)
-            .order_by("asset_id", "-measurement_time")
-            .values(
-                "asset_id",
-                "variation_decimal",
-                "variation_text",
-                "market_phase",
-            )
-        )
-        for row in last_qs:
-            if row["asset_id"] not in last_variations:
-                last_variations[row["asset_id"]] = row
-    variations: List[MacroVariation] = []
-    scores: List[int] = []
-    variation_sum = 0.0
-    total_bytes = 0
-
-    for asset in assets:
-        try:
-            if asset.source_key == SourceChoices.TRADINGVIEW and not _tradingview_window_open(
-                measurement_time
-            ):
-                fallback = last_variations.get(asset.id)
-                variation_decimal = fallback["variation_decimal"] if fallback else None
-                variation_text = fallback["variation_text"] if fallback else None
-                market_phase = fallback["market_phase"] if fallback else ""
-
-                variations.append(
-                    MacroVariation(
-                        asset=asset,
-                        measurement_time=measurement_time,
-                        variation_text=variation_text,
-                        variation_decimal=variation_decimal,
-                        status="fallback" if fallback else "no_data",
-                        block_reason="tradingview_off_hours",
-                        source_excerpt="",
-                        market_phase=market_phase or "",
-                        payload_bytes=None,
-                    )
-                )
-
-                score, adjusted_variation = _compute_score_and_adjusted_variation(
-                    asset, variation_decimal
-                )
-                variation_sum += adjusted_variation
-                scores.append(score)
-                continue
-
-            log_event(
-                logger,
-                event="macro_fetch_started",
-                message="External fetch",
-                asset=asset.name,
-                source=asset.source_key,
-                status="started",
-            )
-            fetch_timer = Timer()
-            try:
-                with fetch_timer:
-                    outcome = fetch_html(asset)
-            except Exception as fetch_exc:
-                log_event(
-                    logger,
-                    event="macro_fetch_failed",
-                    message="fetch_html raised",
-                    asset=asset.name,
-                    source=asset.source_key,
-                    status="error",
-                    step="fetch_html",
-                    elapsed_ms=fetch_timer.duration_ms,
-                    error=str(fetch_exc),
-                    exception_type=type(fetch_exc).__name__,
-                    level=logging.ERROR,
-                )
-                raise
-            log_event(
-                logger,
-                event="macro_fetch_completed",
-                message="Fetch returned",
-                asset=asset.name,
-                source=asset.source_key,
-                status="success" if outcome.status == "ok" else "error",
-                elapsed_ms=fetch_timer.duration_ms,
-                fetch_status=outcome.status,
-                error=outcome.block_reason,
-            )
-            payload_bytes = len(outcome.html.encode("utf-8")) if outcome.html else 0
-            total_bytes += payload_bytes
-            parser = PARSER_BY_SOURCE.get(asset.source_key)
-            variation_text = parser(outcome.html) if parser and outcome.html else None
-            market_phase = ""
-
-            if asset.source_key == SourceChoices.TRADINGVIEW and variation_text:
-                text = str(variation_text).strip()
-                if text.startswith("EXT:"):
-                    market_phase = "ext"
-                    variation_text = text.replace("EXT:", "", 1).strip()
-                elif text.startswith("REG:"):
-                    market_phase = "reg"
-                    variation_text = text.replace("REG:", "", 1).strip()
-
-            variation_decimal = parse_variation_percent(variation_text)
-            status = outcome.status
-            if variation_text is None and status == "ok":
-                status = "no_data"
-
-            if variation_decimal is None:
-                fallback = last_variations.get(asset.id)
-                if fallback:
-                    variation_decimal = fallback["variation_decimal"]
-                    if not variation_text:
-                        variation_text = fallback["variation_text"]
-                    if not market_phase:
-                        market_phase = fallback["market_phase"] or ""
-                    status = "fallback"
-                    if not outcome.block_reason:
-                        outcome.block_reason = "last_known"
-
-            excerpt = extract_relevant_text(outcome.html or "")
-            variations.append(
-                MacroVariation(
-                    asset=asset,
-                    measurement_time=measurement_time,
-                    variation_text=variation_text,
-                    variation_decimal=variation_decimal,
-                    status=status,
-                    block_reason=outcome.block_reason or "",
-                    source_excerpt=excerpt,
-                    market_phase=market_phase,
-                    payload_bytes=payload_bytes or None,
-                )
-            )
+    last_variations = _load_last_variations(assets)
 
-            score, adjusted_variation = _compute_score_and_adjusted_variation(
-                asset, variation_decimal
-            )
-            variation_sum += adjusted_variation
-            scores.append(score)
-
-            delay_min, delay_max = config.FETCH_DELAY_RANGE
-            time.sleep(random.uniform(delay_min, delay_max))
-        except Exception as exc:
-            log_event(
-                logger,
-                event="macro_fetch_failed",
-                message="Asset processing failed",
-                asset=asset.name,
-                source=asset.source_key,
-                status="error",
-                step="asset_processing",
-                error=str(exc),
-                exception_type=type(exc).__name__,
-                level=logging.ERROR,
-            )
-            logger.error(
-                "[macro] Erro ao coletar ativo %s (ID: %d): %s",
-                asset.name,
-                asset.id,
-                str(exc),
-                exc_info=True,
-            )
-            # Continua para o próximo ativo mesmo se este falhar
-            scores.append(0)
-            continue
-
-    total_score = sum(scores)
+    xhr_registry.begin_cycle()
+    try:
+        results = _collect_all(assets, measurement_time, last_variations)
+    finally:
+        xhr_registry.flush_all()
+    variations = [result.variation for result in results if result.variation is not None]
+    total_score, variation_sum = scoring.cycle_totals(
+        [result.variation.variation_decimal if result.variation else None for result in results],
+        [asset.value_base for asset in assets],
+    )
+    changed_assets = _changed_assets(assets, results)
 
     try:
         with transaction.atomic():
             MacroVariation.objects.bulk_create(variations, ignore_conflicts=True)
+            if changed_assets:
+                MacroAsset.objects.bulk_update(changed_assets, CHANGE_MARKER_FIELDS)
+            _update_latest(variations)
             MacroScore.objects.update_or_create(
                 measurement_time=measurement_time,
                 defaults={
@@ -259,3 +437,23 @@ def execute_cycle(measurement_time: Optional[datetime] = None) -> None:
             exc_info=True,
         )
         raise
+
+    version = api_cache.publish_cycle()
+    events.publish_cycle(
+        version, measurement_time, total_score, variation_sum, variations, last_variations
+    )
+
+    log_event(
+        logger,
+        event="macro_cycle_report",
+        message="Cycle persisted",
+        measurement_time=measurement_time.isoformat(),
+        assets=len(assets),
+        variations=len(variations),
+        unchanged=sum(1 for result in results if result.unchanged),
+        payload_bytes=sum(result.payload_bytes for result in results),
+        bytes_saved=sum(result.bytes_saved for result in results),
+        circuit_open=sum(
+            1 for variation in variations if variation.block_reason == breaker.CIRCUIT_OPEN_REASON
+        ),
+    )
@@ -13,9 +13,21 @@ USER_AGENTS = [
 ]
 
 FETCH_DELAY_RANGE: Tuple[float, float] = (0.5, 1.0)
+# Coleta concorrente: ativos em paralelo no ciclo (1 = sequencial) e limite por fonte
+# (o intervalo FETCH_DELAY_RANGE é respeitado dentro de cada vaga da fonte)
+COLLECT_CONCURRENCY = int(os.getenv("MACRO_COLLECT_CONCURRENCY", "4"))
+SOURCE_CONCURRENCY = {
+    "investing": int(os.getenv("MACRO_INVESTING_CONCURRENCY", "2")),
+    "tradingview": int(os.getenv("MACRO_TRADINGVIEW_CONCURRENCY", "2")),
+}
 RETRY_BACKOFF_RANGE: Tuple[float, float] = (1.0, 2.5)
 MAX_FETCH_ATTEMPTS = 3
 FETCH_TIMEOUT = 25
+# Cliente HTTP: "requests" (síncrono, uma Session por processo, compartilhada entre threads
+# e ciclos; ver network._get_session) ou "async" (httpx, um cliente keep-alive por host num
+# event loop do processo; ver async_network.py)
+HTTP_BACKEND = os.getenv("MACRO_HTTP_BACKEND", "requests").strip().lower()
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("MACRO_HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
 FALLBACK_HOST = "https://r.jina.ai"
 INVESTING_XHR_ENABLED = True
 INVESTING_XHR_CACHE_PATH = ".cache/investing_xhr_cache.json"
@@ -23,6 +35,34 @@ INVESTING_XHR_CACHE_TTL_HOURS = 72
 TRADINGVIEW_XHR_ENABLED = True
 TRADINGVIEW_XHR_CACHE_PATH = ".cache/tradingview_xhr_cache.json"
 TRADINGVIEW_XHR_CACHE_TTL_HOURS = 24
+# Onde ficam os endpoints XHR descobertos: "file" (JSON em .cache/, por máquina) ou "cache"
+# (cache do Django; com REDIS_CACHE_URL, compartilhado entre todos os workers)
+XHR_REGISTRY_BACKEND = os.getenv("MACRO_XHR_REGISTRY_BACKEND", "file").strip().lower()
+# Tree builder do BeautifulSoup: "auto" (lxml se instalado), "lxml" ou "html.parser"
+HTML_PARSER = os.getenv("MACRO_HTML_PARSER", "auto").strip().lower()
+
+# Validade (s) dos payloads de /macro/scores/ e /macro/variations/; a troca de versão a
+# cada ciclo (macro.cache.publish_cycle) é o que invalida
+API_CACHE_TIMEOUT = int(os.getenv("MACRO_API_CACHE_TIMEOUT", "900"))
+# Push do painel via SSE (/macro/stream/, macro.events): requer servidor ASGI e Redis
+SSE_ENABLED = os.getenv("MACRO_SSE_ENABLED", "").strip().lower() in {"1", "true", "yes"}
+EVENTS_REDIS_URL = os.getenv("MACRO_EVENTS_REDIS_URL", os.getenv("REDIS_CACHE_URL", "")).strip()
+SSE_MAX_SECONDS = int(os.getenv("MACRO_SSE_MAX_SECONDS", "1800"))
+# Retenção do histórico (macro.services.retention); valor <= 0 desliga a etapa
+EXCERPT_RETENTION_DAYS = int(os.getenv("MACRO_EXCERPT_RETENTION_DAYS", "7"))
+RAW_RETENTION_DAYS = int(os.getenv("MACRO_RAW_RETENTION_DAYS", "90"))
+HOURLY_RETENTION_DAYS = int(os.getenv("MACRO_HOURLY_RETENTION_DAYS", "730"))
+# Disjuntor da coleta (macro.services.breaker): falhas de rede consecutivas até abrir,
+# por ativo e por fonte; o prazo aberto dobra a cada reabertura, até o máximo
+BREAKER_ENABLED = os.getenv("MACRO_BREAKER_ENABLED", "true").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+}
+BREAKER_ASSET_THRESHOLD = int(os.getenv("MACRO_BREAKER_ASSET_THRESHOLD", "3"))
+BREAKER_SOURCE_THRESHOLD = int(os.getenv("MACRO_BREAKER_SOURCE_THRESHOLD", "8"))
+BREAKER_BASE_COOLDOWN_SECONDS = int(os.getenv("MACRO_BREAKER_BASE_COOLDOWN_SECONDS", "600"))
+BREAKER_MAX_COOLDOWN_SECONDS = int(os.getenv("MACRO_BREAKER_MAX_COOLDOWN_SECONDS", "3600"))
 
 # Proxy
 PROXY_ENABLED = os.getenv("PROXY_ENABLED", "").strip().lower() in {"1", "true", "yes"}
@@ -41,6 +81,14 @@ PROXY_USE_FOR_PLAYWRIGHT = os.getenv("PROXY_USE_FOR_PLAYWRIGHT", "true").strip()
 }
 PLAYWRIGHT_TIMEOUT_MS = int(os.getenv("PLAYWRIGHT_TIMEOUT_MS", "60000"))
 PLAYWRIGHT_WAIT_MS = int(os.getenv("PLAYWRIGHT_WAIT_MS", "4000"))
+# Pool de navegadores por processo (browser_pool.py); desligado = um Chromium por coleta
+PLAYWRIGHT_POOL_ENABLED = os.getenv("PLAYWRIGHT_POOL_ENABLED", "true").strip().lower() in {
+    "1",
+    "true",
+    "yes",
+}
+PLAYWRIGHT_POOL_SIZE = int(os.getenv("PLAYWRIGHT_POOL_SIZE", "2"))
+PLAYWRIGHT_MAX_PAGES_PER_BROWSER = int(os.getenv("PLAYWRIGHT_MAX_PAGES_PER_BROWSER", "50"))
 
 # Agenda
 TARGET_INTERVAL_MINUTES = 5
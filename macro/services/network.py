@@ -1,21 +1,30 @@
-import json
 import logging
 import random
+import threading
 import time
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from pathlib import Path
 from typing import Dict, Optional, Tuple
 
 import requests
-from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 from macro.models import MacroAsset
 from macro.services import config
+from macro.services.browser_pool import BrowserHandle, get_browser_pool, playwright_installed
 from macro.services.parsers import parse_investing_variation, parse_tradingview_variation
+from macro.services.xhr_registry import investing_registry, tradingview_registry
 
 logger = logging.getLogger(__name__)
 
+# Uma requests.Session por processo, compartilhada pelas threads da coleta: o pool do
+# urllib3 é thread-safe, e como o ThreadPoolExecutor é recriado a cada ciclo, só uma
+# sessão fora das threads mantém as conexões keep-alive entre ativos e ciclos
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+CAPTCHA_MARKERS = ("Just a moment", "Verify you are human")
+BLOCK_STATUS_CODES = (403, 429, 503)
+
 
 def _build_proxy_server_url() -> Optional[str]:
     if not config.PROXY_ENABLED or not config.PROXY_SERVER:
@@ -38,6 +47,26 @@ def _get_requests_proxies() -> Optional[Dict[str, str]]:
     return {"http": server, "https": server}
 
 
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Uma conexão por thread da coleta em cada host, sem descartar no pool cheio
+            adapter = HTTPAdapter(pool_maxsize=max(10, config.COLLECT_CONCURRENCY))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            proxies = _get_requests_proxies()
+            if proxies:
+                session.proxies.update(proxies)
+            _session = session
+        return _session
+
+
+def _is_captcha(text: str) -> bool:
+    return any(marker in text for marker in CAPTCHA_MARKERS)
+
+
 def _get_playwright_proxy() -> Optional[Dict[str, str]]:
     if not config.PROXY_ENABLED or not config.PROXY_USE_FOR_PLAYWRIGHT:
         return None
@@ -126,6 +155,47 @@ class FetchOutcome:
     html: Optional[str]
     status: str
     block_reason: Optional[str] = None
+    # Validadores HTTP da página do ativo (requisição condicional no próximo ciclo)
+    etag: str = ""
+    last_modified: str = ""
+
+
+def _conditional_headers(asset: MacroAsset) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since com os validadores da última resposta do ativo."""
+    headers = {}
+    if asset.etag:
+        headers["If-None-Match"] = asset.etag
+    if asset.last_modified:
+        headers["If-Modified-Since"] = asset.last_modified
+    return headers
+
+
+def _response_outcome(response) -> FetchOutcome:
+    """Resposta 200 da página do ativo (requests ou httpx), com seus validadores."""
+    return FetchOutcome(
+        html=response.text,
+        status="ok",
+        etag=response.headers.get("ETag", ""),
+        last_modified=response.headers.get("Last-Modified", ""),
+    )
+
+
+def _run_playwright(job):
+    """Executa job(page) no pool de navegadores do processo (ou num Chromium avulso)."""
+    if config.PLAYWRIGHT_POOL_ENABLED:
+        return get_browser_pool().run(job)
+    handle = BrowserHandle(proxy=_get_playwright_proxy())
+    try:
+        return job(handle.page)
+    finally:
+        handle.close()
+
+
+def _load_page(page, url: str, wait_until: str) -> str:
+    page.goto(url, wait_until=wait_until, timeout=config.PLAYWRIGHT_TIMEOUT_MS)
+    if config.PLAYWRIGHT_WAIT_MS > 0:
+        page.wait_for_timeout(config.PLAYWRIGHT_WAIT_MS)
+    return page.content()
 
 
 def _build_fallback_url(url: str) -> str:
@@ -139,25 +209,16 @@ def _build_fallback_url(url: str) -> str:
 
 
 def _fetch_tradingview_playwright(asset: MacroAsset) -> FetchOutcome:
-    try:
-        from playwright.sync_api import sync_playwright  # type: ignore
-    except ImportError:
+    if not playwright_installed():
         return FetchOutcome(
             html=None, status="fetch_error", block_reason="playwright_not_installed"
         )
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, proxy=_get_playwright_proxy())
-            page = browser.new_page()
-            page.goto(asset.url, wait_until="networkidle", timeout=config.PLAYWRIGHT_TIMEOUT_MS)
-            if config.PLAYWRIGHT_WAIT_MS > 0:
-                page.wait_for_timeout(config.PLAYWRIGHT_WAIT_MS)
-            html = page.content()
-            browser.close()
-            if not html:
-                return FetchOutcome(html=None, status="no_data", block_reason="empty_html")
-            return FetchOutcome(html=html, status="ok")
+        html = _run_playwright(lambda page: _load_page(page, asset.url, "networkidle"))
+        if not html:
+            return FetchOutcome(html=None, status="no_data", block_reason="empty_html")
+        return FetchOutcome(html=html, status="ok")
     except Exception as exc:
         block_reason, error_type = _classify_playwright_error(exc)
         logger.warning(
@@ -171,28 +232,16 @@ def _fetch_tradingview_playwright(asset: MacroAsset) -> FetchOutcome:
 
 
 def _fetch_investing_playwright(asset: MacroAsset) -> FetchOutcome:
-    try:
-        from playwright.sync_api import sync_playwright  # type: ignore
-    except ImportError:
+    if not playwright_installed():
         return FetchOutcome(
             html=None, status="fetch_error", block_reason="playwright_not_installed"
         )
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, proxy=_get_playwright_proxy())
-            user_agent = random.choice(config.USER_AGENTS)
-            page = browser.new_page(user_agent=user_agent)
-            page.goto(
-                asset.url, wait_until="domcontentloaded", timeout=config.PLAYWRIGHT_TIMEOUT_MS
-            )
-            if config.PLAYWRIGHT_WAIT_MS > 0:
-                page.wait_for_timeout(config.PLAYWRIGHT_WAIT_MS)
-            html = page.content()
-            browser.close()
-            if not html:
-                return FetchOutcome(html=None, status="no_data", block_reason="empty_html")
-            return FetchOutcome(html=html, status="ok")
+        html = _run_playwright(lambda page: _load_page(page, asset.url, "domcontentloaded"))
+        if not html:
+            return FetchOutcome(html=None, status="no_data", block_reason="empty_html")
+        return FetchOutcome(html=html, status="ok")
     except Exception as exc:
         block_reason, error_type = _classify_playwright_error(exc)
         logger.warning(
@@ -205,128 +254,32 @@ def _fetch_investing_playwright(asset: MacroAsset) -> FetchOutcome:
         return FetchOutcome(html=None, status=status, block_reason=block_reason)
 
 
-def _resolve_xhr_cache_path() -> Path:
-    cache_path = Path(config.INVESTING_XHR_CACHE_PATH)
-    if cache_path.is_absolute():
-        return cache_path
-    try:
-        base_dir = Path(settings.BASE_DIR)
-    except Exception:
-        base_dir = Path.cwd()
-    return base_dir / cache_path
-
-
-def _load_xhr_cache(cache_path: Path) -> Dict[str, Dict[str, str]]:
-    if not cache_path.exists():
-        return {}
-    try:
-        return json.loads(cache_path.read_text(encoding="utf-8"))
-    except (OSError, json.JSONDecodeError):
-        return {}
-
-
-def _save_xhr_cache(cache_path: Path, cache: Dict[str, Dict[str, str]]) -> None:
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    cache_path.write_text(json.dumps(cache, indent=2, sort_keys=True), encoding="utf-8")
-
-
-def _load_investing_xhr_cache() -> Dict[str, Dict[str, str]]:
-    cache_path = _resolve_xhr_cache_path()
-    return _load_xhr_cache(cache_path)
-
-
-def _save_investing_xhr_cache(cache: Dict[str, Dict[str, str]]) -> None:
-    cache_path = _resolve_xhr_cache_path()
-    _save_xhr_cache(cache_path, cache)
-
-
-def _resolve_tradingview_xhr_cache_path() -> Path:
-    cache_path = Path(config.TRADINGVIEW_XHR_CACHE_PATH)
-    if cache_path.is_absolute():
-        return cache_path
-    try:
-        base_dir = Path(settings.BASE_DIR)
-    except Exception:
-        base_dir = Path.cwd()
-    return base_dir / cache_path
-
-
-def _load_tradingview_xhr_cache() -> Dict[str, Dict[str, str]]:
-    cache_path = _resolve_tradingview_xhr_cache_path()
-    return _load_xhr_cache(cache_path)
-
-
-def _save_tradingview_xhr_cache(cache: Dict[str, Dict[str, str]]) -> None:
-    cache_path = _resolve_tradingview_xhr_cache_path()
-    _save_xhr_cache(cache_path, cache)
-
-
 def _get_cached_investing_xhr_endpoint(asset: MacroAsset) -> Optional[str]:
-    cache = _load_investing_xhr_cache()
-    entry = cache.get(asset.url)
-    if not entry:
-        return None
-    try:
-        updated_at = datetime.fromisoformat(entry.get("updated_at", ""))
-    except ValueError:
-        return None
-    ttl = timedelta(hours=config.INVESTING_XHR_CACHE_TTL_HOURS)
-    if datetime.utcnow() - updated_at > ttl:
-        return None
-    return entry.get("xhr_url")
+    return investing_registry.get(asset.url)
 
 
 def _set_cached_investing_xhr_endpoint(asset: MacroAsset, xhr_url: str) -> None:
-    cache = _load_investing_xhr_cache()
-    cache[asset.url] = {
-        "xhr_url": xhr_url,
-        "updated_at": datetime.utcnow().isoformat(),
-    }
-    _save_investing_xhr_cache(cache)
+    investing_registry.set(asset.url, xhr_url)
 
 
 def _clear_cached_investing_xhr_endpoint(asset: MacroAsset) -> None:
-    cache = _load_investing_xhr_cache()
-    if asset.url in cache:
-        cache.pop(asset.url, None)
-        _save_investing_xhr_cache(cache)
+    investing_registry.clear(asset.url)
 
 
 def _get_cached_tradingview_xhr_endpoint(asset: MacroAsset) -> Optional[str]:
-    cache = _load_tradingview_xhr_cache()
-    entry = cache.get(asset.url)
-    if not entry:
-        return None
-    try:
-        updated_at = datetime.fromisoformat(entry.get("updated_at", ""))
-    except ValueError:
-        return None
-    ttl = timedelta(hours=config.TRADINGVIEW_XHR_CACHE_TTL_HOURS)
-    if datetime.utcnow() - updated_at > ttl:
-        return None
-    return entry.get("xhr_url")
+    return tradingview_registry.get(asset.url)
 
 
 def _set_cached_tradingview_xhr_endpoint(asset: MacroAsset, xhr_url: str) -> None:
-    cache = _load_tradingview_xhr_cache()
-    cache[asset.url] = {
-        "xhr_url": xhr_url,
-        "updated_at": datetime.utcnow().isoformat(),
-    }
-    _save_tradingview_xhr_cache(cache)
+    tradingview_registry.set(asset.url, xhr_url)
 
 
 def _clear_cached_tradingview_xhr_endpoint(asset: MacroAsset) -> None:
-    cache = _load_tradingview_xhr_cache()
-    if asset.url in cache:
-        cache.pop(asset.url, None)
-        _save_tradingview_xhr_cache(cache)
+    tradingview_registry.clear(asset.url)
 
 
 def _discover_tradingview_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str, Optional[str]]]:
-    try:
-        from playwright.sync_api import sync_playwright  # type: ignore
-    except ImportError:
+    if not playwright_installed():
         return None
 
     endpoint_url: Optional[str] = None
@@ -352,15 +305,15 @@ def _discover_tradingview_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str,
             endpoint_url = resp.url
             endpoint_body = body
 
+    def discover(page) -> None:
+        page.on("response", handle_response)
+        try:
+            _load_page(page, asset.url, "networkidle")
+        finally:
+            page.remove_listener("response", handle_response)
+
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, proxy=_get_playwright_proxy())
-            page = browser.new_page()
-            page.on("response", handle_response)
-            page.goto(asset.url, wait_until="networkidle", timeout=config.PLAYWRIGHT_TIMEOUT_MS)
-            if config.PLAYWRIGHT_WAIT_MS > 0:
-                page.wait_for_timeout(config.PLAYWRIGHT_WAIT_MS)
-            browser.close()
+        _run_playwright(discover)
     except Exception as exc:
         block_reason, error_type = _classify_playwright_error(exc)
         logger.warning(
@@ -379,17 +332,14 @@ def _discover_tradingview_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str,
 
 
 def _fetch_tradingview_xhr(asset: MacroAsset, xhr_url: str) -> FetchOutcome:
-    session = requests.Session()
-    proxies = _get_requests_proxies()
-    if proxies:
-        session.proxies.update(proxies)
+    session = _get_session()
     headers = _build_headers(1)
     try:
         response = session.get(xhr_url, headers=headers, timeout=config.FETCH_TIMEOUT)
-        if response.status_code in (403, 429, 503):
+        if response.status_code in BLOCK_STATUS_CODES:
             return FetchOutcome(html=None, status="blocked", block_reason="xhr_block")
         response.raise_for_status()
-        if "Just a moment" in response.text or "Verify you are human" in response.text:
+        if _is_captcha(response.text):
             return FetchOutcome(html=None, status="blocked", block_reason="xhr_captcha")
         return FetchOutcome(html=response.text, status="ok")
     except requests.RequestException:
@@ -397,9 +347,7 @@ def _fetch_tradingview_xhr(asset: MacroAsset, xhr_url: str) -> FetchOutcome:
 
 
 def _discover_investing_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str, Optional[str]]]:
-    try:
-        from playwright.sync_api import sync_playwright  # type: ignore
-    except ImportError:
+    if not playwright_installed():
         return None
 
     endpoint_url: Optional[str] = None
@@ -425,18 +373,15 @@ def _discover_investing_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str, O
             endpoint_url = resp.url
             endpoint_body = body
 
+    def discover(page) -> None:
+        page.on("response", handle_response)
+        try:
+            _load_page(page, asset.url, "domcontentloaded")
+        finally:
+            page.remove_listener("response", handle_response)
+
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True, proxy=_get_playwright_proxy())
-            user_agent = random.choice(config.USER_AGENTS)
-            page = browser.new_page(user_agent=user_agent)
-            page.on("response", handle_response)
-            page.goto(
-                asset.url, wait_until="domcontentloaded", timeout=config.PLAYWRIGHT_TIMEOUT_MS
-            )
-            if config.PLAYWRIGHT_WAIT_MS > 0:
-                page.wait_for_timeout(config.PLAYWRIGHT_WAIT_MS)
-            browser.close()
+        _run_playwright(discover)
     except Exception as exc:
         block_reason, error_type = _classify_playwright_error(exc)
         logger.warning(
@@ -455,17 +400,14 @@ def _discover_investing_xhr_endpoint(asset: MacroAsset) -> Optional[Tuple[str, O
 
 
 def _fetch_investing_xhr(asset: MacroAsset, xhr_url: str) -> FetchOutcome:
-    session = requests.Session()
-    proxies = _get_requests_proxies()
-    if proxies:
-        session.proxies.update(proxies)
+    session = _get_session()
     headers = _build_headers(1)
     try:
         response = session.get(xhr_url, headers=headers, timeout=config.FETCH_TIMEOUT)
-        if response.status_code in (403, 429, 503):
+        if response.status_code in BLOCK_STATUS_CODES:
             return FetchOutcome(html=None, status="blocked", block_reason="xhr_block")
         response.raise_for_status()
-        if "Just a moment" in response.text or "Verify you are human" in response.text:
+        if _is_captcha(response.text):
             return FetchOutcome(html=None, status="blocked", block_reason="xhr_captcha")
         return FetchOutcome(html=response.text, status="ok")
     except requests.RequestException:
@@ -488,6 +430,15 @@ def _build_headers(attempt: int) -> Dict[str, str]:
 
 
 def fetch_html(asset: MacroAsset) -> FetchOutcome:
+    """
+    Busca o conteúdo do ativo (HTML ou JSON do XHR). Com config.HTTP_BACKEND = "async" a
+    busca roda no cliente assíncrono (async_network.py), com as mesmas regras.
+    """
+    if config.HTTP_BACKEND == "async":
+        from macro.services.async_network import get_async_fetcher
+
+        return get_async_fetcher().fetch(asset)
+
     if asset.source_key == "tradingview":
         if config.TRADINGVIEW_XHR_ENABLED:
             cached_xhr = _get_cached_tradingview_xhr_endpoint(asset)
@@ -515,10 +466,7 @@ def fetch_html(asset: MacroAsset) -> FetchOutcome:
         return outcome
 
     block_reason: Optional[str] = None
-    session = requests.Session()
-    proxies = _get_requests_proxies()
-    if proxies:
-        session.proxies.update(proxies)
+    session = _get_session()
 
     if config.INVESTING_XHR_ENABLED:
         cached_xhr = _get_cached_investing_xhr_endpoint(asset)
@@ -531,27 +479,30 @@ def fetch_html(asset: MacroAsset) -> FetchOutcome:
     for attempt in range(1, config.MAX_FETCH_ATTEMPTS + 1):
         headers: Dict[str, str] = _build_headers(attempt)
         try:
-            response = session.get(asset.url, headers=headers, timeout=config.FETCH_TIMEOUT)
-            if response.status_code in (403, 429, 503):
+            response = session.get(
+                asset.url,
+                headers={**headers, **_conditional_headers(asset)},
+                timeout=config.FETCH_TIMEOUT,
+            )
+            if response.status_code == 304:
+                return FetchOutcome(html=None, status="not_modified")
+            if response.status_code in BLOCK_STATUS_CODES:
                 raise requests.HTTPError(response=response)
             response.raise_for_status()
-            if "Just a moment" in response.text or "Verify you are human" in response.text:
+            if _is_captcha(response.text):
                 block_reason = "captcha"
             else:
-                return FetchOutcome(html=response.text, status="ok")
+                return _response_outcome(response)
         except requests.HTTPError as exc:
             status_code = exc.response.status_code if exc.response is not None else None
-            if status_code in (403, 429, 503):
+            if status_code in BLOCK_STATUS_CODES:
                 fallback_url = _build_fallback_url(asset.url)
                 try:
                     response = session.get(
                         fallback_url, headers=headers, timeout=config.FETCH_TIMEOUT
                     )
                     response.raise_for_status()
-                    if (
-                        "Just a moment" not in response.text
-                        and "Verify you are human" not in response.text
-                    ):
+                    if not _is_captcha(response.text):
                         return FetchOutcome(html=response.text, status="ok")
                     block_reason = "captcha"
                 except requests.RequestException:
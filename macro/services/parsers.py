@@ -1,8 +1,268 @@
+"""
+Parsers de variação das fontes macro.
+
+O HTML de cada ativo vira uma ParsedPage: a árvore (BeautifulSoup com lxml quando
+instalado, senão html.parser; ver config.HTML_PARSER) é construída no máximo uma vez e
+compartilhada entre o parser de variação e extract_relevant_text. Antes de qualquer árvore,
+um pré-scan por regex procura os spans conhecidos; só quando o markup foge do padrão
+simples (texto com tags aninhadas) cai no parser DOM.
+"""
+
+import html as html_lib
 import json
-from typing import Any, Callable, Optional
+import re
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
 
 from bs4 import BeautifulSoup
 
+from macro.services import config
+
+
+@lru_cache(maxsize=None)
+def _lxml_installed() -> bool:
+    try:
+        import lxml  # type: ignore  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def html_parser_features() -> str:
+    """Tree builder do BeautifulSoup: config.HTML_PARSER ou, em "auto", lxml se instalado."""
+    choice = config.HTML_PARSER
+    if choice == "auto":
+        return "lxml" if _lxml_installed() else "html.parser"
+    return choice
+
+
+class ParsedPage:
+    """Payload de um ativo com a árvore HTML construída sob demanda, uma única vez."""
+
+    def __init__(self, html: str, features: Optional[str] = None, key: Optional[str] = None):
+        self.html = html
+        self.features = features or html_parser_features()
+        # Identifica o ativo (URL) para memorizar o caminho JSON da variação entre ciclos
+        self.key = key
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.html, self.features)
+
+
+Document = Union[str, ParsedPage]
+
+
+def as_page(document: Document) -> ParsedPage:
+    return document if isinstance(document, ParsedPage) else ParsedPage(document)
+
+
+# ---------------------------------------------------------------------------
+# Pré-scan por regex (sem árvore)
+# ---------------------------------------------------------------------------
+
+_SPAN_CLASS_RE = re.compile(r"""<span\b[^>]*?\bclass\s*=\s*(["'])([^"']*)\1[^>]*>""", re.I)
+_SPAN_CHANGE_PERCENT_RE = re.compile(
+    r"""<span\b[^>]*?\bdata-test\s*=\s*(["'])instrument-price-change-percent\1[^>]*>""", re.I
+)
+_SPAN_TEXT_RE = re.compile(r"([^<]*)</span\s*>", re.I)
+# Marcador de "precisa da árvore": o span existe mas tem tags aninhadas
+NESTED = object()
+
+
+def _span_text(html: str, pos: int):
+    """Texto do span aberto em pos (como get_text(strip=True)) ou NESTED."""
+    match = _SPAN_TEXT_RE.match(html, pos)
+    if match is None:
+        return NESTED
+    return html_lib.unescape(match.group(1)).strip()
+
+
+def _spans_with_classes(html: str, *classes: str) -> Iterator[Any]:
+    """Textos (ou NESTED) dos spans que têm todas as classes, na ordem do documento."""
+    wanted = set(classes)
+    for match in _SPAN_CLASS_RE.finditer(html):
+        if wanted <= set(match.group(2).split()):
+            yield _span_text(html, match.end())
+
+
+def _prescan_investing(html: str):
+    """Variação do Investing sem árvore: str/None, ou NESTED se precisar do DOM."""
+    if "order-4" in html:
+        for text in _spans_with_classes(html, "notranslate", "order-4"):
+            if text is NESTED:
+                return NESTED
+            if "%" in text:
+                return _normalize_percent_text(text)
+    if "instrument-price-change-percent" not in html:
+        return None
+    match = _SPAN_CHANGE_PERCENT_RE.search(html)
+    if match is None:
+        return NESTED
+    text = _span_text(html, match.end())
+    return text if text is NESTED else _normalize_percent_text(text)
+
+
+def _prescan_tradingview(html: str):
+    """Variação do TradingView sem árvore: str/None, ou NESTED se precisar do DOM."""
+    for css_class, prefix in (
+        ("js-symbol-ext-hrs-change-pt", "EXT"),
+        ("js-symbol-change-pt", "REG"),
+    ):
+        if css_class not in html:
+            continue
+        text = next(_spans_with_classes(html, css_class), None)
+        if text is NESTED:
+            return NESTED
+        if text:
+            return f"{prefix}:{_normalize_tradingview(text)}"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# JSON dos XHR: varredura em streaming, sem recursão
+# ---------------------------------------------------------------------------
+
+_JSON_STRING = r'[^"\\]*(?:\\.[^"\\]*)*'
+_JSON_NUMBER = r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?"
+_JSON_SCALAR_RE = re.compile(rf'\s*(?:"({_JSON_STRING})"|({_JSON_NUMBER}))')
+_JSON_KEY_AT_RE = re.compile(rf'"({_JSON_STRING})"\s*:\s*')
+# Payload que não é JSON válido: o parser segue para o HTML, como antes
+INVALID_JSON = object()
+KeyMatcher = Callable[[str], bool]
+ValueReader = Callable[[Any], Optional[str]]
+
+# (fonte, chave da página) -> chave JSON da variação, aprendida no primeiro acerto. Com a
+# chave exata, os ciclos seguintes vão direto ao valor por busca literal.
+_learned_json_keys: Dict[Tuple[str, str], str] = {}
+
+
+@lru_cache(maxsize=None)
+def _hint_re(hint: str, ignore_case: bool) -> re.Pattern:
+    if ignore_case:
+        return re.compile(rf'"((?:[^"\\]|\\.)*?(?:{hint}){_JSON_STRING})"\s*:\s*', re.I)
+    return re.compile(hint)
+
+
+def _candidate_keys(text: str, hint: str) -> Iterator[Tuple[str, int]]:
+    """
+    (chave crua, início do valor) das chaves cujo nome contém hint, em
+    ordem de documento. Busca o hint no texto em minúsculas e volta até a aspa de abertura:
+    sem aspas escapadas, aspas alternam abertura/fechamento e fora de strings o JSON só tem
+    pontuação, números e true/false/null.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text) or '\\"' in text:
+        for match in _hint_re(hint, True).finditer(text):
+            yield match.group(1), match.end()
+        return
+    last_key = -1
+    for hit in _hint_re(hint, False).finditer(lowered):
+        start = text.rfind('"', 0, hit.start())
+        if start < 0 or start == last_key:
+            continue
+        match = _JSON_KEY_AT_RE.match(text, start)
+        if match is None or match.end(1) < hit.end():
+            continue  # hint dentro de um valor string
+        last_key = start
+        yield match.group(1), match.end()
+
+
+def _json_string(raw: str) -> str:
+    return json.loads(f'"{raw}"') if "\\" in raw else raw
+
+
+def _is_valid_json(text: str) -> bool:
+    """
+    Valida o documento inteiro antes de qualquer busca: um corpo truncado ou lixo que por
+    acaso contenha uma chave candidata não pode ser aceito como JSON.
+    """
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    except RecursionError:
+        pass  # aninhamento além do limite do json.loads: não dá para validar, varre assim
+    return True
+
+
+def _scan_json(text: str, hint: str, key_matches: KeyMatcher, read_value: ValueReader):
+    """
+    Primeiro par chave/valor escalar aceito, em ordem de documento (a mesma da antiga busca
+    recursiva em profundidade), sem montar o objeto: salta direto para as chaves candidatas
+    e para no primeiro acerto. Espera texto já validado (_is_valid_json).
+    Retorna (valor, chave crua) ou None.
+    """
+    for raw_key, value_pos in _candidate_keys(text, hint):
+        try:
+            if not key_matches(_json_string(raw_key)):
+                continue
+            scalar = _JSON_SCALAR_RE.match(text, value_pos)
+            if scalar is None:
+                continue  # objeto/array/literal: as chaves internas vêm a seguir
+            string, number = scalar.groups()
+            found = read_value(_json_string(string) if string is not None else json.loads(number))
+        except ValueError:
+            continue
+        if found:
+            return found, raw_key
+    return None
+
+
+def _learned_value(text: str, raw_key: str, read_value: ValueReader) -> Optional[str]:
+    """Valor da chave aprendida, localizada por busca literal (sem varrer candidatas)."""
+    if '\\"' in text:
+        return None
+    needle = f'"{raw_key}"'
+    start = text.find(needle)
+    while start >= 0:
+        match = _JSON_KEY_AT_RE.match(text, start)
+        if match is not None and match.group(1) == raw_key:
+            scalar = _JSON_SCALAR_RE.match(text, match.end())
+            if scalar is None:
+                return None
+            string, number = scalar.groups()
+            try:
+                return read_value(
+                    _json_string(string) if string is not None else json.loads(number)
+                )
+            except ValueError:
+                return None
+        start = text.find(needle, start + 1)
+    return None
+
+
+def _json_variation(
+    page: ParsedPage,
+    source: str,
+    hint: str,
+    key_matches: KeyMatcher,
+    read_value: ValueReader,
+):
+    """
+    Variação no JSON: chave aprendida para o ativo, senão varredura (e aprende a chave).
+    INVALID_JSON se o documento não for JSON válido (o parser segue para o HTML).
+    """
+    learn_key = (source, page.key) if page.key else None
+    if not _is_valid_json(page.html):
+        if learn_key:
+            _learned_json_keys.pop(learn_key, None)
+        return INVALID_JSON
+    raw_key = _learned_json_keys.get(learn_key) if learn_key else None
+    if raw_key is not None:
+        found = _learned_value(page.html, raw_key, read_value)
+        if found:
+            return found
+    result = _scan_json(page.html, hint, key_matches, read_value)
+    if result is None:
+        if learn_key:
+            _learned_json_keys.pop(learn_key, None)
+        return result
+    found, raw_key = result
+    if learn_key:
+        _learned_json_keys[learn_key] = raw_key
+    return found
+
 
 def _normalize_percent_text(text: str) -> Optional[str]:
     cleaned = text.replace("\u00a0", "").replace(" ", "").replace(",", ".").strip()
@@ -22,45 +282,37 @@ def _format_percent_number(value: float) -> str:
     return f"{value:.2f}%"
 
 
-def _extract_percent_from_json(payload: Any) -> Optional[str]:
-    if isinstance(payload, dict):
-        for key, value in payload.items():
-            key_lower = str(key).lower()
-            if isinstance(value, (dict, list)):
-                candidate = _extract_percent_from_json(value)
-                if candidate:
-                    return candidate
-                continue
-            if "percent" in key_lower or "pct" in key_lower:
-                if isinstance(value, (int, float)):
-                    return _format_percent_number(float(value))
-                if isinstance(value, str):
-                    normalized = _normalize_percent_text(value)
-                    if normalized:
-                        return normalized
+def _investing_key(key: str) -> bool:
+    key_lower = key.lower()
+    return "percent" in key_lower or "pct" in key_lower
+
+
+def _investing_value(value: Any) -> Optional[str]:
+    if isinstance(value, bool):
         return None
-    if isinstance(payload, list):
-        for item in payload:
-            candidate = _extract_percent_from_json(item)
-            if candidate:
-                return candidate
+    if isinstance(value, (int, float)):
+        return _format_percent_number(float(value))
+    if isinstance(value, str):
+        return _normalize_percent_text(value)
     return None
 
 
-def parse_investing_variation(html: str) -> Optional[str]:
+def parse_investing_variation(document: Document) -> Optional[str]:
     """Localiza a variação percentual no HTML do Investing."""
-    if not html:
+    if not document:
         return None
+    page = as_page(document)
+    html = page.html
 
     if html.lstrip().startswith(("{", "[")):
-        try:
-            payload = json.loads(html)
-        except json.JSONDecodeError:
-            payload = None
-        if payload is not None:
-            return _extract_percent_from_json(payload)
+        found = _json_variation(page, "investing", "percent|pct", _investing_key, _investing_value)
+        if found is not INVALID_JSON:
+            return found
 
-    soup = BeautifulSoup(html, "html.parser")
+    prescanned = _prescan_investing(html)
+    if prescanned is not NESTED:
+        return prescanned
+    soup = page.soup
 
     def _has_premarket_class(classes: object) -> bool:
         if not classes:
@@ -93,45 +345,39 @@ def _normalize_tradingview(text: str) -> str:
     return cleaned
 
 
-def _extract_tradingview_percent_json(payload: Any) -> Optional[str]:
-    if isinstance(payload, dict):
-        for key, value in payload.items():
-            key_lower = str(key).lower()
-            if isinstance(value, (dict, list)):
-                candidate = _extract_tradingview_percent_json(value)
-                if candidate:
-                    return candidate
-                continue
-            if "change" in key_lower and "percent" in key_lower:
-                if isinstance(value, (int, float)):
-                    return _normalize_tradingview(f"{value}")
-                if isinstance(value, str):
-                    normalized = _normalize_percent_text(value)
-                    if normalized:
-                        return normalized
+def _tradingview_key(key: str) -> bool:
+    key_lower = key.lower()
+    return "change" in key_lower and "percent" in key_lower
+
+
+def _tradingview_value(value: Any) -> Optional[str]:
+    if isinstance(value, bool):
         return None
-    if isinstance(payload, list):
-        for item in payload:
-            candidate = _extract_tradingview_percent_json(item)
-            if candidate:
-                return candidate
+    if isinstance(value, (int, float)):
+        return _normalize_tradingview(f"{value}")
+    if isinstance(value, str):
+        return _normalize_percent_text(value)
     return None
 
 
-def parse_tradingview_variation(html: str) -> Optional[str]:
+def parse_tradingview_variation(document: Document) -> Optional[str]:
     """Prioriza pré/pós-mercado; se não encontrar, usa variação regular."""
-    if not html:
+    if not document:
         return None
+    page = as_page(document)
+    html = page.html
 
     if html.lstrip().startswith(("{", "[")):
-        try:
-            payload = json.loads(html)
-        except json.JSONDecodeError:
-            payload = None
-        if payload is not None:
-            return _extract_tradingview_percent_json(payload)
+        found = _json_variation(
+            page, "tradingview", "percent", _tradingview_key, _tradingview_value
+        )
+        if found is not INVALID_JSON:
+            return found
 
-    soup = BeautifulSoup(html, "html.parser")
+    prescanned = _prescan_tradingview(html)
+    if prescanned is not NESTED:
+        return prescanned
+    soup = page.soup
 
     ext_span = soup.find("span", class_="js-symbol-ext-hrs-change-pt")
     if ext_span and ext_span.get_text(strip=True):
@@ -144,7 +390,7 @@ def parse_tradingview_variation(html: str) -> Optional[str]:
     return None
 
 
-ParserFunc = Callable[[str], Optional[str]]
+ParserFunc = Callable[[Document], Optional[str]]
 
 PARSER_BY_SOURCE = {
     "investing": parse_investing_variation,
@@ -0,0 +1,218 @@
+"""
+Retenção do histórico macro (task diária macro.tasks.prune_macro_history).
+
+1. source_excerpt é esvaziado nas variações com mais de EXCERPT_RETENTION_DAYS dias.
+2. Variações com mais de RAW_RETENTION_DAYS dias viram agregados por hora
+   (MacroVariationRollup) e são apagadas.
+3. Agregados por hora com mais de HOURLY_RETENTION_DAYS dias viram agregados por dia e são
+   apagados.
+
+Os cortes caem na meia-noite local e cada dia é processado (agregado + delete) numa
+transação própria, do mais antigo para o mais novo: uma execução interrompida recomeça de
+onde parou. Valor <= 0 desliga a etapa.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from macro.models import MacroVariation, MacroVariationRollup, RollupGranularity
+from macro.services import config
+
+EXCERPT_BATCH_SIZE = 5000
+ROLLUP_FIELDS = [
+    "samples",
+    "valid_samples",
+    "variation_first",
+    "variation_last",
+    "variation_min",
+    "variation_max",
+    "variation_avg",
+]
+
+
+@dataclass
+class Bucket:
+    """Agregado de uma janela; add/merge devem ser chamados em ordem cronológica."""
+
+    samples: int = 0
+    valid_samples: int = 0
+    total: float = 0.0
+    first: Optional[float] = None
+    last: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    def add(self, value: Optional[float]) -> None:
+        self.samples += 1
+        if value is None:
+            return
+        self.merge(Bucket(0, 1, value, value, value, value, value))
+
+    def merge(self, other: "Bucket") -> None:
+        self.samples += other.samples
+        self.valid_samples += other.valid_samples
+        self.total += other.total
+        if self.first is None:
+            self.first = other.first
+        if other.last is not None:
+            self.last = other.last
+        self.low = min((v for v in (self.low, other.low) if v is not None), default=None)
+        self.high = max((v for v in (self.high, other.high) if v is not None), default=None)
+
+    @classmethod
+    def from_rollup(cls, rollup: MacroVariationRollup) -> "Bucket":
+        return cls(
+            samples=rollup.samples,
+            valid_samples=rollup.valid_samples,
+            total=(rollup.variation_avg or 0.0) * rollup.valid_samples,
+            first=rollup.variation_first,
+            last=rollup.variation_last,
+            low=rollup.variation_min,
+            high=rollup.variation_max,
+        )
+
+    def fields(self) -> dict:
+        return {
+            "samples": self.samples,
+            "valid_samples": self.valid_samples,
+            "variation_first": self.first,
+            "variation_last": self.last,
+            "variation_min": self.low,
+            "variation_max": self.high,
+            "variation_avg": self.total / self.valid_samples if self.valid_samples else None,
+        }
+
+
+def _local_midnight(dt: datetime) -> datetime:
+    return timezone.localtime(dt).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _hour_start(dt: datetime) -> datetime:
+    return timezone.localtime(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def _cutoff(days: int, now: datetime) -> Optional[datetime]:
+    return _local_midnight(now - timedelta(days=days)) if days > 0 else None
+
+
+def _next_day(day: datetime) -> datetime:
+    # timedelta(days=1) + normalização: dias com troca de horário não têm 24 h
+    return _local_midnight(day + timedelta(days=1, hours=12))
+
+
+def _store(granularity: str, buckets: Dict[Tuple[int, datetime], Bucket]) -> int:
+    """Grava os agregados, somando aos já existentes na mesma janela (reexecuções)."""
+    if not buckets:
+        return 0
+    asset_ids = {asset_id for asset_id, _ in buckets}
+    starts = {start for _, start in buckets}
+    existing = MacroVariationRollup.objects.filter(
+        granularity=granularity, asset_id__in=asset_ids, bucket_start__in=starts
+    )
+    merged: Dict[Tuple[int, datetime], Bucket] = {}
+    for rollup in existing:
+        key = (rollup.asset_id, rollup.bucket_start)
+        if key in buckets:
+            merged[key] = Bucket.from_rollup(rollup)
+    for key, bucket in buckets.items():
+        merged.setdefault(key, Bucket()).merge(bucket)
+    MacroVariationRollup.objects.bulk_create(
+        [
+            MacroVariationRollup(
+                asset_id=asset_id, granularity=granularity, bucket_start=start, **bucket.fields()
+            )
+            for (asset_id, start), bucket in merged.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["asset", "granularity", "bucket_start"],
+        update_fields=ROLLUP_FIELDS,
+    )
+    return len(merged)
+
+
+def strip_old_excerpts(cutoff: datetime) -> int:
+    """Esvazia source_excerpt antes de cutoff, em lotes (sem um UPDATE gigante)."""
+    stale = MacroVariation.objects.filter(measurement_time__lt=cutoff).exclude(source_excerpt="")
+    total = 0
+    while True:
+        ids = list(stale.values_list("pk", flat=True)[:EXCERPT_BATCH_SIZE])
+        if not ids:
+            return total
+        total += MacroVariation.objects.filter(pk__in=ids).update(source_excerpt="")
+
+
+def _days_before(queryset, field: str, cutoff: datetime) -> Iterable[datetime]:
+    """Meia-noite local de cada dia com linhas antes de cutoff, do mais antigo em diante."""
+    while True:
+        oldest = (
+            queryset.filter(**{f"{field}__lt": cutoff})
+            .order_by(field)
+            .values_list(field, flat=True)
+            .first()
+        )
+        if oldest is None:
+            return
+        yield _local_midnight(oldest)
+
+
+def downsample_variations(cutoff: datetime) -> Tuple[int, int]:
+    """Variações antes de cutoff -> agregados por hora. Retorna (apagadas, agregados)."""
+    deleted = rollups = 0
+    for day in _days_before(MacroVariation.objects.all(), "measurement_time", cutoff):
+        window = MacroVariation.objects.filter(
+            measurement_time__gte=day, measurement_time__lt=min(_next_day(day), cutoff)
+        )
+        buckets: Dict[Tuple[int, datetime], Bucket] = {}
+        rows = window.order_by("measurement_time").values_list(
+            "asset_id", "measurement_time", "variation_decimal"
+        )
+        with transaction.atomic():
+            for asset_id, measured_at, value in rows.iterator():
+                buckets.setdefault((asset_id, _hour_start(measured_at)), Bucket()).add(value)
+            rollups += _store(RollupGranularity.HOUR, buckets)
+            deleted += window.delete()[0]
+    return deleted, rollups
+
+
+def downsample_hourly(cutoff: datetime) -> Tuple[int, int]:
+    """Agregados por hora antes de cutoff -> por dia. Retorna (apagados, agregados)."""
+    hourly = MacroVariationRollup.objects.filter(granularity=RollupGranularity.HOUR)
+    deleted = rollups = 0
+    for day in _days_before(hourly, "bucket_start", cutoff):
+        window = hourly.filter(bucket_start__gte=day, bucket_start__lt=min(_next_day(day), cutoff))
+        buckets: Dict[Tuple[int, datetime], Bucket] = {}
+        with transaction.atomic():
+            for rollup in window.order_by("bucket_start"):
+                key = (rollup.asset_id, day)
+                buckets.setdefault(key, Bucket()).merge(Bucket.from_rollup(rollup))
+            rollups += _store(RollupGranularity.DAY, buckets)
+            deleted += window.delete()[0]
+    return deleted, rollups
+
+
+def apply_retention(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Executa as três etapas; contagens para o log da task."""
+    now = now or timezone.now()
+    result = {
+        "excerpts_cleared": 0,
+        "variations_deleted": 0,
+        "hourly_rollups": 0,
+        "hourly_deleted": 0,
+        "daily_rollups": 0,
+    }
+    excerpt_cutoff = _cutoff(config.EXCERPT_RETENTION_DAYS, now)
+    if excerpt_cutoff is not None:
+        result["excerpts_cleared"] = strip_old_excerpts(excerpt_cutoff)
+    raw_cutoff = _cutoff(config.RAW_RETENTION_DAYS, now)
+    if raw_cutoff is not None:
+        result["variations_deleted"], result["hourly_rollups"] = downsample_variations(raw_cutoff)
+    hourly_cutoff = _cutoff(config.HOURLY_RETENTION_DAYS, now)
+    if hourly_cutoff is not None:
+        result["hourly_deleted"], result["daily_rollups"] = downsample_hourly(hourly_cutoff)
+    return result
@@ -0,0 +1,190 @@
+"""
+Score macro vetorizado (NumPy).
+
+Cada ativo pontua +1/-1 quando a variação ajustada pelo sinal de value_base passa do
+limiar |value_base|, e 0 caso contrário (ou sem variação). score_variations calcula o
+vetor do ciclo inteiro numa operação; totals_by_time agrega linhas do histórico por
+measurement_time, o que permite refazer os MacroScore quando value_base muda
+(recompute_scores, usado por import_macro_assets e recompute_macro_scores).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from macro.models import MacroAsset, MacroScore, MacroVariation
+
+UPDATE_BATCH_SIZE = 1000
+# Linhas por ida ao banco no cursor (server-side no PostgreSQL)
+CURSOR_CHUNK_SIZE = 5000
+SUM_TOLERANCE = 1e-9
+
+
+def score_variations(
+    variations: Sequence[Optional[float]], value_bases: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(scores, variações ajustadas) por ativo; None em variations conta como sem dado."""
+    values = np.asarray(variations, dtype=float)
+    bases = np.asarray(value_bases, dtype=float)
+    missing = np.isnan(values)
+    adjusted = np.where(missing, 0.0, values) * np.where(bases >= 0, 1.0, -1.0)
+    threshold = np.abs(bases)
+    scores = np.where(adjusted >= threshold, 1, np.where(adjusted <= -threshold, -1, 0))
+    scores[missing] = 0
+    return scores, adjusted
+
+
+def cycle_totals(
+    variations: Sequence[Optional[float]], value_bases: Sequence[float]
+) -> Tuple[int, float]:
+    """(total_score, variation_sum) de um ciclo."""
+    scores, adjusted = score_variations(variations, value_bases)
+    return int(scores.sum()), float(adjusted.sum())
+
+
+def totals_by_time(
+    rows: Iterable[Tuple[datetime, int, Optional[float]]], value_base_by_asset: Dict[int, float]
+) -> Dict[datetime, Tuple[int, float]]:
+    """
+    Agrega linhas (measurement_time, asset_id, variation_decimal) por horário, com os
+    value_base atuais. Ativos sem value_base conhecido (apagados) não pontuam.
+    """
+    times, asset_ids, variations = [], [], []
+    for measurement_time, asset_id, variation_decimal in rows:
+        times.append(measurement_time)
+        asset_ids.append(asset_id)
+        variations.append(variation_decimal)
+    if not times:
+        return {}
+    bases = np.array([value_base_by_asset.get(asset_id, np.nan) for asset_id in asset_ids])
+    known = ~np.isnan(bases)
+    scores, adjusted = score_variations(variations, np.where(known, bases, 0.0))
+    scores = np.where(known, scores, 0)
+    adjusted = np.where(known, adjusted, 0.0)
+
+    stamps = np.array([t.timestamp() for t in times])
+    unique_stamps, first_index, group = np.unique(stamps, return_index=True, return_inverse=True)
+    totals = np.bincount(group, weights=scores, minlength=len(unique_stamps))
+    sums = np.bincount(group, weights=adjusted, minlength=len(unique_stamps))
+    return {
+        times[index]: (int(round(total)), float(variation_sum))
+        for index, total, variation_sum in zip(first_index, totals, sums)
+    }
+
+
+def apply_totals(
+    totals: Dict[datetime, Tuple[int, float]],
+    batch_size: int = UPDATE_BATCH_SIZE,
+    write: bool = True,
+) -> int:
+    """Grava nos MacroScore existentes os totais que mudaram; retorna quantos."""
+    if not totals:
+        return 0
+    scores = MacroScore.objects.filter(
+        measurement_time__gte=min(totals), measurement_time__lte=max(totals)
+    ).only("id", "measurement_time", "total_score", "variation_sum")
+    changed = []
+    for score in scores.iterator(chunk_size=CURSOR_CHUNK_SIZE):
+        total = totals.get(score.measurement_time)
+        if total is None:
+            continue
+        total_score, variation_sum = total
+        if (
+            score.total_score != total_score
+            or abs(score.variation_sum - variation_sum) > SUM_TOLERANCE
+        ):
+            score.total_score, score.variation_sum = total_score, variation_sum
+            changed.append(score)
+    if write:
+        MacroScore.objects.bulk_update(
+            changed, ["total_score", "variation_sum"], batch_size=batch_size
+        )
+    return len(changed)
+
+
+@dataclass
+class WindowProgress:
+    """Andamento de recompute_scores, enviado a cada janela."""
+
+    start: datetime
+    end: datetime
+    index: int
+    windows: int
+    variations: int
+    scores: int
+    updated: int
+
+
+def _local_midnight(dt: datetime) -> datetime:
+    return timezone.localtime(dt).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _windows(start: datetime, end: datetime, days: int) -> Iterator[Tuple[datetime, datetime]]:
+    """Janelas de `days` dias alinhadas à meia-noite local, cobrindo [start, end)."""
+    current = _local_midnight(start)
+    while current < end:
+        # + 12 h e normalização: dias com troca de horário não têm 24 h
+        following = _local_midnight(current + timedelta(days=days, hours=12))
+        yield max(current, start), min(following, end)
+        current = following
+
+
+def recompute_scores(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_days: int = 1,
+    batch_size: int = UPDATE_BATCH_SIZE,
+    write: bool = True,
+    progress: Optional[Callable[[WindowProgress], None]] = None,
+) -> int:
+    """
+    Refaz total_score/variation_sum a partir das variações guardadas, com os value_base
+    atuais, janela a janela de chunk_days (memória limitada ao tamanho da janela).
+    Horários sem variações brutas (já agregadas pela retenção) ficam como estão.
+    Retorna quantos MacroScore mudaram (com write=False, quantos mudariam).
+    """
+    bounds = MacroVariation.objects.aggregate(
+        first=Min("measurement_time"), last=Max("measurement_time")
+    )
+    if bounds["first"] is None:
+        return 0
+    start = max(start, bounds["first"]) if start else bounds["first"]
+    last_plus = bounds["last"] + timedelta(microseconds=1)
+    end = min(end, last_plus) if end else last_plus
+    if start >= end:
+        return 0
+
+    value_base_by_asset = dict(MacroAsset.objects.values_list("id", "value_base"))
+    windows = list(_windows(start, end, max(1, chunk_days)))
+    updated = 0
+    for index, (window_start, window_end) in enumerate(windows, start=1):
+        rows = (
+            MacroVariation.objects.filter(
+                measurement_time__gte=window_start, measurement_time__lt=window_end
+            )
+            .order_by("measurement_time")
+            .values_list("measurement_time", "asset_id", "variation_decimal")
+        )
+        window_rows = list(rows.iterator(chunk_size=CURSOR_CHUNK_SIZE))
+        totals = totals_by_time(window_rows, value_base_by_asset)
+        window_updated = apply_totals(totals, batch_size=batch_size, write=write)
+        updated += window_updated
+        if progress is not None:
+            progress(
+                WindowProgress(
+                    window_start,
+                    window_end,
+                    index,
+                    len(windows),
+                    len(window_rows),
+                    len(totals),
+                    window_updated,
+                )
+            )
+    return updated
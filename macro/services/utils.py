@@ -2,9 +2,10 @@ import re
 from datetime import datetime
 from typing import Optional
 
-from bs4 import BeautifulSoup
 from django.utils import timezone
 
+from macro.services.parsers import Document, as_page
+
 
 def align_measurement_time(dt: datetime, interval_minutes: int = 5) -> datetime:
     """Alinha para o múltiplo inferior do intervalo (ex.: 12:07 -> 12:05)."""
@@ -13,11 +14,14 @@ def align_measurement_time(dt: datetime, interval_minutes: int = 5) -> datetime:
     return local_dt.replace(minute=minute, second=0, microsecond=0)
 
 
-def extract_relevant_text(html: str, max_chars: int = 6000) -> str:
-    """Extrai texto relevante do HTML (remove scripts/estilos)."""
-    if not html:
+def extract_relevant_text(document: Document, max_chars: int = 6000) -> str:
+    """
+    Extrai texto relevante do HTML (remove scripts/estilos). Com uma ParsedPage reaproveita
+    a árvore já construída pelo parser de variação (e remove os scripts dela).
+    """
+    if not document:
         return ""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = as_page(document).soup
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
     lines = [line.strip() for line in soup.get_text(separator="\n").splitlines() if line.strip()]
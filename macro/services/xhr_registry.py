@@ -0,0 +1,219 @@
+"""
+Registro dos endpoints XHR descobertos (Investing/TradingView), por URL do ativo.
+
+Cada registro mantém um dict em memória: o armazenamento é lido uma vez por ciclo
+(begin_cycle) e as alterações só são gravadas em flush_all, ao fim do ciclo, e apenas se
+algo mudou. Entradas mais velhas que o TTL são descartadas na leitura.
+
+Armazenamentos (config.XHR_REGISTRY_BACKEND):
+- "file": JSON em .cache/. A gravação trava um arquivo .lock (fcntl), relê o arquivo,
+  aplica só as mudanças deste processo e troca o arquivo via os.replace, então workers
+  concorrentes não perdem as descobertas uns dos outros.
+- "cache": cache do Django (Redis quando REDIS_CACHE_URL está definido), uma chave por
+  ativo com expiração = TTL; todos os workers compartilham os endpoints descobertos.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from macro.services import config
+
+try:
+    import fcntl
+except ImportError:  # Windows (dev): sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+Entry = Dict[str, str]
+
+
+def _resolve_path(path: str) -> Path:
+    cache_path = Path(path)
+    if cache_path.is_absolute():
+        return cache_path
+    try:
+        base_dir = Path(settings.BASE_DIR)
+    except Exception:
+        base_dir = Path.cwd()
+    return base_dir / cache_path
+
+
+class FileStore:
+    """JSON em disco; escrita atômica (arquivo temporário + os.replace) sob flock."""
+
+    def __init__(self, path: str):
+        self.path = _resolve_path(path)
+
+    def read_all(self) -> Dict[str, Entry]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def write(self, upserts: Dict[str, Entry], removals: Set[str], ttl: timedelta) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with open(lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            current = self.read_all()
+            current.update(upserts)
+            for url in removals:
+                current.pop(url, None)
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(current, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+class CacheStore:
+    """Cache do Django, uma chave por ativo (lida sob demanda e memorizada no ciclo)."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _key(self, url: str) -> str:
+        return f"macro:xhr:{self.name}:{hashlib.sha1(url.encode()).hexdigest()}"
+
+    def read(self, url: str) -> Optional[Entry]:
+        return cache.get(self._key(url))
+
+    def write(self, upserts: Dict[str, Entry], removals: Set[str], ttl: timedelta) -> None:
+        if upserts:
+            cache.set_many(
+                {self._key(url): entry for url, entry in upserts.items()},
+                timeout=int(ttl.total_seconds()),
+            )
+        if removals:
+            cache.delete_many([self._key(url) for url in removals])
+
+
+class XhrEndpointRegistry:
+    """Endpoints XHR por URL do ativo, em memória, com TTL e gravação só quando sujo."""
+
+    def __init__(self, name: str, path: str, ttl_hours: float):
+        self.name = name
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self._lock = threading.Lock()
+        self._store = None
+        self._entries: Dict[str, Optional[Entry]] = {}
+        self._loaded = False
+        self._upserts: Dict[str, Entry] = {}
+        self._removals: Set[str] = set()
+
+    @property
+    def store(self):
+        if self._store is None:
+            if config.XHR_REGISTRY_BACKEND == "cache":
+                self._store = CacheStore(self.name)
+            else:
+                self._store = FileStore(self.path)
+        return self._store
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._upserts or self._removals)
+
+    def _expired(self, entry: Entry) -> bool:
+        try:
+            updated_at = datetime.fromisoformat(entry.get("updated_at", ""))
+        except ValueError:
+            return True
+        return datetime.utcnow() - updated_at > self.ttl
+
+    def _lookup(self, url: str) -> Optional[Entry]:
+        store = self.store
+        if isinstance(store, FileStore):
+            if not self._loaded:
+                self._entries = store.read_all()
+                self._loaded = True
+        elif url not in self._entries:
+            self._entries[url] = store.read(url)
+        return self._entries.get(url)
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._lookup(url)
+            if not entry:
+                return None
+            if self._expired(entry):
+                self._drop(url)
+                return None
+            return entry.get("xhr_url")
+
+    def set(self, url: str, xhr_url: str) -> None:
+        entry = {"xhr_url": xhr_url, "updated_at": datetime.utcnow().isoformat()}
+        with self._lock:
+            self._entries[url] = entry
+            self._upserts[url] = entry
+            self._removals.discard(url)
+
+    def clear(self, url: str) -> None:
+        with self._lock:
+            if self._lookup(url):
+                self._drop(url)
+
+    def _drop(self, url: str) -> None:
+        self._entries[url] = None
+        self._upserts.pop(url, None)
+        self._removals.add(url)
+
+    def flush(self) -> bool:
+        """Grava as mudanças pendentes; False se não havia nada a gravar."""
+        with self._lock:
+            if not self.dirty:
+                return False
+            upserts, removals = self._upserts, self._removals
+            self._upserts, self._removals = {}, set()
+        try:
+            self.store.write(upserts, removals, self.ttl)
+        except Exception as exc:
+            logger.warning("[macro] Falha ao gravar registro XHR %s: %s", self.name, exc)
+            with self._lock:
+                self._upserts = {**upserts, **self._upserts}
+                self._removals |= removals - set(self._upserts)
+            return False
+        return True
+
+    def reload(self) -> None:
+        """Descarta o estado em memória (mudanças pendentes são gravadas antes)."""
+        self.flush()
+        with self._lock:
+            self._entries = {}
+            self._loaded = False
+
+
+investing_registry = XhrEndpointRegistry(
+    "investing", config.INVESTING_XHR_CACHE_PATH, config.INVESTING_XHR_CACHE_TTL_HOURS
+)
+tradingview_registry = XhrEndpointRegistry(
+    "tradingview", config.TRADINGVIEW_XHR_CACHE_PATH, config.TRADINGVIEW_XHR_CACHE_TTL_HOURS
+)
+REGISTRIES = (investing_registry, tradingview_registry)
+
+
+def begin_cycle() -> None:
+    """Início do ciclo: relê os registros (pega descobertas de outros workers)."""
+    for registry in REGISTRIES:
+        registry.reload()
+
+
+@atexit.register
+def flush_all() -> None:
+    for registry in REGISTRIES:
+        registry.flush()
@@ -3,10 +3,14 @@ from time import perf_counter
 from typing import Optional
 
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 from django.utils import timezone
 
+from macro import cache as api_cache
 from macro.services import config
+from macro.services.browser_pool import shutdown_browser_pool
 from macro.services.collector import execute_cycle
+from macro.services.retention import apply_retention
 from macro.services.utils import align_measurement_time, is_market_closed
 from trader_portal.observability import (
     Timer,
@@ -21,6 +25,16 @@ from trader_portal.observability import (
 logger = logging.getLogger(__name__)
 
 
+@worker_process_shutdown.connect
+def close_browser_pool(**kwargs) -> None:
+    """Fecha os navegadores do pool ao encerrar o processo do worker (prefork sai sem atexit)."""
+    shutdown_browser_pool()
+    if config.HTTP_BACKEND == "async":
+        from macro.services.async_network import shutdown_async_fetcher
+
+        shutdown_async_fetcher()
+
+
 @shared_task(
     bind=True,
     autoretry_for=(Exception,),
@@ -108,3 +122,20 @@ def collect_macro_cycle(self) -> None:
     finally:
         reset_correlation_id(token_correlation)
         reset_task_id(token_task)
+
+
+@shared_task
+def prune_macro_history() -> dict:
+    """Task diária: limpa trechos antigos e agrega o histórico antigo (hora -> dia)."""
+    with Timer() as timer:
+        result = apply_retention()
+        api_cache.publish_cycle()
+    log_event(
+        logger,
+        event="macro_retention_completed",
+        message="Retention finished",
+        status="success",
+        elapsed_ms=timer.duration_ms,
+        **result,
+    )
+    return result
@@ -2,10 +2,23 @@
 Testes do app macro - utils, parsers, collector e views.
 """
 
-from datetime import datetime
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
 from unittest.mock import patch
 from urllib.parse import urlencode
 
+import httpx
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -13,10 +26,34 @@ from django.utils import timezone
 from accounts.models import Plan
 from accounts.tests import create_profile, create_user
 
-from .models import MacroAsset, MacroScore, MacroVariation, SourceChoices
+from . import cache as api_cache
+from . import events
+from .models import (
+    MacroAsset,
+    MacroAssetLatest,
+    MacroScore,
+    MacroVariation,
+    MacroVariationRollup,
+    RollupGranularity,
+    SourceChoices,
+)
+from .services import breaker, config, network, parsers, retention, scoring
+from .services.async_network import AsyncFetcher
+from .services.browser_pool import BrowserHandle, BrowserPool, playwright_installed
 from .services.collector import _compute_score_and_adjusted_variation, execute_cycle
-from .services.parsers import parse_investing_variation, parse_tradingview_variation
-from .services.utils import align_measurement_time, is_market_closed, parse_variation_percent
+from .services.network import FetchOutcome
+from .services.parsers import (
+    ParsedPage,
+    parse_investing_variation,
+    parse_tradingview_variation,
+)
+from .services.utils import (
+    align_measurement_time,
+    extract_relevant_text,
+    is_market_closed,
+    parse_variation_percent,
+)
+from .services.xhr_registry import FileStore, XhrEndpointRegistry
 
 # ---------------------------------------------------------------------------
 # Utils
@@ -103,6 +140,12 @@ class IsMarketClosedTest(TestCase):
 # ---------------------------------------------------------------------------
 
 
+def _fixture_page(name):
+    return (Path(__file__).parent / "fixtures" / "pages" / f"{name}.html").read_text(
+        encoding="utf-8"
+    )
+
+
 class ParseInvestingVariationTest(TestCase):
     """Testes de parse_investing_variation."""
 
@@ -122,6 +165,72 @@ class ParseInvestingVariationTest(TestCase):
         self.assertIsNotNone(result)
         self.assertIn("%", result)
 
+    def test_json_primeira_chave_em_ordem_de_documento(self):
+        html = json.dumps(
+            {"a": {"b": [{"x": 1}, {"pctChange": 0.5}]}, "changePercent": 2, "pct": "9%"}
+        )
+        self.assertEqual(parse_investing_variation(html), "0.50%")
+
+    def test_json_aninhamento_profundo_sem_recursao(self):
+        html = '{"a":' * 5000 + '{"changePercent": 0.1}' + "}" * 5000
+        self.assertEqual(parse_investing_variation(html), "10.00%")
+
+    def test_json_invalido_segue_para_html(self):
+        html = '{"x": <span data-test="instrument-price-change-percent">+1,5%</span>'
+        self.assertEqual(parse_investing_variation(html), "+1.5%")
+
+    @patch.dict(parsers._learned_json_keys, clear=True)
+    def test_json_truncado_com_chave_candidata_nao_e_aceito(self):
+        url = "https://br.investing.com/x"
+        truncated = '{"data": {"changePercent": 0.36, "history": [1, 2'
+        self.assertIsNone(parse_investing_variation(truncated))
+
+        # Nem pela chave aprendida: o documento é validado antes da busca literal
+        whole = '{"data": {"changePercent": 0.36}}'
+        self.assertEqual(parse_investing_variation(ParsedPage(whole, key=url)), "0.36%")
+        self.assertIsNone(parse_investing_variation(ParsedPage(truncated, key=url)))
+        self.assertNotIn(("investing", url), parsers._learned_json_keys)
+
+    @patch.dict(parsers._learned_json_keys, clear=True)
+    def test_json_chave_aprendida_por_ativo(self):
+        url = "https://br.investing.com/x"
+        first = '{"meta": {"pct": ""}, "quote": {"changePercent": 0.3}}'
+        changed = '{"meta": {"pct": 1.5}, "quote": {"changePercent": 0.4}}'
+        self.assertEqual(parse_investing_variation(ParsedPage(first, key=url)), "0.30%")
+        self.assertEqual(parse_investing_variation(ParsedPage(changed, key=url)), "0.40%")
+        self.assertEqual(parse_investing_variation(changed), "1.50%")
+
+        renamed = '{"quote": {"pctChange": 0.5}}'
+        self.assertEqual(parse_investing_variation(ParsedPage(renamed, key=url)), "0.50%")
+        self.assertEqual(parsers._learned_json_keys[("investing", url)], "pctChange")
+
+    def test_paginas_salvas(self):
+        self.assertEqual(parse_investing_variation(_fixture_page("investing_ibov")), "+1.24%")
+        self.assertEqual(parse_investing_variation(_fixture_page("investing_premarket")), "-0.35%")
+
+    def test_pre_scan_resolve_sem_construir_arvore(self):
+        page = ParsedPage(_fixture_page("investing_premarket"))
+        with patch("macro.services.parsers.BeautifulSoup") as soup:
+            self.assertEqual(parse_investing_variation(page), "-0.35%")
+        soup.assert_not_called()
+
+    def test_markup_aninhado_cai_no_dom(self):
+        html = (
+            '<span data-test="instrument-price-change-percent">'
+            "<!-- -->(<!-- -->+0,36<!-- -->%)</span>"
+        )
+        self.assertEqual(parse_investing_variation(html), "+0.36%")
+
+    def test_arvore_compartilhada_com_extract_relevant_text(self):
+        html = _fixture_page("investing_ibov").replace("(+1,24%)", "<b>(+1,24%)</b>")
+        page = ParsedPage(html)
+        with patch("macro.services.parsers.BeautifulSoup", wraps=parsers.BeautifulSoup) as soup:
+            self.assertEqual(parse_investing_variation(page), "+1.24%")
+            excerpt = extract_relevant_text(page)
+        self.assertEqual(soup.call_count, 1)
+        self.assertIn("Previous Close", excerpt)
+        self.assertNotIn("dataLayer", excerpt)
+
 
 class ParseTradingviewVariationTest(TestCase):
     """Testes de parse_tradingview_variation."""
@@ -148,6 +257,25 @@ class ParseTradingviewVariationTest(TestCase):
         self.assertIsNotNone(result)
         self.assertTrue(result.startswith("REG:"))
 
+    def test_pagina_salva_ignora_ext_vazio(self):
+        self.assertEqual(
+            parse_tradingview_variation(_fixture_page("tradingview_us10y")), "REG:-0.48%"
+        )
+
+    def test_pre_scan_equivale_ao_dom(self):
+        cases = [
+            '<span class="a js-symbol-change-pt b">&minus;0.20%</span>',
+            '<span class="js-symbol-ext-hrs-change-pt"> </span>'
+            '<span class="js-symbol-change-pt">+1.5</span>',
+            '<span class="js-symbol-ext-hrs-change-pt"><i>+0.1%</i></span>',
+            '<div class="js-symbol-change-pt">+9%</div>',
+        ]
+        for html in cases:
+            with self.subTest(html=html):
+                with patch.object(parsers, "_prescan_tradingview", return_value=parsers.NESTED):
+                    expected = parse_tradingview_variation(html)
+                self.assertEqual(parse_tradingview_variation(html), expected)
+
 
 # ---------------------------------------------------------------------------
 # Collector
@@ -190,10 +318,119 @@ class ComputeScoreAndAdjustedVariationTest(TestCase):
         self.assertAlmostEqual(adj, -0.6)
 
 
+class ScoringTest(TestCase):
+    """Testes de macro.services.scoring (vetor do ciclo e replay do histórico)."""
+
+    def test_vetor_igual_a_regra_escalar(self):
+        def scalar(value_base, variation):
+            direction = 1 if value_base >= 0 else -1
+            adjusted = (variation or 0.0) * direction
+            if variation is None:
+                return 0, adjusted
+            if adjusted >= abs(value_base):
+                return 1, adjusted
+            if adjusted <= -abs(value_base):
+                return -1, adjusted
+            return 0, adjusted
+
+        cases = [
+            (base, variation)
+            for base in (0.5, -0.5, 0.0, 0.002, -0.01)
+            for variation in (None, 0.0, 0.6, -0.6, 0.5, -0.5, 0.002, -0.0019)
+        ]
+        scores, adjusted = scoring.score_variations(
+            [variation for _, variation in cases], [base for base, _ in cases]
+        )
+        for i, (base, variation) in enumerate(cases):
+            self.assertEqual((int(scores[i]), float(adjusted[i])), scalar(base, variation))
+
+    def test_recalcula_historico_com_novo_value_base(self):
+        asset_a = MacroAsset.objects.create(
+            name="A", url="https://a", value_base=0.5, source_key=SourceChoices.INVESTING
+        )
+        asset_b = MacroAsset.objects.create(
+            name="B", url="https://b", value_base=-0.1, source_key=SourceChoices.INVESTING
+        )
+        t0 = timezone.make_aware(datetime(2025, 2, 24, 10, 0))
+        t1 = t0 + timedelta(minutes=5)
+        for when, a_value, b_value in ((t0, 0.3, 0.2), (t1, None, -0.2)):
+            MacroVariation.objects.create(
+                asset=asset_a, measurement_time=when, variation_decimal=a_value, status="ok"
+            )
+            MacroVariation.objects.create(
+                asset=asset_b, measurement_time=when, variation_decimal=b_value, status="ok"
+            )
+            MacroScore.objects.create(measurement_time=when, total_score=0, variation_sum=0.0)
+        # Sem variações brutas (retenção): fica como está
+        untouched = MacroScore.objects.create(
+            measurement_time=t1 + timedelta(minutes=5), total_score=7, variation_sum=7.0
+        )
+
+        MacroAsset.objects.filter(pk=asset_a.pk).update(value_base=0.25)
+        self.assertEqual(scoring.recompute_scores(), 2)
+
+        first, second = MacroScore.objects.filter(measurement_time__lte=t1).order_by(
+            "measurement_time"
+        )
+        self.assertEqual(first.total_score, 0)  # A +1, B -1
+        self.assertAlmostEqual(first.variation_sum, 0.1)
+        self.assertEqual(second.total_score, 1)  # A sem dado, B +1
+        self.assertAlmostEqual(second.variation_sum, 0.2)
+        untouched.refresh_from_db()
+        self.assertEqual(untouched.total_score, 7)
+        self.assertEqual(scoring.recompute_scores(), 0)
+
+
+class RecomputeMacroScoresCommandTest(TestCase):
+    """Testes do comando recompute_macro_scores (janelas por dia, dry-run, progresso)."""
+
+    def setUp(self):
+        self.asset = MacroAsset.objects.create(
+            name="A", url="https://a", value_base=0.5, source_key=SourceChoices.INVESTING
+        )
+        day = timezone.make_aware(datetime(2025, 3, 3))
+        self.times = [day + timedelta(days=d, hours=h) for d in range(3) for h in (10, 23)]
+        for when in self.times:
+            MacroVariation.objects.create(
+                asset=self.asset, measurement_time=when, variation_decimal=0.3, status="ok"
+            )
+            MacroScore.objects.create(measurement_time=when, total_score=0, variation_sum=0.3)
+        self.asset.value_base = 0.2
+        self.asset.save()
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("recompute_macro_scores", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_nao_grava(self):
+        output = self._run("--dry-run")
+        self.assertIn("MacroScore seriam alterados (dry-run): 6", output)
+        self.assertFalse(MacroScore.objects.exclude(total_score=0).exists())
+
+    def test_recalcula_por_janela_e_respeita_intervalo(self):
+        with patch.object(scoring, "CURSOR_CHUNK_SIZE", 1):
+            output = self._run("--start=2025-03-04", "--batch-size=1")
+        self.assertEqual(output.count("variações"), 2)  # 04 e 05/03
+        self.assertIn("MacroScore alterados: 4", output)
+        self.assertEqual(
+            list(
+                MacroScore.objects.order_by("measurement_time").values_list(
+                    "total_score", flat=True
+                )
+            ),
+            [0, 0, 1, 1, 1, 1],
+        )
+
+
+INVESTING_HTML = '<span data-test="instrument-price-change-percent">%s</span>'
+
+
 class ExecuteCycleTest(TestCase):
     """Testes de execute_cycle com mock de fetch_html."""
 
     def setUp(self):
+        cache.clear()
         self.asset = MacroAsset.objects.create(
             name="Test Asset",
             url="https://br.investing.com/test",
@@ -224,6 +461,193 @@ class ExecuteCycleTest(TestCase):
         self.assertEqual(score.total_score, 1)
         self.assertAlmostEqual(score.variation_sum, 0.5)
 
+    def _create_assets(self, count, source):
+        return [
+            MacroAsset.objects.create(
+                name=f"{source} {i}",
+                url=f"https://example.com/{source}/{i}",
+                value_base=0.5,
+                source_key=source,
+                active=True,
+            )
+            for i in range(count)
+        ]
+
+    def test_coleta_concorrente_busca_ativos_em_paralelo(self):
+        from macro.services.network import FetchOutcome
+
+        self._create_assets(3, SourceChoices.INVESTING)
+        # Só passa da barreira se as 4 buscas estiverem em andamento ao mesmo tempo
+        barrier = threading.Barrier(4, timeout=5)
+
+        def fake_fetch(asset):
+            barrier.wait()
+            return FetchOutcome(html=INVESTING_HTML % "+50%", status="ok")
+
+        measurement_time = timezone.make_aware(datetime(2025, 2, 24, 10, 5, 0))
+        with (
+            patch("macro.services.collector.fetch_html", side_effect=fake_fetch),
+            patch("macro.services.collector.is_market_closed", return_value=False),
+            patch("macro.services.collector.time.sleep"),
+            patch.object(config, "COLLECT_CONCURRENCY", 4),
+            patch.dict(config.SOURCE_CONCURRENCY, {"investing": 4}),
+        ):
+            execute_cycle(measurement_time)
+
+        self.assertEqual(MacroVariation.objects.count(), 4)
+        self.assertEqual(MacroScore.objects.get().total_score, 4)
+
+    def test_coleta_concorrente_respeita_limite_por_fonte(self):
+        from macro.services.network import FetchOutcome
+
+        self._create_assets(5, SourceChoices.INVESTING)
+        lock = threading.Lock()
+        active = {"now": 0, "max": 0}
+
+        def fake_fetch(asset):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            threading.Event().wait(0.05)
+            with lock:
+                active["now"] -= 1
+            return FetchOutcome(html=INVESTING_HTML % "-50%", status="ok")
+
+        measurement_time = timezone.make_aware(datetime(2025, 2, 24, 10, 5, 0))
+        with (
+            patch("macro.services.collector.fetch_html", side_effect=fake_fetch),
+            patch("macro.services.collector.is_market_closed", return_value=False),
+            patch("macro.services.collector.time.sleep"),
+            patch.object(config, "COLLECT_CONCURRENCY", 6),
+            patch.dict(config.SOURCE_CONCURRENCY, {"investing": 2}),
+        ):
+            execute_cycle(measurement_time)
+
+        self.assertLessEqual(active["max"], 2)
+        self.assertEqual(MacroVariation.objects.count(), 6)
+        self.assertEqual(MacroScore.objects.get().total_score, -6)
+
+    def test_sessao_http_sobrevive_entre_ciclos(self):
+        # Cada ciclo cria um ThreadPoolExecutor novo; a sessão (e o pool keep-alive) fica
+        with patch.object(network, "_session", None):
+            sessions = []
+            for _ in range(2):
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    sessions.extend(pool.map(lambda _: network._get_session(), range(2)))
+        self.assertTrue(all(session is sessions[0] for session in sessions))
+
+    def _run_cycle(self, minute, outcome):
+        measurement_time = timezone.make_aware(datetime(2025, 2, 24, 10, minute, 0))
+        with (
+            patch("macro.services.collector.fetch_html", return_value=outcome),
+            patch("macro.services.collector.is_market_closed", return_value=False),
+            patch("macro.services.collector.time.sleep"),
+            patch("macro.services.collector.extract_relevant_text", return_value="") as extract,
+        ):
+            execute_cycle(measurement_time)
+        return MacroVariation.objects.get(measurement_time=measurement_time), extract
+
+    def test_payload_igual_repete_variacao_sem_parsing(self):
+        html = INVESTING_HTML % "+50%"
+        first, _ = self._run_cycle(5, FetchOutcome(html=html, status="ok", etag='"v1"'))
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.etag, '"v1"')
+        self.assertEqual(self.asset.content_bytes, len(html))
+        self.assertTrue(self.asset.content_hash)
+
+        second, extract = self._run_cycle(10, FetchOutcome(html=html, status="ok", etag='"v1"'))
+        extract.assert_not_called()
+        self.assertEqual(second.status, "ok")
+        self.assertEqual(second.block_reason, "unchanged")
+        self.assertEqual(second.variation_decimal, first.variation_decimal)
+        self.assertEqual(MacroScore.objects.order_by("measurement_time").last().total_score, 1)
+
+    def test_not_modified_repete_variacao_e_contabiliza_bytes_economizados(self):
+        html = INVESTING_HTML % "-50%"
+        self._run_cycle(5, FetchOutcome(html=html, status="ok", etag='"v1"'))
+
+        with self.assertLogs("macro.services.collector", level="INFO") as logs:
+            second, extract = self._run_cycle(10, FetchOutcome(html=None, status="not_modified"))
+        extract.assert_not_called()
+        self.assertEqual(second.block_reason, "not_modified")
+        self.assertAlmostEqual(second.variation_decimal, -0.5)
+        self.assertIsNone(second.payload_bytes)
+        report = next(line for line in logs.output if "macro_cycle_report" in line)
+        self.assertIn(f'"bytes_saved": {len(html)}', report)
+        self.assertIn('"unchanged": 1', report)
+
+    def test_payload_sem_variacao_limpa_marcadores(self):
+        self.asset.etag, self.asset.content_hash = '"v1"', "abc"
+        self.asset.save()
+        variation, _ = self._run_cycle(5, FetchOutcome(html="<html></html>", status="ok"))
+        self.assertEqual(variation.status, "no_data")
+        self.asset.refresh_from_db()
+        self.assertEqual((self.asset.etag, self.asset.content_hash), ("", ""))
+
+    def test_ultima_variacao_mantida_em_macroassetlatest(self):
+        self._run_cycle(10, FetchOutcome(html=INVESTING_HTML % "+50%", status="ok"))
+        latest = MacroAssetLatest.objects.get(asset=self.asset)
+        self.assertAlmostEqual(latest.variation_decimal, 0.5)
+
+        # Ciclo reprocessado para um horário anterior não retrocede o registro
+        self._run_cycle(5, FetchOutcome(html=INVESTING_HTML % "-50%", status="ok"))
+        latest.refresh_from_db()
+        self.assertAlmostEqual(latest.variation_decimal, 0.5)
+
+        # Sem histórico bruto (retenção), o fallback vem de MacroAssetLatest
+        MacroVariation.objects.all().delete()
+        variation, _ = self._run_cycle(15, FetchOutcome(html=None, status="blocked"))
+        self.assertEqual(variation.status, "fallback")
+        self.assertAlmostEqual(variation.variation_decimal, 0.5)
+
+    def test_disjuntor_do_ativo_abre_e_repete_ultima_variacao(self):
+        self._run_cycle(5, FetchOutcome(html=INVESTING_HTML % "+50%", status="ok"))
+        blocked = FetchOutcome(html=None, status="blocked", block_reason="captcha")
+        for minute in (10, 15, 20):
+            self._run_cycle(minute, blocked)
+
+        measurement_time = timezone.make_aware(datetime(2025, 2, 24, 10, 25, 0))
+        with (
+            patch("macro.services.collector.fetch_html") as mock_fetch,
+            patch("macro.services.collector.is_market_closed", return_value=False),
+            patch("macro.services.collector.time.sleep") as mock_sleep,
+        ):
+            execute_cycle(measurement_time)
+        mock_fetch.assert_not_called()
+        mock_sleep.assert_not_called()
+        variation = MacroVariation.objects.get(measurement_time=measurement_time)
+        self.assertEqual(variation.status, "fallback")
+        self.assertEqual(variation.block_reason, breaker.CIRCUIT_OPEN_REASON)
+        self.assertAlmostEqual(variation.variation_decimal, 0.5)
+
+        # Prazo vencido: sonda; nova falha reabre com o dobro do prazo
+        later = time.time() + config.BREAKER_BASE_COOLDOWN_SECONDS + 1
+        with patch("macro.services.breaker.time") as clock:
+            clock.time.return_value = later
+            self.assertTrue(breaker.allow(self.asset))
+            breaker.record(self.asset, "blocked", "captcha")
+            self.assertFalse(breaker.allow(self.asset))
+        state = cache.get(f"macro:breaker:asset:{self.asset.pk}")
+        self.assertEqual(state["open_until"], later + 2 * config.BREAKER_BASE_COOLDOWN_SECONDS)
+
+        breaker.record(self.asset, "ok")
+        self.assertTrue(breaker.allow(self.asset))
+
+    def test_disjuntor_da_fonte_libera_uma_sondagem(self):
+        others = self._create_assets(2, SourceChoices.INVESTING)
+        with patch.object(config, "BREAKER_SOURCE_THRESHOLD", 2):
+            breaker.record(self.asset, "fetch_error")
+            breaker.record(others[0], "blocked", "captcha")
+            self.assertFalse(breaker.allow(others[1]))
+
+            later = time.time() + config.BREAKER_BASE_COOLDOWN_SECONDS + 1
+            with patch("macro.services.breaker.time") as clock:
+                clock.time.return_value = later
+                self.assertTrue(breaker.allow(others[1]))
+                self.assertFalse(breaker.allow(self.asset))
+                breaker.record(others[1], "ok")
+                self.assertTrue(breaker.allow(self.asset))
+
     @patch("macro.services.collector.is_market_closed")
     def test_execute_cycle_nao_coleta_quando_mercado_fechado(self, mock_closed):
         mock_closed.return_value = True
@@ -235,6 +659,448 @@ class ExecuteCycleTest(TestCase):
         self.assertEqual(MacroScore.objects.count(), 0)
 
 
+# ---------------------------------------------------------------------------
+# Pool de navegadores
+# ---------------------------------------------------------------------------
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeBrowserHandle:
+    def __init__(self):
+        self.page = FakePage()
+        self.connected = True
+        self.closed = False
+
+    def is_healthy(self):
+        return self.connected and not self.page.is_closed()
+
+    def reset_page(self):
+        self.page = FakePage()
+
+    def close(self):
+        self.closed = True
+
+
+class BrowserPoolTest(TestCase):
+    """Testes do BrowserPool com navegador falso (sem Chromium)."""
+
+    def setUp(self):
+        self.handles = []
+
+        def launcher():
+            handle = FakeBrowserHandle()
+            self.handles.append(handle)
+            return handle
+
+        self.launcher = launcher
+
+    def test_reutiliza_navegador_e_pagina_entre_jobs(self):
+        pool = BrowserPool(size=1, max_pages=10, launcher=self.launcher)
+        pages = [pool.run(lambda page: page, timeout=5) for _ in range(3)]
+        pool.close()
+        self.assertEqual(pool.launches, 1)
+        self.assertIs(pages[0], pages[2])
+        self.assertTrue(self.handles[0].closed)
+
+    def test_recicla_apos_limite_de_paginas(self):
+        pool = BrowserPool(size=1, max_pages=2, launcher=self.launcher)
+        for _ in range(5):
+            pool.run(lambda page: None, timeout=5)
+        pool.close()
+        self.assertEqual(pool.launches, 3)
+        self.assertTrue(all(handle.closed for handle in self.handles))
+
+    def test_recria_navegador_que_caiu(self):
+        pool = BrowserPool(size=1, max_pages=10, launcher=self.launcher)
+
+        def crash(page):
+            self.handles[-1].connected = False
+            raise RuntimeError("Target closed")
+
+        with self.assertRaises(RuntimeError):
+            pool.run(crash, timeout=5)
+        pool.run(lambda page: None, timeout=5)
+        pool.close()
+        self.assertEqual(pool.launches, 2)
+        self.assertTrue(self.handles[0].closed)
+
+    def test_erro_no_job_troca_so_a_pagina(self):
+        pool = BrowserPool(size=1, max_pages=10, launcher=self.launcher)
+
+        def goto_error(page):
+            raise ValueError("goto")
+
+        first = pool.run(lambda page: page, timeout=5)
+        with self.assertRaises(ValueError):
+            pool.run(goto_error, timeout=5)
+        second = pool.run(lambda page: page, timeout=5)
+        pool.close()
+        self.assertEqual(pool.launches, 1)
+        self.assertIsNot(first, second)
+
+    def test_jobs_de_varias_threads_dividem_as_vagas(self):
+        pool = BrowserPool(size=2, max_pages=100, launcher=self.launcher)
+        results = []
+
+        def call():
+            results.append(pool.run(lambda page: threading.current_thread().name, timeout=5))
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.close()
+        self.assertEqual(len(results), 8)
+        self.assertLessEqual(pool.launches, 2)
+        self.assertTrue(set(results) <= {"macro-browser-0", "macro-browser-1"})
+
+
+def _chromium_available() -> bool:
+    if not playwright_installed():
+        return False
+    try:
+        BrowserHandle().close()
+    except Exception:
+        return False
+    return True
+
+
+class _StaticHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        body = INVESTING_HTML.replace("%s", "+1,25%").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BrowserPoolPlaywrightTest(TestCase):
+    """Coleta via Playwright real contra um servidor HTML estático local."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not _chromium_available():
+            raise unittest.SkipTest("Chromium do Playwright indisponível")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StaticHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.pool = BrowserPool(size=1, max_pages=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.server.shutdown()
+        super().tearDownClass()
+
+    def test_fetch_investing_playwright_reutiliza_navegador(self):
+        from macro.services import network
+
+        asset = MacroAsset(
+            name="Local",
+            url=f"http://127.0.0.1:{self.server.server_address[1]}/",
+            value_base=0.5,
+            source_key=SourceChoices.INVESTING,
+        )
+        with (
+            patch.object(network, "get_browser_pool", return_value=self.pool),
+            patch.object(config, "PLAYWRIGHT_WAIT_MS", 0),
+        ):
+            outcomes = [network._fetch_investing_playwright(asset) for _ in range(3)]
+        self.assertTrue(all(outcome.status == "ok" for outcome in outcomes))
+        self.assertEqual(parse_investing_variation(outcomes[0].html), "+1.25%")
+        self.assertEqual(self.pool.launches, 2)
+
+
+# ---------------------------------------------------------------------------
+# Backend HTTP assíncrono
+# ---------------------------------------------------------------------------
+
+
+class AsyncFetcherTest(TestCase):
+    """Testes de AsyncFetcher com httpx.MockTransport (sem rede)."""
+
+    def setUp(self):
+        self.asset = MacroAsset(
+            name="Async",
+            url="https://br.investing.com/indices/test",
+            value_base=0.5,
+            source_key=SourceChoices.INVESTING,
+        )
+        self.requests = []
+
+    def _fetcher(self, handler, **kwargs):
+        def record(request):
+            self.requests.append(request)
+            return handler(request)
+
+        fetcher = AsyncFetcher(transport=httpx.MockTransport(record), **kwargs)
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+    def test_retorna_html_e_reutiliza_cliente_por_host(self):
+        fetcher = self._fetcher(lambda request: httpx.Response(200, text=INVESTING_HTML % "+1,25%"))
+        with patch.object(config, "INVESTING_XHR_ENABLED", False):
+            outcomes = [fetcher.fetch(self.asset) for _ in range(3)]
+
+        self.assertTrue(all(outcome.status == "ok" for outcome in outcomes))
+        self.assertEqual(parse_investing_variation(outcomes[0].html), "+1.25%")
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(list(fetcher._clients), ["br.investing.com"])
+
+    def test_bloqueio_usa_url_de_fallback(self):
+        def handler(request):
+            if request.url.host == "br.investing.com":
+                return httpx.Response(403)
+            return httpx.Response(200, text=INVESTING_HTML % "-0,50%")
+
+        fetcher = self._fetcher(handler)
+        with patch.object(config, "INVESTING_XHR_ENABLED", False):
+            outcome = fetcher.fetch(self.asset)
+
+        self.assertEqual(outcome.status, "ok")
+        self.assertEqual(parse_investing_variation(outcome.html), "-0.50%")
+        self.assertTrue(str(self.requests[1].url).startswith(config.FALLBACK_HOST))
+
+    def test_captcha_em_todas_as_tentativas_marca_bloqueio(self):
+        fetcher = self._fetcher(lambda request: httpx.Response(200, text="Just a moment..."))
+        with (
+            patch.object(config, "INVESTING_XHR_ENABLED", False),
+            patch.object(config, "RETRY_BACKOFF_RANGE", (0, 0)),
+            patch(
+                "macro.services.network._fetch_investing_playwright",
+                return_value=FetchOutcome(html=None, status="fetch_error"),
+            ) as playwright_fallback,
+        ):
+            outcome = fetcher.fetch(self.asset)
+
+        self.assertEqual(outcome.status, "blocked")
+        self.assertEqual(outcome.block_reason, "captcha")
+        self.assertEqual(len(self.requests), config.MAX_FETCH_ATTEMPTS)
+        playwright_fallback.assert_called_once()
+
+    def test_envia_validadores_e_trata_304(self):
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, text=INVESTING_HTML % "+1%", headers={"ETag": '"v1"'})
+
+        fetcher = self._fetcher(handler)
+        with patch.object(config, "INVESTING_XHR_ENABLED", False):
+            first = fetcher.fetch(self.asset)
+            self.asset.etag = first.etag
+            second = fetcher.fetch(self.asset)
+
+        self.assertEqual((first.status, first.etag), ("ok", '"v1"'))
+        self.assertEqual(second.status, "not_modified")
+        self.assertIsNone(second.html)
+
+    def test_limita_conexoes_simultaneas_por_host(self):
+        active = {"now": 0, "peak": 0}
+
+        async def handler(request):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.02)
+            active["now"] -= 1
+            return httpx.Response(200, text=INVESTING_HTML % "+1%")
+
+        fetcher = self._fetcher(handler, max_per_host=2)
+        with (
+            patch.object(config, "INVESTING_XHR_ENABLED", False),
+            ThreadPoolExecutor(max_workers=6) as executor,
+        ):
+            outcomes = list(executor.map(fetcher.fetch, [self.asset] * 6))
+
+        self.assertTrue(all(outcome.status == "ok" for outcome in outcomes))
+        self.assertEqual(active["peak"], 2)
+
+    def test_fetch_html_despacha_para_backend_async(self):
+        expected = FetchOutcome(html="x", status="ok")
+        with (
+            patch.object(config, "HTTP_BACKEND", "async"),
+            patch("macro.services.async_network.get_async_fetcher") as get_fetcher,
+        ):
+            get_fetcher.return_value.fetch.return_value = expected
+            self.assertIs(network.fetch_html(self.asset), expected)
+        get_fetcher.return_value.fetch.assert_called_once_with(self.asset)
+
+
+# ---------------------------------------------------------------------------
+# Registro de endpoints XHR
+# ---------------------------------------------------------------------------
+
+
+class XhrEndpointRegistryTest(TestCase):
+    """Testes de XhrEndpointRegistry (arquivo e cache do Django)."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "xhr.json")
+
+    def _registry(self, ttl_hours=24):
+        return XhrEndpointRegistry("investing", self.path, ttl_hours)
+
+    def test_le_arquivo_uma_vez_e_grava_so_no_flush(self):
+        registry = self._registry()
+        self.assertFalse(registry.flush())
+        with patch.object(FileStore, "read_all", autospec=True, return_value={}) as read_all:
+            for i in range(5):
+                registry.get(f"https://a/{i}")
+            registry.set("https://a/1", "https://api/1")
+            self.assertEqual(registry.get("https://a/1"), "https://api/1")
+        self.assertEqual(read_all.call_count, 1)
+        self.assertFalse(Path(self.path).exists())
+
+        self.assertTrue(registry.flush())
+        self.assertFalse(registry.flush())
+        self.assertEqual(self._registry().get("https://a/1"), "https://api/1")
+
+    def test_ttl_descarta_e_remove_do_arquivo(self):
+        stale = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+        Path(self.path).write_text(
+            json.dumps({"https://a/1": {"xhr_url": "https://api/1", "updated_at": stale}})
+        )
+        registry = self._registry(ttl_hours=1)
+        self.assertIsNone(registry.get("https://a/1"))
+        self.assertTrue(registry.flush())
+        self.assertEqual(json.loads(Path(self.path).read_text()), {})
+
+    def test_flush_preserva_gravacoes_de_outros_processos(self):
+        first, second = self._registry(), self._registry()
+        first.get("https://a/1")
+        second.get("https://a/2")
+        first.set("https://a/1", "https://api/1")
+        second.set("https://a/2", "https://api/2")
+        first.flush()
+        second.flush()
+
+        reloaded = self._registry()
+        self.assertEqual(reloaded.get("https://a/1"), "https://api/1")
+        self.assertEqual(reloaded.get("https://a/2"), "https://api/2")
+
+    def test_backend_cache_compartilha_entre_instancias(self):
+        cache.clear()
+        with patch.object(config, "XHR_REGISTRY_BACKEND", "cache"):
+            writer, reader = self._registry(), self._registry()
+            writer.set("https://a/1", "https://api/1")
+            self.assertIsNone(reader.get("https://a/1"))
+            writer.flush()
+            self.assertIsNone(reader.get("https://a/1"), "memorizado até o próximo ciclo")
+            reader.reload()
+            self.assertEqual(reader.get("https://a/1"), "https://api/1")
+
+            writer.clear("https://a/1")
+            writer.flush()
+            reader.reload()
+            self.assertIsNone(reader.get("https://a/1"))
+        self.assertFalse(Path(self.path).exists())
+
+
+# ---------------------------------------------------------------------------
+# Retenção
+# ---------------------------------------------------------------------------
+
+
+class RetentionTest(TestCase):
+    """Testes de macro.services.retention (trechos, agregação por hora e por dia)."""
+
+    def setUp(self):
+        self.asset = MacroAsset.objects.create(
+            name="Retention Asset",
+            url="https://br.investing.com/retention",
+            value_base=1,
+            source_key=SourceChoices.INVESTING,
+        )
+        self.now = timezone.make_aware(datetime(2025, 6, 20, 12, 0))
+
+    def _variation(self, when, value, excerpt="trecho"):
+        return MacroVariation.objects.create(
+            asset=self.asset,
+            measurement_time=when,
+            variation_decimal=value,
+            status="ok" if value is not None else "error",
+            source_excerpt=excerpt,
+        )
+
+    def test_remove_trechos_antigos(self):
+        old = self._variation(self.now - timedelta(days=8), 0.01)
+        recent = self._variation(self.now - timedelta(days=1), 0.02)
+        with patch.object(retention, "EXCERPT_BATCH_SIZE", 1):
+            cleared = retention.strip_old_excerpts(self.now - timedelta(days=7))
+        self.assertEqual(cleared, 1)
+        old.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(old.source_excerpt, "")
+        self.assertEqual(recent.source_excerpt, "trecho")
+
+    def test_agrega_variacoes_antigas_por_hora(self):
+        hour = timezone.make_aware(datetime(2025, 3, 10, 10, 0))
+        for minute, value in [(0, 0.02), (5, None), (10, -0.01), (15, 0.05), (20, 0.03)]:
+            self._variation(hour + timedelta(minutes=minute), value)
+        self._variation(hour + timedelta(hours=1), 0.04)
+        recent = self._variation(self.now - timedelta(days=1), 0.02)
+
+        with (
+            patch.object(config, "EXCERPT_RETENTION_DAYS", 0),
+            patch.object(config, "RAW_RETENTION_DAYS", 90),
+            patch.object(config, "HOURLY_RETENTION_DAYS", 0),
+        ):
+            result = retention.apply_retention(now=self.now)
+
+        self.assertEqual(result["variations_deleted"], 6)
+        self.assertEqual(result["hourly_rollups"], 2)
+        self.assertEqual(list(MacroVariation.objects.values_list("pk", flat=True)), [recent.pk])
+        rollup = MacroVariationRollup.objects.get(
+            granularity=RollupGranularity.HOUR, bucket_start=hour
+        )
+        self.assertEqual((rollup.samples, rollup.valid_samples), (5, 4))
+        self.assertEqual((rollup.variation_first, rollup.variation_last), (0.02, 0.03))
+        self.assertEqual((rollup.variation_min, rollup.variation_max), (-0.01, 0.05))
+        self.assertAlmostEqual(rollup.variation_avg, 0.0225)
+
+    def test_reexecucao_soma_ao_agregado_existente(self):
+        hour = timezone.make_aware(datetime(2025, 3, 10, 10, 0))
+        cutoff = timezone.make_aware(datetime(2025, 3, 11))
+        self._variation(hour, 0.01)
+        retention.downsample_variations(cutoff)
+        self._variation(hour + timedelta(minutes=30), 0.03)
+        retention.downsample_variations(cutoff)
+
+        rollup = MacroVariationRollup.objects.get(bucket_start=hour)
+        self.assertEqual(rollup.samples, 2)
+        self.assertEqual((rollup.variation_first, rollup.variation_last), (0.01, 0.03))
+        self.assertAlmostEqual(rollup.variation_avg, 0.02)
+
+    def test_agrega_horas_antigas_por_dia(self):
+        day = timezone.make_aware(datetime(2023, 1, 5))
+        for hour, value in [(10, 0.01), (11, -0.02), (12, 0.04)]:
+            self._variation(day + timedelta(hours=hour), value)
+        retention.downsample_variations(day + timedelta(days=1))
+        deleted, created = retention.downsample_hourly(day + timedelta(days=1))
+
+        self.assertEqual((deleted, created), (3, 1))
+        daily = MacroVariationRollup.objects.get()
+        self.assertEqual(daily.granularity, RollupGranularity.DAY)
+        self.assertEqual(daily.bucket_start, day)
+        self.assertEqual((daily.samples, daily.valid_samples), (3, 3))
+        self.assertEqual((daily.variation_first, daily.variation_last), (0.01, 0.04))
+        self.assertEqual((daily.variation_min, daily.variation_max), (-0.02, 0.04))
+        self.assertAlmostEqual(daily.variation_avg, 0.01)
+
+
 # ---------------------------------------------------------------------------
 # Views
 # ---------------------------------------------------------------------------
@@ -243,6 +1109,9 @@ class ExecuteCycleTest(TestCase):
 class LatestScoresViewTest(TestCase):
     """Testes da view latest_scores."""
 
+    def setUp(self):
+        cache.clear()
+
     def test_retorna_200_com_results_vazio(self):
         response = self.client.get(reverse("macro:latest_scores"))
         self.assertEqual(response.status_code, 200)
@@ -276,6 +1145,7 @@ class LatestVariationsViewTest(TestCase):
     """Testes da view latest_variations."""
 
     def setUp(self):
+        cache.clear()
         self.asset = MacroAsset.objects.create(
             name="Test",
             url="https://example.com",
@@ -322,6 +1192,230 @@ class LatestVariationsViewTest(TestCase):
         self.assertEqual(len(response.json()["results"]), 0)
 
 
+class MacroApiCacheTest(TestCase):
+    """Testes de macro.cache: payload por ciclo, ETag/304 e baldes de since."""
+
+    def setUp(self):
+        cache.clear()
+        self.asset = MacroAsset.objects.create(
+            name="Cache",
+            url="https://example.com/cache",
+            value_base=0.5,
+            source_key=SourceChoices.INVESTING,
+        )
+        self.base = timezone.make_aware(datetime(2025, 2, 24, 10, 0))
+
+    def _variation(self, minutes, text):
+        MacroVariation.objects.create(
+            asset=self.asset,
+            measurement_time=self.base + timedelta(minutes=minutes),
+            variation_text=text,
+            status="ok",
+        )
+
+    def test_etag_responde_304_ate_o_proximo_ciclo(self):
+        self._variation(0, "+1%")
+        api_cache.publish_cycle()
+        url = reverse("macro:latest_variations")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("no-cache", first["Cache-Control"])
+        self.assertTrue(first.has_header("Last-Modified"))
+
+        with patch.object(api_cache, "_variation_rows") as rows:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        rows.assert_not_called()
+
+        self._variation(5, "+2%")
+        api_cache.publish_cycle()
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+        self.assertEqual([r["variation_text"] for r in fresh.json()["results"]], ["+2%", "+1%"])
+
+    def test_payload_montado_no_ciclo_dispensa_consulta(self):
+        MacroScore.objects.create(measurement_time=self.base, total_score=3, variation_sum=1.0)
+        api_cache.publish_cycle()
+        with patch.object(api_cache, "_score_rows") as rows:
+            response = self.client.get(reverse("macro:latest_scores") + "?limit=40")
+        rows.assert_not_called()
+        self.assertEqual(response.json()["results"][0]["total_score"], 3)
+
+    def test_formato_colunar_equivale_as_linhas(self):
+        other = MacroAsset.objects.create(
+            name="Outro", url="https://example.com/b", value_base=1, source_key="tradingview"
+        )
+        for minutes in (0, 5):
+            self._variation(minutes, f"+{minutes}%")
+            MacroVariation.objects.create(
+                asset=other,
+                measurement_time=self.base + timedelta(minutes=minutes),
+                variation_decimal=-0.01,
+                status="fallback",
+                market_phase="ext",
+            )
+        url = reverse("macro:latest_variations")
+        rows = self.client.get(url).json()["results"]
+        columnar = self.client.get(url + "?format=columnar").json()
+
+        self.assertEqual(columnar["count"], 4)
+        self.assertEqual(sorted(columnar["assets"]["name"]), ["Cache", "Outro"])
+        decoded = []
+        for i in range(columnar["count"]):
+            asset = columnar["asset"][i]
+            decoded.append(
+                {
+                    "asset": columnar["assets"]["name"][asset],
+                    "category": columnar["assets"]["category"][asset],
+                    "source_key": columnar["assets"]["source_key"][asset],
+                    "measurement_time": columnar["measurement_time"][i],
+                    "variation_text": columnar["variation_text"][i],
+                    "variation_decimal": columnar["variation_decimal"][i],
+                    **{
+                        field: columnar[field]["values"][columnar[field]["index"][i]]
+                        for field in ("status", "block_reason", "market_phase")
+                    },
+                }
+            )
+        for row in rows:
+            row["measurement_time"] = int(
+                datetime.fromisoformat(row["measurement_time"]).timestamp()
+            )
+        key = lambda row: (row["measurement_time"], row["asset"])  # noqa: E731
+        self.assertEqual(sorted(decoded, key=key), sorted(rows, key=key))
+
+    def test_resposta_comprimida_e_revalidada_com_etag_fraco(self):
+        for minutes in range(0, 60, 5):
+            self._variation(minutes, "+1%")
+        url = reverse("macro:latest_variations")
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith("W/"))
+        cached = self.client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_since_no_meio_do_balde_corta_exatamente(self):
+        for minutes in range(0, 30, 5):
+            self._variation(minutes, f"+{minutes}%")
+        api_cache.publish_cycle()
+        url = reverse("macro:latest_variations")
+        since = self.base + timedelta(minutes=12)
+        response = self.client.get(url + "?" + urlencode({"since": since.isoformat()}))
+        texts = [r["variation_text"] for r in response.json()["results"]]
+        self.assertEqual(texts, ["+25%", "+20%", "+15%"])
+
+        # Outro since no mesmo balde reaproveita as linhas já em cache
+        since = self.base + timedelta(minutes=11)
+        with patch.object(api_cache, "_variation_rows") as rows:
+            response = self.client.get(url + "?" + urlencode({"since": since.isoformat()}))
+        rows.assert_not_called()
+        self.assertEqual(len(response.json()["results"]), 3)
+
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:  # fakeredis é dependência de desenvolvimento
+    fakeredis = None
+
+
+async def _next_frame(stream):
+    async for frame in stream:
+        if not frame.startswith(":"):  # ignora heartbeats
+            return frame
+
+
+class MacroEventsTest(TestCase):
+    """Testes do push SSE (macro.events) com o Redis em memória do fakeredis."""
+
+    def setUp(self):
+        cache.clear()
+        self.asset = MacroAsset.objects.create(
+            name="Stream",
+            url="https://br.investing.com/stream",
+            value_base=0.5,
+            source_key=SourceChoices.INVESTING,
+        )
+
+    def test_stream_desligado_responde_204(self):
+        with patch.object(config, "SSE_ENABLED", False):
+            response = self.client.get(reverse("macro:stream"))
+        self.assertEqual(response.status_code, 204)
+
+    def test_delta_leva_so_variacoes_alteradas(self):
+        same = MacroVariation(
+            asset=self.asset,
+            variation_text="+1%",
+            variation_decimal=0.01,
+            market_phase="",
+            status="ok",
+        )
+        moved = MacroVariation(
+            asset=self.asset, variation_text="+2%", variation_decimal=0.02, market_phase=""
+        )
+        fallback = MacroVariation(
+            asset=self.asset,
+            variation_text="+1%",
+            variation_decimal=0.01,
+            market_phase="",
+            status="fallback",
+        )
+        last = {
+            self.asset.id: {
+                "variation_text": "+1%",
+                "variation_decimal": 0.01,
+                "market_phase": "",
+                "status": "ok",
+            }
+        }
+        self.assertEqual(
+            events.changed_variations([same, moved, fallback], last), [moved, fallback]
+        )
+
+    @unittest.skipIf(fakeredis is None, "fakeredis não instalado")
+    def test_ciclo_publica_delta_para_o_stream(self):
+        server = fakeredis.FakeServer()
+        measurement_time = timezone.make_aware(datetime(2025, 2, 24, 10, 5, 0))
+
+        def run_cycle():
+            with (
+                patch("macro.services.collector.fetch_html") as mock_fetch,
+                patch("macro.services.collector.is_market_closed", return_value=False),
+                patch("macro.services.collector.time.sleep"),
+            ):
+                mock_fetch.return_value = FetchOutcome(html=INVESTING_HTML % "+50%", status="ok")
+                execute_cycle(measurement_time)
+
+        with (
+            patch.object(config, "SSE_ENABLED", True),
+            patch.object(config, "EVENTS_REDIS_URL", "redis://fake"),
+            patch.object(events, "_redis", lambda: fakeredis.FakeRedis(server=server)),
+            patch.object(
+                events,
+                "_async_redis",
+                lambda: fakeredis.aioredis.FakeRedis(server=server),
+            ),
+        ):
+            loop = asyncio.new_event_loop()
+            self.addCleanup(loop.close)
+            stream = events.stream(max_seconds=5)
+            retry = loop.run_until_complete(anext(stream))  # já inscrito no canal
+            run_cycle()
+            frame = loop.run_until_complete(_next_frame(stream))
+            loop.run_until_complete(stream.aclose())
+
+        self.assertEqual(retry, f"retry: {events.RETRY_MS}\n\n")
+        lines = frame.strip().split("\n")
+        self.assertEqual(lines[0], f"id: {api_cache.get_version()}")
+        self.assertEqual(lines[1], "event: cycle")
+        delta = json.loads(lines[2].removeprefix("data: "))
+        self.assertEqual(delta["score"]["total_score"], 1)
+        self.assertEqual([v["asset"] for v in delta["variations"]], ["Stream"])
+
+
 class SMCDashboardViewTest(TestCase):
     """Testes das views de painel (PlanRequiredMixin)."""
 
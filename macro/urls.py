@@ -10,4 +10,5 @@ urlpatterns = [
     path("painel/clean/", views.SMCCleanView.as_view(), name="painel_clean"),
     path("scores/", views.latest_scores, name="latest_scores"),
     path("variations/", views.latest_variations, name="latest_variations"),
+    path("stream/", views.macro_stream, name="stream"),
 ]
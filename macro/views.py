@@ -1,11 +1,15 @@
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.dateparse import parse_datetime
-from django.views.decorators.http import require_GET
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
 from django.views.generic import TemplateView
 
 from accounts.mixins import PlanRequiredMixin
 from accounts.models import Plan
-from macro.models import MacroScore, MacroVariation
+from macro import cache as api_cache
+from macro import events
 
 
 def _parse_limit(request, default=50, max_limit=500):
@@ -21,47 +25,66 @@ def _parse_since(request):
     if not raw:
         return None
     dt = parse_datetime(raw)
-    return dt
+    return api_cache.normalize_since(dt)
 
 
+def _parse_format(request):
+    fmt = request.GET.get("format", "rows")
+    return fmt if fmt in api_cache.FORMATS else "rows"
+
+
+def _last_modified(request):
+    return api_cache.last_modified()
+
+
+def _etag_for(name: str, default_limit: int, with_since: bool = False):
+    def etag_func(request):
+        since = _parse_since(request) if with_since else None
+        limit = _parse_limit(request, default=default_limit)
+        return api_cache.etag(name, limit, since, _parse_format(request))
+
+    return etag_func
+
+
+def _json_payload(body: bytes) -> HttpResponse:
+    return HttpResponse(body, content_type="application/json")
+
+
+# Payloads montados no fim de cada ciclo (macro.cache); no-cache faz o navegador revalidar
+# com If-None-Match e receber 304 enquanto não houver ciclo novo. gzip_page comprime o
+# corpo quando o cliente aceita (ETag vira fraco, o que o condition() aceita).
 @require_GET
+@gzip_page
+@cache_control(no_cache=True)
+@condition(etag_func=_etag_for("scores", 100), last_modified_func=_last_modified)
 def latest_scores(request):
     limit = _parse_limit(request, default=100)
-    qs = MacroScore.objects.order_by("-measurement_time")[:limit]
-    data = [
-        {
-            "measurement_time": s.measurement_time,
-            "total_score": s.total_score,
-            "variation_sum": s.variation_sum,
-        }
-        for s in qs
-    ]
-    return JsonResponse({"results": data})
+    return _json_payload(api_cache.payload("scores", limit, fmt=_parse_format(request)))
 
 
 @require_GET
+@gzip_page
+@cache_control(no_cache=True)
+@condition(
+    etag_func=_etag_for("variations", 200, with_since=True),
+    last_modified_func=_last_modified,
+)
 def latest_variations(request):
     limit = _parse_limit(request, default=200)
     since = _parse_since(request)
-    qs = MacroVariation.objects.select_related("asset").order_by("-measurement_time")
-    if since:
-        qs = qs.filter(measurement_time__gte=since)
-    qs = qs[:limit]
-    data = [
-        {
-            "asset": v.asset.name,
-            "category": v.asset.category,
-            "source_key": v.asset.source_key,
-            "measurement_time": v.measurement_time,
-            "variation_text": v.variation_text,
-            "variation_decimal": v.variation_decimal,
-            "status": v.status,
-            "block_reason": v.block_reason,
-            "market_phase": v.market_phase,
-        }
-        for v in qs
-    ]
-    return JsonResponse({"results": data})
+    return _json_payload(api_cache.payload("variations", limit, since, fmt=_parse_format(request)))
+
+
+@transaction.non_atomic_requests
+@require_GET
+async def macro_stream(request):
+    """SSE com o delta de cada ciclo (macro.events); 204 = desligado, painel usa polling."""
+    if not events.enabled():
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(events.stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 class SMCDashboardView(PlanRequiredMixin, TemplateView):
@@ -118,14 +118,27 @@ DATABASES["default"]["ATOMIC_REQUESTS"] = True
 # --------------------------------------------------------------------------------------
 # Cache (rate limiting, etc.)
 # --------------------------------------------------------------------------------------
-# LocMemCache funciona para rate limiting em dev. Em produção com múltiplos workers,
-# considere Redis: django.core.cache.backends.redis.RedisCache
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "smc-default",
+# LocMemCache funciona para rate limiting em dev. Com REDIS_CACHE_URL definido, usa Redis
+# (compartilhado entre workers do gunicorn; necessário para o cache dos dashboards).
+REDIS_CACHE_URL = env("REDIS_CACHE_URL", default="")
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+            "KEY_PREFIX": "smc",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "smc-default",
+        }
     }
-}
+
+# Tempo (s) que os dashboards calculados ficam em cache; invalidação é por versão (signals)
+TRADES_DASHBOARD_CACHE_TIMEOUT = env.int("TRADES_DASHBOARD_CACHE_TIMEOUT", default=600)
 
 # django-ratelimit: desabilitado automaticamente ao rodar manage.py test
 RATELIMIT_ENABLE = "test" not in sys.argv and env.bool("RATELIMIT_ENABLE", default=True)
@@ -229,6 +242,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "macro.tasks.collect_macro_cycle",
         "schedule": crontab(minute="*/5"),  # 00,05,10...
     },
+    "macro-retention-daily": {
+        "task": "macro.tasks.prune_macro_history",
+        "schedule": crontab(minute=30, hour=3),
+    },
     "discord-sync-daily": {
         "task": "discord_integration.tasks.sync_all_discord_roles",
         "schedule": crontab(minute=0, hour=4),
@@ -6,6 +6,8 @@ Usa SQLite em memória para testes rápidos, sem PostgreSQL/Redis.
 
 from __future__ import annotations
 
+import tempfile
+
 from .base import *  # noqa: F401, F403
 
 DEBUG = False
@@ -33,6 +35,9 @@ CACHES = {
     }
 }
 
+# Uploads dos testes (screenshots de trades) vão para um diretório temporário, não media/
+MEDIA_ROOT = tempfile.mkdtemp(prefix="trader-portal-ci-media-")
+
 # Hasher rápido para testes (evita lentidão do PBKDF2)
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.MD5PasswordHasher",
@@ -3,117 +3,195 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import Any
 
-from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Avg, CharField, Count, F, Max, Min, Q, Sum, Value
 from django.db.models.functions import Coalesce, TruncDay
 
-from .models import EntryType, Market, ResultType, Setup, Trade
-
-
-def compute_global_dashboard(trades_qs) -> dict[str, Any]:
+from .kernels import cents_to_float, drawdown, running_balance, streak_lengths, to_cents
+from .models import (
+    EntryType,
+    HighTimeFrame,
+    Market,
+    RegionHTF,
+    ResultType,
+    Setup,
+    SMCPanel,
+    Trade,
+    Trend,
+    Trigger,
+)
+from .rollups import daily_profit
+
+# Dimensões das tabelas por categoria dos dashboards (campo -> choices)
+DIMENSIONS = {
+    "market": Market,
+    "setup": Setup,
+    "entry_type": EntryType,
+    "high_time_frame": HighTimeFrame,
+    "trend": Trend,
+    "smc_panel": SMCPanel,
+    "region_htf": RegionHTF,
+    "trigger": Trigger,
+}
+
+BASE_BREAKDOWN_FIELDS = ("market", "setup", "entry_type")
+
+
+def compute_summary(trades_qs) -> dict[str, Any]:
     """
-    Calcula métricas agregadas para todos os trades (dashboard global).
-    trades_qs: queryset de Trade (ex: Trade.objects.all()).
-    Não usa last_reset_at nem saldo por usuário.
+    Agrega o bloco de resumo em uma única consulta (COUNT/SUM/AVG/MAX/MIN condicionais).
+    Retorna valores brutos (Decimal); a formatação fica com quem consome.
     """
-    trades = trades_qs.order_by("executed_at")
-    total_trades = trades.count()
-
-    if not total_trades:
-        return {
-            "summary": {
-                "total_trades": 0,
-                "wins": 0,
-                "losses": 0,
-                "breakevens": 0,
-                "win_rate": 0.0,
-                "total_profit": 0.0,
-                "avg_profit": 0.0,
-                "avg_gain": 0.0,
-                "avg_loss": 0.0,
-                "best_trade": 0.0,
-                "worst_trade": 0.0,
-                "initial_balance": 0.0,
-            },
-            "balance_series": [],
-            "by_market": [],
-            "by_setup": [],
-            "by_entry_type": [],
-            "result_distribution": [],
-        }
-
-    wins = trades.filter(result_type=ResultType.GAIN).count()
-    losses = trades.filter(result_type=ResultType.LOSS).count()
-    breakevens = trades.filter(result_type=ResultType.BREAK_EVEN).count()
-    total_profit = trades.aggregate(total=Coalesce(Sum("profit_amount"), Decimal("0")))["total"]
-    avg_profit = trades.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    win_rate = (wins / total_trades * 100) if total_trades else 0
-
-    gains_qs = trades.filter(profit_amount__gt=0)
-    losses_qs = trades.filter(profit_amount__lt=0)
-
-    avg_gain = gains_qs.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    avg_loss = losses_qs.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    best_trade = trades.aggregate(best=Coalesce(Max("profit_amount"), Decimal("0")))["best"]
-    worst_trade = trades.aggregate(worst=Coalesce(Min("profit_amount"), Decimal("0")))["worst"]
+    zero = Decimal("0")
+    gains = Q(profit_amount__gt=0)
+    losses = Q(profit_amount__lt=0)
+    return trades_qs.aggregate(
+        total_trades=Count("id"),
+        gain_count=Count("id", filter=gains),
+        loss_count=Count("id", filter=losses),
+        wins=Count("id", filter=Q(result_type=ResultType.GAIN)),
+        losses=Count("id", filter=Q(result_type=ResultType.LOSS)),
+        breakevens=Count("id", filter=Q(result_type=ResultType.BREAK_EVEN)),
+        total_profit=Coalesce(Sum("profit_amount"), zero),
+        avg_profit=Coalesce(Avg("profit_amount"), zero),
+        gross_gain=Coalesce(Sum("profit_amount", filter=gains), zero),
+        gross_loss=Coalesce(Sum("profit_amount", filter=losses), zero),
+        avg_gain=Coalesce(Avg("profit_amount", filter=gains), zero),
+        avg_loss=Coalesce(Avg("profit_amount", filter=losses), zero),
+        best_trade=Coalesce(Max("profit_amount"), zero),
+        worst_trade=Coalesce(Min("profit_amount"), zero),
+        total_technical=Coalesce(Sum("technical_gain"), zero),
+    )
+
+
+def _empty_dashboard(summary_extra: dict[str, float]) -> dict[str, Any]:
+    return {
+        "summary": {
+            "total_trades": 0,
+            "wins": 0,
+            "losses": 0,
+            "breakevens": 0,
+            "win_rate": 0.0,
+            "total_profit": 0.0,
+            "avg_profit": 0.0,
+            "avg_gain": 0.0,
+            "avg_loss": 0.0,
+            "best_trade": 0.0,
+            "worst_trade": 0.0,
+            **summary_extra,
+        },
+        "balance_series": [],
+        "by_market": [],
+        "by_setup": [],
+        "by_entry_type": [],
+        "result_distribution": [],
+    }
+
+
+def _format_summary(agg: dict[str, Any]) -> dict[str, Any]:
+    """Converte o resultado de compute_summary nos campos arredondados do dashboard."""
+    total_trades = agg["total_trades"]
+    win_rate = (agg["wins"] / total_trades * 100) if total_trades else 0
+    return {
+        "total_trades": total_trades,
+        "wins": agg["wins"],
+        "losses": agg["losses"],
+        "breakevens": agg["breakevens"],
+        "win_rate": round(win_rate, 2),
+        "total_profit": round(float(agg["total_profit"]), 2),
+        "avg_profit": round(float(agg["avg_profit"]), 2),
+        "avg_gain": round(float(agg["avg_gain"]), 2),
+        "avg_loss": round(float(agg["avg_loss"]), 2),
+        "best_trade": round(float(agg["best_trade"]), 2),
+        "worst_trade": round(float(agg["worst_trade"]), 2),
+    }
+
+
+def _result_distribution(agg: dict[str, Any]) -> list[dict[str, Any]]:
+    total_trades = agg["total_trades"]
+
+    def _pct(count: int) -> float:
+        return round((count / total_trades * 100) if total_trades else 0, 2)
+
+    return [
+        {"label": "Gain", "count": agg["wins"], "percentage": _pct(agg["wins"])},
+        {"label": "Loss", "count": agg["losses"], "percentage": _pct(agg["losses"])},
+        {"label": "Break even", "count": agg["breakevens"], "percentage": _pct(agg["breakevens"])},
+    ]
+
 
+def _daily_balance_series(trades_qs, initial_balance: Decimal) -> list[dict[str, Any]]:
     daily = (
-        trades.annotate(day=TruncDay("executed_at"))
+        trades_qs.annotate(day=TruncDay("executed_at"))
         .values("day")
         .annotate(profit=Coalesce(Sum("profit_amount"), Decimal("0")))
         .order_by("day")
     )
 
-    running_balance = Decimal("0")
-    balance_series = []
-    for entry in daily:
-        running_balance += entry["profit"]
-        balance_series.append(
-            {
-                "date": entry["day"].date().isoformat(),
-                "balance": round(float(running_balance), 2),
-                "daily_profit": round(float(entry["profit"]), 2),
-            }
-        )
+    rows = list(daily.values_list("day", "profit"))
+    return _balance_points(
+        [day.date().isoformat() for day, _ in rows],
+        [profit for _, profit in rows],
+        initial_balance,
+    )
 
-    by_market = _aggregate_by(trades, "market", dict(Market.choices))
-    by_setup = _aggregate_by(trades, "setup", dict(Setup.choices))
-    by_entry = _aggregate_by(trades, "entry_type", dict(EntryType.choices))
 
-    result_distribution = [
-        {"label": "Gain", "count": wins, "percentage": round(win_rate, 2)},
-        {
-            "label": "Loss",
-            "count": losses,
-            "percentage": round((losses / total_trades * 100) if total_trades else 0, 2),
-        },
-        {
-            "label": "Break even",
-            "count": breakevens,
-            "percentage": round((breakevens / total_trades * 100) if total_trades else 0, 2),
-        },
+def _balance_points(days: list[str], daily_profits, initial_balance) -> list[dict[str, Any]]:
+    """Série de saldo diário (date, balance, daily_profit) a partir do lucro de cada dia."""
+    daily_cents = to_cents(daily_profits)
+    balances = running_balance(int(to_cents([initial_balance])[0]), daily_cents)
+    return [
+        {"date": day, "balance": balance, "daily_profit": profit}
+        for day, balance, profit in zip(days, cents_to_float(balances), cents_to_float(daily_cents))
     ]
 
+
+def rollup_balance_series(user_id: int | None, since, initial_balance) -> list[dict[str, Any]]:
+    """
+    Série de saldo diário lida do agregado TradeDailyRollup (um usuário ou todos, com
+    user_id=None), a partir de since (last_reset_at). Mesmo resultado de _daily_balance_series.
+    """
+    rows = daily_profit(user_id, since)
+    return _balance_points(
+        [day.isoformat() for day, _ in rows],
+        [profit for _, profit in rows],
+        initial_balance,
+    )
+
+
+def compute_global_dashboard(
+    trades_qs, breakdowns: dict | None = None, balance_series: list[dict] | None = None
+) -> dict[str, Any]:
+    """
+    Calcula métricas agregadas para todos os trades (dashboard global).
+    trades_qs: queryset de Trade (ex: Trade.objects.all()).
+    breakdowns: resultado de compute_breakdowns já calculado (evita nova consulta).
+    balance_series: série de saldo já calculada (ex.: rollup_balance_series de todos os trades).
+    Não usa last_reset_at nem saldo por usuário.
+    """
+    trades = trades_qs.order_by("executed_at")
+    agg = compute_summary(trades)
+
+    if not agg["total_trades"]:
+        return _empty_dashboard({"initial_balance": 0.0})
+
+    if balance_series is None:
+        balance_series = _daily_balance_series(trades, Decimal("0"))
+    if breakdowns is None:
+        breakdowns = compute_breakdowns(trades, BASE_BREAKDOWN_FIELDS)
+
     return {
         "summary": {
-            "total_trades": total_trades,
-            "wins": wins,
-            "losses": losses,
-            "breakevens": breakevens,
-            "win_rate": round(win_rate, 2),
-            "total_profit": round(float(total_profit), 2),
-            "avg_profit": round(float(avg_profit), 2),
-            "avg_gain": round(float(avg_gain), 2),
-            "avg_loss": round(float(avg_loss), 2),
-            "best_trade": round(float(best_trade), 2),
-            "worst_trade": round(float(worst_trade), 2),
+            **_format_summary(agg),
             "initial_balance": 0.0,
-            "current_balance": round(float(running_balance), 2) if balance_series else 0.0,
+            "current_balance": balance_series[-1]["balance"] if balance_series else 0.0,
         },
         "balance_series": balance_series,
-        "by_market": by_market,
-        "by_setup": by_setup,
-        "by_entry_type": by_entry,
-        "result_distribution": result_distribution,
+        "by_market": breakdowns["market"],
+        "by_setup": breakdowns["setup"],
+        "by_entry_type": breakdowns["entry_type"],
+        "result_distribution": _result_distribution(agg),
     }
 
 
@@ -122,20 +200,7 @@ def compute_streaks(profit_amounts) -> tuple[int, int]:
     Calcula longest_win_streak e longest_loss_streak a partir de iterável de profit_amount.
     Retorna (longest_win, longest_loss).
     """
-    longest_win = longest_loss = current_win = current_loss = 0
-    for amount in profit_amounts:
-        if amount > 0:
-            current_win += 1
-            current_loss = 0
-        elif amount < 0:
-            current_loss += 1
-            current_win = 0
-        else:
-            current_win = 0
-            current_loss = 0
-        longest_win = max(longest_win, current_win)
-        longest_loss = max(longest_loss, current_loss)
-    return longest_win, longest_loss
+    return streak_lengths(to_cents(profit_amounts))
 
 
 def compute_profit_factor_payoff(
@@ -162,21 +227,9 @@ def compute_drawdown_series(
     Calcula série de drawdown, max_drawdown e max_drawdown_pct.
     Retorna (dd_series, max_dd, max_dd_pct).
     """
-    peak = Decimal(str(initial_balance))
-    dd_series = []
-    max_dd = Decimal("0")
-    max_dd_pct = Decimal("0")
-    for point in balance_series:
-        bal = Decimal(str(point["balance"]))
-        peak = max(peak, bal)
-        dd = bal - peak
-        dd_pct = (dd / peak * 100) if peak else Decimal("0")
-        if dd < max_dd:
-            max_dd = dd
-        if dd_pct < max_dd_pct:
-            max_dd_pct = dd_pct
-        dd_series.append(float(dd))
-    return dd_series, max_dd, max_dd_pct
+    balances = to_cents([point["balance"] for point in balance_series])
+    dd_cents, _, max_dd, max_dd_pct = drawdown(balances, int(to_cents([initial_balance])[0]))
+    return cents_to_float(dd_cents), max_dd, max_dd_pct
 
 
 def compute_advanced_metrics(
@@ -184,19 +237,18 @@ def compute_advanced_metrics(
     balance_series: list[dict],
     initial_balance: Decimal | float,
     base_summary: dict,
+    summary_agg: dict | None = None,
 ) -> dict[str, Any]:
     """
     Calcula métricas avançadas: profit_factor, payoff, streaks, drawdown.
     trades_qs: queryset ordenado por executed_at.
     balance_series: do compute_user_dashboard ou compute_global_dashboard.
     base_summary: summary do dashboard base.
+    summary_agg: agregados de compute_summary já calculados (ex.: snapshot); evita a consulta.
     """
-    gains = trades_qs.filter(profit_amount__gt=0)
-    losses = trades_qs.filter(profit_amount__lt=0)
-    gross_gain = gains.aggregate(total=Coalesce(Sum("profit_amount"), Decimal("0")))["total"]
-    gross_loss = losses.aggregate(total=Coalesce(Sum("profit_amount"), Decimal("0")))["total"]
-    avg_gain = gains.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    avg_loss = losses.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
+    agg = summary_agg if summary_agg is not None else compute_summary(trades_qs)
+    gross_gain, gross_loss = agg["gross_gain"], agg["gross_loss"]
+    avg_gain, avg_loss = agg["avg_gain"], agg["avg_loss"]
 
     profit_factor, payoff = compute_profit_factor_payoff(gross_gain, gross_loss, avg_gain, avg_loss)
     longest_win, longest_loss = compute_streaks(trades_qs.values_list("profit_amount", flat=True))
@@ -219,25 +271,138 @@ def compute_advanced_metrics(
     }
 
 
+def _breakdown_annotations() -> dict[str, Any]:
+    return {
+        "total": Count("id"),
+        "wins": Count("id", filter=Q(result_type=ResultType.GAIN)),
+        "losses": Count("id", filter=Q(result_type=ResultType.LOSS)),
+        "breakevens": Count("id", filter=Q(result_type=ResultType.BREAK_EVEN)),
+        "total_profit": Coalesce(Sum("profit_amount"), Decimal("0")),
+        "avg_profit": Coalesce(Avg("profit_amount"), Decimal("0")),
+        "avg_technical": Coalesce(Avg("technical_gain"), Decimal("0")),
+        "total_technical": Coalesce(Sum("technical_gain"), Decimal("0")),
+    }
+
+
 def _aggregate_by(
     queryset, field: str, display_map: dict[str, str] | None = None
 ) -> list[dict[str, Any]]:
     annotated = (
-        queryset.values(field)
-        .annotate(
-            total=Count("id"),
-            wins=Count("id", filter=Q(result_type=ResultType.GAIN)),
-            losses=Count("id", filter=Q(result_type=ResultType.LOSS)),
-            breakevens=Count("id", filter=Q(result_type=ResultType.BREAK_EVEN)),
-            total_profit=Coalesce(Sum("profit_amount"), Decimal("0")),
-            avg_profit=Coalesce(Avg("profit_amount"), Decimal("0")),
-            avg_technical=Coalesce(Avg("technical_gain"), Decimal("0")),
+        queryset.values(field).annotate(**_breakdown_annotations()).order_by("-total", field)
+    )
+    return _breakdown_rows(annotated, field, display_map)
+
+
+_BREAKDOWN_METRICS = (
+    "total",
+    "wins",
+    "losses",
+    "breakevens",
+    "total_profit",
+    "avg_profit",
+    "avg_technical",
+    "total_technical",
+)
+
+
+def _union_all_rows(queryset, fields: list[str]):
+    """Uma consulta GROUP BY por dimensão, unidas com UNION ALL (uma ida ao banco)."""
+    parts = [
+        queryset.annotate(
+            dimension=Value(field, output_field=CharField()),
+            dimension_value=F(field),
         )
-        .order_by("-total")
+        .values("dimension", "dimension_value")
+        .annotate(**_breakdown_annotations())
+        for field in fields
+    ]
+    union = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    for row in union:
+        yield row["dimension"], row["dimension_value"], row
+
+
+def _grouping_sets_rows(queryset, fields: list[str]):
+    """PostgreSQL: uma única varredura com GROUP BY GROUPING SETS ((dim1), (dim2), ...)."""
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    columns = [Trade._meta.get_field(field).column for field in fields]
+    try:
+        inner_sql, inner_params = queryset.values(
+            *fields, "result_type", "profit_amount", "technical_gain"
+        ).query.sql_with_params()
+    except EmptyResultSet:
+        return
+
+    grouping = ", ".join(f"GROUPING(t.{qn(col)}) AS {qn('g_' + col)}" for col in columns)
+    selected = ", ".join(f"t.{qn(col)}" for col in columns)
+    sets = ", ".join(f"(t.{qn(col)})" for col in columns)
+    sql = (
+        f"SELECT {grouping}, {selected}, "
+        "COUNT(*), "
+        "COUNT(*) FILTER (WHERE t.result_type = %s), "
+        "COUNT(*) FILTER (WHERE t.result_type = %s), "
+        "COUNT(*) FILTER (WHERE t.result_type = %s), "
+        "COALESCE(SUM(t.profit_amount), 0), "
+        "COALESCE(AVG(t.profit_amount), 0), "
+        "COALESCE(AVG(t.technical_gain), 0), "
+        "COALESCE(SUM(t.technical_gain), 0) "
+        f"FROM ({inner_sql}) t GROUP BY GROUPING SETS ({sets})"
+    )
+    # Placeholders do SELECT vêm antes dos da subconsulta no FROM
+    params = (
+        ResultType.GAIN.value,
+        ResultType.LOSS.value,
+        ResultType.BREAK_EVEN.value,
+        *inner_params,
     )
+    n = len(fields)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for record in cursor.fetchall():
+            idx = record[:n].index(0)
+            metrics = dict(zip(_BREAKDOWN_METRICS, record[2 * n :]))
+            yield fields[idx], record[n + idx], metrics
 
+
+def aggregate_breakdowns(trades_qs, fields=None) -> dict[str, list[dict[str, Any]]]:
+    """
+    Agrega várias dimensões numa única ida ao banco: GROUPING SETS no PostgreSQL e
+    UNION ALL nos demais bancos. Retorna {campo: linhas} com as chaves de _aggregate_by
+    antes da formatação (campo, total, wins, losses, breakevens, total_profit,
+    avg_profit, avg_technical) + total_technical, ordenadas por (-total, valor).
+    """
+    fields = list(fields or DIMENSIONS)
+    queryset = trades_qs.order_by()
+    if connections[queryset.db].vendor == "postgresql":
+        rows = _grouping_sets_rows(queryset, fields)
+    else:
+        rows = _union_all_rows(queryset, fields)
+
+    result: dict[str, list[dict[str, Any]]] = {field: [] for field in fields}
+    for field, value, metrics in rows:
+        result[field].append({field: value, **{k: metrics[k] for k in _BREAKDOWN_METRICS}})
+    for field, field_rows in result.items():
+        field_rows.sort(key=lambda row, field=field: (-row["total"], row[field]))
+    return result
+
+
+def compute_breakdowns(trades_qs, fields=None) -> dict[str, list[dict[str, Any]]]:
+    """Tabelas por dimensão formatadas (mesmo formato de _aggregate_by), {campo: linhas}."""
+    return {
+        field: _breakdown_rows(rows, field, dict(DIMENSIONS[field].choices))
+        for field, rows in aggregate_breakdowns(trades_qs, fields).items()
+    }
+
+
+def _breakdown_rows(
+    rows, field: str, display_map: dict[str, str] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Formata linhas agregadas por dimensão (chaves: field, total, wins, losses,
+    breakevens, avg_profit, avg_technical) no formato das tabelas do dashboard.
+    """
     data = []
-    for row in annotated:
+    for row in rows:
         count = row["total"]
         wins = row["wins"]
         losses = row["losses"]
@@ -276,63 +441,38 @@ def compute_user_dashboard(user) -> dict[str, Any]:
         trades = trades.filter(executed_at__gte=profile.last_reset_at)
 
     trades = trades.order_by("executed_at")
-    total_trades = trades.count()
-
-    if not total_trades:
-        return {
-            "summary": {
-                "total_trades": 0,
-                "wins": 0,
-                "losses": 0,
-                "breakevens": 0,
-                "win_rate": 0.0,
-                "total_profit": 0.0,
-                "avg_profit": 0.0,
-                "avg_gain": 0.0,
-                "avg_loss": 0.0,
-                "best_trade": 0.0,
-                "worst_trade": 0.0,
+    agg = compute_summary(trades)
+
+    if not agg["total_trades"]:
+        return _empty_dashboard(
+            {
                 "current_balance": float(profile.current_balance),
                 "initial_balance": float(profile.initial_balance),
-            },
-            "balance_series": [],
-            "by_market": [],
-            "by_setup": [],
-            "by_entry_type": [],
-            "result_distribution": [],
-        }
-
-    wins = trades.filter(result_type=ResultType.GAIN).count()
-    losses = trades.filter(result_type=ResultType.LOSS).count()
-    breakevens = trades.filter(result_type=ResultType.BREAK_EVEN).count()
-    total_profit = trades.aggregate(total=Coalesce(Sum("profit_amount"), Decimal("0")))["total"]
-    avg_profit = trades.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    win_rate = (wins / total_trades * 100) if total_trades else 0
-
-    gains_qs = trades.filter(profit_amount__gt=0)
-    losses_qs = trades.filter(profit_amount__lt=0)
-
-    avg_gain = gains_qs.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    avg_loss = losses_qs.aggregate(avg=Coalesce(Avg("profit_amount"), Decimal("0")))["avg"]
-    best_trade = trades.aggregate(best=Coalesce(Max("profit_amount"), Decimal("0")))["best"]
-    worst_trade = trades.aggregate(worst=Coalesce(Min("profit_amount"), Decimal("0")))["worst"]
+            }
+        )
 
-    daily = (
-        trades.annotate(day=TruncDay("executed_at"))
-        .values("day")
-        .annotate(profit=Coalesce(Sum("profit_amount"), Decimal("0")))
-        .order_by("day")
-    )
+    balance_series = rollup_balance_series(user.pk, profile.last_reset_at, profile.initial_balance)
+    tables = compute_breakdowns(trades, BASE_BREAKDOWN_FIELDS)
+    breakdowns = {
+        "by_market": tables["market"],
+        "by_setup": tables["setup"],
+        "by_entry_type": tables["entry_type"],
+    }
+    return _build_user_dashboard(profile, agg, balance_series, breakdowns)
 
-    running_balance = profile.initial_balance
-    balance_series = []
-    for entry in daily:
-        running_balance += entry["profit"]
-        balance_series.append(
+
+def _build_user_dashboard(
+    profile,
+    agg: dict[str, Any],
+    balance_series: list[dict],
+    breakdowns: dict[str, list[dict[str, Any]]],
+) -> dict[str, Any]:
+    """Monta o dicionário do dashboard do usuário (usado também pelo snapshot)."""
+    if not agg["total_trades"]:
+        return _empty_dashboard(
             {
-                "date": entry["day"].date().isoformat(),
-                "balance": round(float(running_balance), 2),
-                "daily_profit": round(float(entry["profit"]), 2),
+                "current_balance": float(profile.current_balance),
+                "initial_balance": float(profile.initial_balance),
             }
         )
 
@@ -343,43 +483,13 @@ def compute_user_dashboard(user) -> dict[str, Any]:
         else round(float(profile.current_balance), 2)
     )
 
-    by_market = _aggregate_by(trades, "market", dict(Market.choices))
-    by_setup = _aggregate_by(trades, "setup", dict(Setup.choices))
-    by_entry = _aggregate_by(trades, "entry_type", dict(EntryType.choices))
-
-    result_distribution = [
-        {"label": "Gain", "count": wins, "percentage": round(win_rate, 2)},
-        {
-            "label": "Loss",
-            "count": losses,
-            "percentage": round((losses / total_trades * 100) if total_trades else 0, 2),
-        },
-        {
-            "label": "Break even",
-            "count": breakevens,
-            "percentage": round((breakevens / total_trades * 100) if total_trades else 0, 2),
-        },
-    ]
-
     return {
         "summary": {
-            "total_trades": total_trades,
-            "wins": wins,
-            "losses": losses,
-            "breakevens": breakevens,
-            "win_rate": round(win_rate, 2),
-            "total_profit": round(float(total_profit), 2),
-            "avg_profit": round(float(avg_profit), 2),
-            "avg_gain": round(float(avg_gain), 2),
-            "avg_loss": round(float(avg_loss), 2),
-            "best_trade": round(float(best_trade), 2),
-            "worst_trade": round(float(worst_trade), 2),
+            **_format_summary(agg),
             "current_balance": computed_current_balance,
             "initial_balance": round(float(profile.initial_balance), 2),
         },
         "balance_series": balance_series,
-        "by_market": by_market,
-        "by_setup": by_setup,
-        "by_entry_type": by_entry,
-        "result_distribution": result_distribution,
+        **breakdowns,
+        "result_distribution": _result_distribution(agg),
     }
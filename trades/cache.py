@@ -0,0 +1,172 @@
+"""
+Cache dos dashboards calculados (usa CACHES["default"]; Redis em produção).
+
+Chaves versionadas por escopo: cada usuário tem um contador e os dashboards globais
+(staff) têm outro. Os signals de Trade/Profile incrementam o contador, o que invalida
+todas as entradas antigas de uma vez (elas expiram sozinhas pelo timeout).
+"""
+
+from __future__ import annotations
+
+import time
+from decimal import Decimal
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .analytics import (
+    DIMENSIONS,
+    compute_advanced_metrics,
+    compute_breakdowns,
+    compute_drawdown_series,
+    compute_global_dashboard,
+    rollup_balance_series,
+)
+from .models import Trade
+from .pagination import estimated_count
+from .snapshots import get_user_snapshot, snapshot_breakdown, snapshot_dashboard, snapshot_summary
+
+GLOBAL_SCOPE = "global"
+
+# Tabelas extras do dashboard avançado (além de mercado/setup/entrada do dashboard base)
+ADVANCED_BREAKDOWNS = {
+    "by_htf": "high_time_frame",
+    "by_trend": "trend",
+    "by_smc_panel": "smc_panel",
+    "by_region_htf": "region_htf",
+    "by_trigger": "trigger",
+}
+
+
+def _timeout() -> int:
+    return getattr(settings, "TRADES_DASHBOARD_CACHE_TIMEOUT", 600)
+
+
+def user_scope(user_or_id) -> str:
+    return f"user:{getattr(user_or_id, 'pk', user_or_id)}"
+
+
+def _version_key(scope: str) -> str:
+    return f"trades:dash:version:{scope}"
+
+
+def _fresh_version() -> int:
+    # Contador despejado do cache recomeça em um valor novo (nunca reaproveita versões antigas)
+    return time.time_ns()
+
+
+def get_version(scope: str) -> int:
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope: str) -> None:
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def _bump_user(user_id: int) -> None:
+    bump_version(user_scope(user_id))
+    bump_version(GLOBAL_SCOPE)
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Invalida os dashboards do usuário e os globais (chamado pelos signals).
+    Incrementa já (a própria requisição enxerga a mudança) e de novo no commit: outro
+    worker pode ter gravado em cache dados lidos antes do commit com a versão nova.
+    """
+    _bump_user(user_id)
+    transaction.on_commit(lambda: _bump_user(user_id))
+
+
+def cached(scope: str, name: str, compute: Callable[[], Any]) -> Any:
+    """Retorna o valor em cache para (escopo, versão atual, nome) ou calcula e grava."""
+    key = f"trades:dash:{scope}:{get_version(scope)}:{name}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, _timeout())
+    return value
+
+
+def user_dashboard(user) -> dict[str, Any]:
+    """Dashboard pessoal (mesmo formato de compute_user_dashboard)."""
+    return cached(user_scope(user), "dashboard", lambda: snapshot_dashboard(user))
+
+
+def _build_user_advanced(user) -> dict[str, Any]:
+    snapshot = get_user_snapshot(user)
+    base = snapshot_dashboard(user, snapshot)
+    trades_qs = Trade.objects.filter(user=user).order_by("executed_at")
+    if snapshot.since:
+        trades_qs = trades_qs.filter(executed_at__gte=snapshot.since)
+
+    balance_series = base.get("balance_series", [])
+    initial_balance = base["summary"]["initial_balance"]
+    advanced = compute_advanced_metrics(
+        trades_qs,
+        balance_series,
+        initial_balance,
+        base["summary"],
+        summary_agg=snapshot_summary(snapshot),
+    )
+    dd_series, _, _ = compute_drawdown_series(balance_series, initial_balance)
+    return {
+        "dashboard": base,
+        "advanced": advanced,
+        "drawdown": dd_series,
+        "breakdowns": {
+            key: snapshot_breakdown(snapshot, field) for key, field in ADVANCED_BREAKDOWNS.items()
+        },
+        "total_technical": snapshot.total_technical,
+    }
+
+
+def user_advanced_dashboard(user) -> dict[str, Any]:
+    """
+    Dashboard base + métricas avançadas + drawdown + tabelas por HTF/tendência/painel/
+    região/gatilho do usuário. Chaves: dashboard, advanced, drawdown, breakdowns,
+    total_technical.
+    """
+    return cached(user_scope(user), "advanced", lambda: _build_user_advanced(user))
+
+
+def _build_global_advanced() -> dict[str, Any]:
+    trades_qs = Trade.objects.all().order_by("executed_at")
+    # As 8 tabelas por dimensão numa única consulta, compartilhada com o dashboard base
+    tables = compute_breakdowns(trades_qs, DIMENSIONS)
+    base = compute_global_dashboard(
+        trades_qs,
+        breakdowns=tables,
+        balance_series=rollup_balance_series(None, None, Decimal("0")),
+    )
+    balance_series = base.get("balance_series", [])
+    initial_balance = Decimal("0")
+    advanced = compute_advanced_metrics(trades_qs, balance_series, initial_balance, base["summary"])
+    dd_series, _, _ = compute_drawdown_series(balance_series, initial_balance)
+    return {
+        "dashboard": base,
+        "advanced": advanced,
+        "drawdown": dd_series,
+        "breakdowns": {key: tables[field] for key, field in ADVANCED_BREAKDOWNS.items()},
+    }
+
+
+def global_advanced_dashboard() -> dict[str, Any]:
+    """Mesmo formato de user_advanced_dashboard, para todos os trades (sem total_technical)."""
+    return cached(GLOBAL_SCOPE, "advanced", _build_global_advanced)
+
+
+def filtered_trade_count(scope: str, filters, queryset) -> tuple[int, bool]:
+    """(total, aproximado?) da tabela de trades filtrada, em cache por escopo e filtros."""
+    return cached(scope, f"trade_count:{filters.cache_key}", lambda: estimated_count(queryset))
@@ -0,0 +1,103 @@
+"""
+Filtros declarativos das tabelas de trades dos dashboards.
+
+Cada TradeFilterSet declara os campos de escolha (validados contra os TextChoices do
+modelo) e se aceita busca por símbolo; lê o request.GET, descarta valores inválidos e
+compõe um único Q. cache_key é um hash canônico dos filtros aplicados (independente da
+ordem dos parâmetros) para chavear contagens e páginas em cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Mapping
+
+from django.db.models import Q, TextChoices
+
+from .models import (
+    Direction,
+    EntryType,
+    HighTimeFrame,
+    Market,
+    PartialTrade,
+    RegionHTF,
+    ResultType,
+    Setup,
+    SMCPanel,
+    Trend,
+    Trigger,
+)
+
+SYMBOL_MAX_LENGTH = 20
+
+
+class TradeFilterSet:
+    """Base: subclasses definem choice_fields (campo -> TextChoices) e symbol."""
+
+    choice_fields: dict[str, type[TextChoices]] = {}
+    symbol: bool = True
+
+    def __init__(self, data: Mapping[str, Any]):
+        self.selected: dict[str, str] = {}
+        for field, choices in self.choice_fields.items():
+            value = (data.get(field) or "").strip()
+            self.selected[field] = value if value in choices.values else ""
+        if self.symbol:
+            value = (data.get("symbol") or "").strip()
+            self.selected["symbol"] = value[:SYMBOL_MAX_LENGTH]
+
+    @property
+    def active(self) -> dict[str, str]:
+        """Somente os filtros preenchidos."""
+        return {field: value for field, value in self.selected.items() if value}
+
+    @property
+    def q(self) -> Q:
+        q = Q()
+        for field, value in self.active.items():
+            if field == "symbol":
+                q &= Q(symbol__icontains=value)
+            else:
+                q &= Q(**{field: value})
+        return q
+
+    def apply(self, queryset):
+        return queryset.filter(self.q)
+
+    @property
+    def cache_key(self) -> str:
+        """Hash estável dos filtros ativos ("all" sem filtros); símbolo sem caixa."""
+        active = self.active
+        if not active:
+            return "all"
+        if "symbol" in active:
+            active["symbol"] = active["symbol"].upper()
+        canonical = json.dumps(active, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class BasicTradeFilterSet(TradeFilterSet):
+    """Filtros da tabela do dashboard pessoal."""
+
+    choice_fields = {
+        "market": Market,
+        "setup": Setup,
+        "entry_type": EntryType,
+        "result_type": ResultType,
+    }
+
+
+class AdvancedTradeFilterSet(TradeFilterSet):
+    """Filtros das tabelas dos dashboards avançado e global."""
+
+    choice_fields = {
+        **BasicTradeFilterSet.choice_fields,
+        "direction": Direction,
+        "high_time_frame": HighTimeFrame,
+        "region_htf": RegionHTF,
+        "trend": Trend,
+        "smc_panel": SMCPanel,
+        "trigger": Trigger,
+        "partial_trade": PartialTrade,
+    }
@@ -0,0 +1,72 @@
+"""
+Núcleo vetorizado (NumPy) das métricas de série: saldo acumulado, pico, drawdown e sequências.
+
+Valores monetários são tratados em centavos (int64): somas e diferenças são exatas, como
+com Decimal, e as conversões para float/Decimal nas bordas dão os mesmos resultados das
+versões em Python puro (compute_streaks / compute_drawdown_series).
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+import numpy as np
+
+
+def to_cents(values: Iterable) -> np.ndarray:
+    """Converte valores monetários (Decimal, float, int; 2 casas) em array int64 de centavos."""
+    if not isinstance(values, (list, tuple, np.ndarray)):
+        values = list(values)
+    amounts = np.asarray(values, dtype=np.float64)
+    return np.rint(amounts * 100).astype(np.int64)
+
+
+def cents_to_float(cents: np.ndarray) -> list[float]:
+    """Centavos -> lista de float (mesmo valor de float(Decimal) com 2 casas)."""
+    return (cents / 100).tolist()
+
+
+def running_balance(initial_cents: int, deltas_cents: np.ndarray) -> np.ndarray:
+    """Saldo acumulado após cada delta."""
+    return initial_cents + np.cumsum(deltas_cents, dtype=np.int64)
+
+
+def _longest_run(mask: np.ndarray) -> int:
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def streak_lengths(profit_cents: np.ndarray) -> tuple[int, int]:
+    """(maior sequência de ganhos, maior sequência de perdas); zero quebra as duas."""
+    return _longest_run(profit_cents > 0), _longest_run(profit_cents < 0)
+
+
+def drawdown(
+    balance_cents: np.ndarray, initial_cents: int
+) -> tuple[np.ndarray, np.ndarray, Decimal, Decimal]:
+    """
+    Pico corrente (iniciando no saldo inicial) e drawdown (saldo - pico) em centavos.
+    Retorna (dd_cents, peak_cents, max_dd, max_dd_pct); max_dd/max_dd_pct em Decimal, <= 0.
+    """
+    if balance_cents.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, Decimal("0"), Decimal("0")
+
+    peak = np.maximum.accumulate(np.concatenate(([initial_cents], balance_cents)))[1:]
+    dd = balance_cents - peak
+    max_dd = Decimal(int(min(dd.min(), 0))) / 100
+
+    # % só onde há pico; o ponto de pior % é localizado em float e recalculado em Decimal
+    with_peak = np.flatnonzero(peak != 0)
+    max_dd_pct = Decimal("0")
+    if with_peak.size:
+        ratios = dd[with_peak] / peak[with_peak]
+        idx = with_peak[int(np.argmin(ratios))]
+        pct = Decimal(int(dd[idx])) / Decimal(int(peak[idx])) * 100
+        max_dd_pct = min(pct, Decimal("0"))
+    return dd, peak, max_dd, max_dd_pct
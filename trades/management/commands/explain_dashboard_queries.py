@@ -0,0 +1,100 @@
+"""
+Imprime o plano de execução (EXPLAIN ANALYZE no PostgreSQL, EXPLAIN QUERY PLAN no SQLite)
+de cada query disparada pelos dashboards, para detectar regressões de índice.
+Uso: python manage.py explain_dashboard_queries [--user=USER] [--no-analyze]
+USER pode ser: username, email ou ID (número). Sem --user usa o primeiro usuário com trades.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from trades.analytics import (
+    aggregate_breakdowns,
+    compute_global_dashboard,
+    compute_user_dashboard,
+    rollup_balance_series,
+)
+from trades.models import Trade
+from trades.snapshots import rebuild_snapshot
+from trades.views import MuralView, _can_request_ai_analysis
+
+
+def _resolve_user(value: str | None):
+    if value is None:
+        user = User.objects.filter(trades__isnull=False).order_by("pk").first()
+        if user is None:
+            raise CommandError("Nenhum usuário com trades. Informe --user.")
+        return user
+    value = value.strip()
+    if value.isdigit():
+        user = User.objects.filter(pk=int(value)).first()
+    else:
+        user = (
+            User.objects.filter(username=value).first()
+            or User.objects.filter(email__iexact=value).first()
+        )
+    if user is None:
+        raise CommandError(f"Usuário não encontrado: {value}")
+    return user
+
+
+def _dashboard_workloads(user):
+    """(rótulo, callable) de cada caminho de leitura dos dashboards."""
+    all_trades = Trade.objects.all()
+    return [
+        ("Dashboard pessoal (cálculo direto)", lambda: compute_user_dashboard(user)),
+        ("Snapshot pessoal (rebuild)", lambda: rebuild_snapshot(user)),
+        ("Elegibilidade IA", lambda: _can_request_ai_analysis(user)),
+        ("Mural", lambda: MuralView().get_context_data()),
+        ("Dashboard global", lambda: compute_global_dashboard(all_trades)),
+        ("Tabelas globais por dimensão", lambda: aggregate_breakdowns(all_trades)),
+        ("Série de saldo global (agregado diário)", lambda: rollup_balance_series(None, None, 0)),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Mostra o EXPLAIN de cada query dos dashboards (ANALYZE no PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=str,
+            default=None,
+            help="Username, email ou ID do usuário. Se omitido, usa o primeiro com trades.",
+        )
+        parser.add_argument(
+            "--no-analyze",
+            action="store_true",
+            help="No PostgreSQL, usa EXPLAIN sem executar a query (sem ANALYZE/BUFFERS).",
+        )
+
+    def handle(self, *args, **options):
+        user = _resolve_user(options["user"])
+        if connection.vendor == "postgresql":
+            prefix = "EXPLAIN " if options["no_analyze"] else "EXPLAIN (ANALYZE, BUFFERS) "
+        elif connection.vendor == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            prefix = "EXPLAIN "
+
+        # rebuild_snapshot grava no banco: tudo roda numa transação desfeita ao final.
+        with transaction.atomic():
+            for label, workload in _dashboard_workloads(user):
+                with CaptureQueriesContext(connection) as ctx:
+                    workload()
+                selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+                self.stdout.write(
+                    self.style.MIGRATE_HEADING(f"== {label} ({len(selects)} queries)")
+                )
+                for sql in selects:
+                    self.stdout.write(sql)
+                    with connection.cursor() as cursor:
+                        cursor.execute(prefix + sql)
+                        for row in cursor.fetchall():
+                            self.stdout.write("    " + " | ".join(str(col) for col in row))
+                    self.stdout.write("")
+            transaction.set_rollback(True)
@@ -9,6 +9,7 @@ import random
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from accounts.models import User
@@ -28,6 +29,7 @@ from trades.models import (
     Trend,
     Trigger,
 )
+from trades.signals import batch_trade_updates, mark_batch_user
 
 
 def random_choice(choices):
@@ -50,6 +52,7 @@ def get_user(identifier):
 
 
 def generate_trades(user, count=40):
+    """Cria os trades num único bulk_create; saldo e snapshot são reconciliados pelo lote."""
     symbols = [
         ("WINFUT", Market.INDICES),
         ("DOLFUT", Market.DOLLAR),
@@ -57,6 +60,7 @@ def generate_trades(user, count=40):
         ("PETR4", Market.STOCKS),
         ("NVDA", Market.STOCKS),
     ]
+    trades = []
     for _ in range(count):
         symbol, market = random.choice(symbols)
         executed_at = timezone.now() - timezone.timedelta(
@@ -104,32 +108,36 @@ def generate_trades(user, count=40):
         )
         is_public = random.random() < 0.6
         display_anon = True if not is_public else (random.random() < 0.5)
-        Trade.objects.create(
-            user=user,
-            executed_at=executed_at,
-            symbol=symbol,
-            market=market,
-            direction=direction,
-            quantity=quantity,
-            high_time_frame=htf,
-            trend=trend,
-            smc_panel=smc_panel,
-            premium_discount=premium,
-            region_htf=region,
-            entry_type=entry_type,
-            setup=setup,
-            trigger=trigger,
-            target_price=target_price,
-            stop_price=stop_price,
-            partial_trade=partial,
-            result_type=result,
-            currency=currency,
-            profit_amount=profit,
-            technical_gain=technical,
-            is_public=is_public,
-            display_as_anonymous=display_anon,
-            notes="Trade de teste gerado automaticamente.",
+        trades.append(
+            Trade(
+                user=user,
+                executed_at=executed_at,
+                symbol=symbol,
+                market=market,
+                direction=direction,
+                quantity=quantity,
+                high_time_frame=htf,
+                trend=trend,
+                smc_panel=smc_panel,
+                premium_discount=premium,
+                region_htf=region,
+                entry_type=entry_type,
+                setup=setup,
+                trigger=trigger,
+                target_price=target_price,
+                stop_price=stop_price,
+                partial_trade=partial,
+                result_type=result,
+                currency=currency,
+                profit_amount=profit,
+                technical_gain=technical,
+                is_public=is_public,
+                display_as_anonymous=display_anon,
+                notes="Trade de teste gerado automaticamente.",
+            )
         )
+    Trade.objects.bulk_create(trades)
+    mark_batch_user(user.pk)
 
 
 class Command(BaseCommand):
@@ -165,12 +173,16 @@ class Command(BaseCommand):
                 self.style.ERROR(f"Nenhum usuário encontrado para: {user_ident or '(primeiro)'}")
             )
             return
-        if not no_reset:
-            profile = user.profile
-            profile.reset_balance(Decimal("10000"))
-            deleted, _ = Trade.objects.filter(user=user).delete()
-            self.stdout.write(f"Saldo resetado para R$ 10.000 e {deleted} trade(s) removido(s).")
-        generate_trades(user, count=count)
+        # Saldo, snapshot e cache são reconciliados uma vez ao final (não a cada trade)
+        with transaction.atomic(), batch_trade_updates():
+            if not no_reset:
+                profile = user.profile
+                profile.reset_balance(Decimal("10000"))
+                deleted, _ = Trade.objects.filter(user=user).delete()
+                self.stdout.write(
+                    f"Saldo resetado para R$ 10.000 e {deleted} trade(s) removido(s)."
+                )
+            generate_trades(user, count=count)
         total = Trade.objects.filter(user=user).count()
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,51 @@
+"""
+Recria o agregado diário de trades (TradeDailyRollup) a partir da tabela de trades.
+Uso: python manage.py rebuild_trade_rollups [--user=USER]
+USER pode ser: username, email ou ID (número). Sem --user recria o agregado de todos.
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from trades.cache import GLOBAL_SCOPE, bump_version, invalidate_user
+from trades.rollups import rebuild_rollups
+
+
+def _resolve_user(value: str):
+    value = value.strip()
+    if value.isdigit():
+        user = User.objects.filter(pk=int(value)).first()
+    else:
+        user = (
+            User.objects.filter(username=value).first()
+            or User.objects.filter(email__iexact=value).first()
+        )
+    if user is None:
+        raise CommandError(f"Usuário não encontrado: {value}")
+    return user
+
+
+class Command(BaseCommand):
+    help = "Recria o agregado diário de trades (séries de saldo e gráficos por hora/mercado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=str,
+            default=None,
+            help="Username, email ou ID do usuário. Se omitido, recria para todos.",
+        )
+
+    def handle(self, *args, **options):
+        if options["user"] is None:
+            rows = rebuild_rollups()
+            bump_version(GLOBAL_SCOPE)
+            target = "todos os usuários"
+        else:
+            user = _resolve_user(options["user"])
+            rows = rebuild_rollups(user.pk)
+            invalidate_user(user.pk)
+            target = f"{user.username} (id={user.pk})"
+        self.stdout.write(self.style.SUCCESS(f"Agregado recriado para {target}: {rows} linha(s)."))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:18
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0007_globalaianalyticsrun'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeStatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('since', models.DateTimeField(blank=True, null=True, verbose_name='janela desde')),
+                ('total_trades', models.PositiveIntegerField(default=0, verbose_name='total de trades')),
+                ('wins', models.PositiveIntegerField(default=0, verbose_name='gains')),
+                ('losses', models.PositiveIntegerField(default=0, verbose_name='losses')),
+                ('breakevens', models.PositiveIntegerField(default=0, verbose_name='break evens')),
+                ('gain_count', models.PositiveIntegerField(default=0, verbose_name='trades positivos')),
+                ('loss_count', models.PositiveIntegerField(default=0, verbose_name='trades negativos')),
+                ('total_profit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='resultado total')),
+                ('gross_gain', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='ganho bruto')),
+                ('gross_loss', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='perda bruta')),
+                ('total_technical', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='ganho técnico total')),
+                ('best_trade', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True, verbose_name='melhor trade')),
+                ('worst_trade', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True, verbose_name='pior trade')),
+                ('daily', models.JSONField(blank=True, default=dict, verbose_name='resultado diário')),
+                ('buckets', models.JSONField(blank=True, default=dict, verbose_name='agregados por dimensão')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='atualizado em')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trade_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'snapshot de estatísticas',
+                'verbose_name_plural': 'snapshots de estatísticas',
+            },
+        ),
+    ]
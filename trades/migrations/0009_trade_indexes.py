@@ -0,0 +1,65 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0008_tradestatssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='trades', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', 'executed_at'], name='trades_user_executed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['-executed_at', '-id'], name='trades_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(condition=models.Q(('is_public', True), models.Q(('screenshot', ''), _negated=True)), fields=['-executed_at', '-id'], name='trades_mural_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['market', 'result_type', 'profit_amount', 'technical_gain'], name='trades_market_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['setup', 'result_type', 'profit_amount', 'technical_gain'], name='trades_setup_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['entry_type', 'result_type', 'profit_amount', 'technical_gain'], name='trades_entry_type_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['high_time_frame', 'result_type', 'profit_amount', 'technical_gain'], name='trades_high_time_frame_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['trend', 'result_type', 'profit_amount', 'technical_gain'], name='trades_trend_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['smc_panel', 'result_type', 'profit_amount', 'technical_gain'], name='trades_smc_panel_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['region_htf', 'result_type', 'profit_amount', 'technical_gain'], name='trades_region_htf_cov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['trigger', 'result_type', 'profit_amount', 'technical_gain'], name='trades_trigger_cov_idx'),
+        ),
+    ]
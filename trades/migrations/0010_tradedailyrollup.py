@@ -0,0 +1,68 @@
+# Generated by Django 5.2.9 on 2026-10-16 23:34
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Trade = apps.get_model("trades", "Trade")
+    TradeDailyRollup = apps.get_model("trades", "TradeDailyRollup")
+    zero = Decimal("0")
+    rows = (
+        Trade.objects.order_by()
+        .annotate(day=TruncDate("executed_at"), hour=ExtractHour("executed_at"))
+        .values("user_id", "day", "hour", "market")
+        .annotate(
+            count=Count("id"),
+            wins=Count("id", filter=Q(result_type="gain")),
+            losses=Count("id", filter=Q(result_type="loss")),
+            breakevens=Count("id", filter=Q(result_type="break_even")),
+            profit=Coalesce(Sum("profit_amount"), zero),
+            gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), zero),
+            loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), zero),
+            technical=Coalesce(Sum("technical_gain"), zero),
+        )
+    )
+    TradeDailyRollup.objects.bulk_create(
+        (TradeDailyRollup(**row) for row in rows.iterator()), batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0009_trade_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='dia')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='hora')),
+                ('market', models.CharField(choices=[('stocks', 'Ações'), ('indices', 'Índices'), ('dollar', 'Dólar'), ('crypto', 'Cripto'), ('forex', 'Forex')], max_length=20, verbose_name='mercado')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='trades')),
+                ('wins', models.PositiveIntegerField(default=0, verbose_name='gains')),
+                ('losses', models.PositiveIntegerField(default=0, verbose_name='losses')),
+                ('breakevens', models.PositiveIntegerField(default=0, verbose_name='break evens')),
+                ('profit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='resultado')),
+                ('gain', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='soma dos positivos')),
+                ('loss', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='soma dos negativos')),
+                ('technical', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='ganho técnico')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='trade_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'agregado diário de trades',
+                'verbose_name_plural': 'agregados diários de trades',
+                'indexes': [models.Index(fields=['day'], name='trades_rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'hour', 'market'), name='trades_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
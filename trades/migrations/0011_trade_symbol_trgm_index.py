@@ -0,0 +1,57 @@
+# Índice trigram (pg_trgm) para o filtro symbol__icontains das tabelas de trades.
+# No PostgreSQL o icontains vira UPPER("symbol"::text) LIKE UPPER('%...%'): o índice GIN
+# é sobre a mesma expressão. Em outros bancos, ou sem a extensão disponível, não faz nada.
+# Se o papel do deploy não pode criar a extensão (comum em Postgres gerenciado), o índice é
+# pulado com um aviso e o deploy segue: crie antes, com um superusuário, "CREATE EXTENSION
+# pg_trgm" e depois rode o CREATE INDEX de create_trigram_index.
+
+import warnings
+
+from django.db import DatabaseError, migrations, transaction
+
+INDEX_NAME = "trades_symbol_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        installed = cursor.fetchone() is not None
+        if not installed:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                return
+    if not installed:
+        try:
+            # Savepoint: sem permissão, a falha não aborta a transação da migração
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as exc:
+            warnings.warn(
+                f"pg_trgm não pôde ser criada ({exc}); índice {INDEX_NAME} não criado.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON trades_trade "
+        "USING gin ((UPPER(symbol::text)) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0010_tradedailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
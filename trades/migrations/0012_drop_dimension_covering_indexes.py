@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0011_trade_symbol_trgm_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_market_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_setup_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_entry_type_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_high_time_frame_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_trend_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_smc_panel_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_region_htf_cov_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trades_trigger_cov_idx',
+        ),
+    ]
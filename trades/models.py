@@ -111,6 +111,8 @@ class Trade(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="trades",
+        # Coberto pelo índice composto (user, executed_at) em Meta.indexes
+        db_index=False,
     )
     executed_at = models.DateTimeField("executado em")
     symbol = models.CharField("ticker", max_length=20)
@@ -235,11 +237,122 @@ class Trade(models.Model):
         ordering = ("-executed_at", "-id")
         verbose_name = "trade"
         verbose_name_plural = "trades"
+        indexes = [
+            # Dashboards, recálculo de saldo e elegibilidade da IA: user + janela de datas
+            models.Index(fields=["user", "executed_at"], name="trades_user_executed_idx"),
+            # Listagens globais (ordering padrão) e "há trades novos desde X?"
+            models.Index(fields=["-executed_at", "-id"], name="trades_recent_idx"),
+            # Mural: só trades públicos com imagem
+            models.Index(
+                fields=["-executed_at", "-id"],
+                condition=models.Q(is_public=True) & ~models.Q(screenshot=""),
+                name="trades_mural_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.symbol} ({self.get_direction_display()}) - {self.executed_at:%Y-%m-%d %H:%M}"
 
 
+class TradeStatsSnapshot(models.Model):
+    """
+    Estatísticas materializadas dos trades de um usuário (desde o último reset).
+    Mantida incrementalmente pelos signals de Trade; os dashboards leem daqui em O(1).
+    daily guarda {"AAAA-MM-DD": {"count", "profit"}} e buckets guarda
+    {campo: {valor: {"total", "wins", "losses", "breakevens", "profit", "technical"}}}.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="trade_stats",
+    )
+    since = models.DateTimeField("janela desde", blank=True, null=True)
+    total_trades = models.PositiveIntegerField("total de trades", default=0)
+    wins = models.PositiveIntegerField("gains", default=0)
+    losses = models.PositiveIntegerField("losses", default=0)
+    breakevens = models.PositiveIntegerField("break evens", default=0)
+    gain_count = models.PositiveIntegerField("trades positivos", default=0)
+    loss_count = models.PositiveIntegerField("trades negativos", default=0)
+    total_profit = models.DecimalField(
+        "resultado total", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    gross_gain = models.DecimalField(
+        "ganho bruto", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    gross_loss = models.DecimalField(
+        "perda bruta", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    total_technical = models.DecimalField(
+        "ganho técnico total", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    best_trade = models.DecimalField(
+        "melhor trade", max_digits=16, decimal_places=2, blank=True, null=True
+    )
+    worst_trade = models.DecimalField(
+        "pior trade", max_digits=16, decimal_places=2, blank=True, null=True
+    )
+    daily = models.JSONField("resultado diário", default=dict, blank=True)
+    buckets = models.JSONField("agregados por dimensão", default=dict, blank=True)
+    updated_at = models.DateTimeField("atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "snapshot de estatísticas"
+        verbose_name_plural = "snapshots de estatísticas"
+
+    def __str__(self) -> str:
+        return f"Estatísticas de {self.user} ({self.total_trades} trades)"
+
+
+class TradeDailyRollup(models.Model):
+    """
+    Trades pré-agregados por usuário, dia, hora (fuso local) e mercado.
+    Mantido pelos signals de Trade; alimenta série de saldo e gráficos por hora/mercado
+    sem varrer os trades (rebuild: manage.py rebuild_trade_rollups).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="trade_rollups",
+        # Coberto pela unicidade (user, day, hour, market)
+        db_index=False,
+    )
+    day = models.DateField("dia")
+    hour = models.PositiveSmallIntegerField("hora")
+    market = models.CharField("mercado", max_length=20, choices=Market.choices)
+    count = models.PositiveIntegerField("trades", default=0)
+    wins = models.PositiveIntegerField("gains", default=0)
+    losses = models.PositiveIntegerField("losses", default=0)
+    breakevens = models.PositiveIntegerField("break evens", default=0)
+    profit = models.DecimalField("resultado", max_digits=18, decimal_places=2, default=Decimal("0"))
+    gain = models.DecimalField(
+        "soma dos positivos", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    loss = models.DecimalField(
+        "soma dos negativos", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+    technical = models.DecimalField(
+        "ganho técnico", max_digits=18, decimal_places=2, default=Decimal("0")
+    )
+
+    class Meta:
+        verbose_name = "agregado diário de trades"
+        verbose_name_plural = "agregados diários de trades"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day", "hour", "market"], name="trades_rollup_unique"
+            ),
+        ]
+        indexes = [
+            # Dashboard global: série por dia de todos os usuários
+            models.Index(fields=["day"], name="trades_rollup_day_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} {self.day:%Y-%m-%d} {self.hour:02d}h {self.market} ({self.count})"
+
+
 class AIAnalyticsRun(models.Model):
     """
     Registro de cada execução de análise por IA (limite 1x por semana).
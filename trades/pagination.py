@@ -0,0 +1,183 @@
+"""
+Paginação por keyset (seek) das tabelas de trades: páginas pelo par (executed_at, id) em
+ordem decrescente, com cursores opacos no parâmetro trade_page. Cada página é um
+WHERE (executed_at, id) < cursor ... LIMIT n sobre o índice, sem OFFSET: a página 500
+custa o mesmo que a primeira. O total exibido vem da estimativa do planejador
+(PostgreSQL) em vez de um COUNT(*) por página.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Abaixo disso a estimativa do planejador é imprecisa e o COUNT(*) exato é barato
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def encode_cursor(payload: dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str | None) -> dict[str, Any] | None:
+    """Payload do cursor ou None (ausente, inválido ou número de página antigo)."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        executed_at = parse_datetime(payload["t"])
+        pk = int(payload["i"])
+        start = max(1, int(payload.get("s", 1)))
+    except (binascii.Error, ValueError, TypeError, KeyError, json.JSONDecodeError):
+        return None
+    if executed_at is None or payload.get("d") not in ("next", "prev"):
+        return None
+    return {"executed_at": executed_at, "pk": pk, "direction": payload["d"], "start": start}
+
+
+def estimated_count(queryset) -> tuple[int, bool]:
+    """
+    (total, aproximado?). No PostgreSQL usa as linhas estimadas pelo EXPLAIN da consulta;
+    quando a estimativa é pequena (ou em outros bancos) faz o COUNT(*) exato.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
+
+
+class KeysetPage:
+    """Página de trades; interface próxima de django.core.paginator.Page para os templates."""
+
+    def __init__(
+        self,
+        object_list: list,
+        start: int,
+        has_previous: bool,
+        has_next: bool,
+        count: int,
+        count_is_approximate: bool,
+    ):
+        self.object_list = object_list
+        self.start = start
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.count = count
+        self.count_is_approximate = count_is_approximate
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_other_pages(self) -> bool:
+        return self._has_previous or self._has_next
+
+    def start_index(self) -> int:
+        return self.start if self.object_list else 0
+
+    def end_index(self) -> int:
+        return self.start + len(self.object_list) - 1 if self.object_list else 0
+
+    def _cursor(self, trade, direction: str, start: int) -> str:
+        executed_at: datetime = trade.executed_at
+        return encode_cursor(
+            {"t": executed_at.isoformat(), "i": trade.pk, "d": direction, "s": start}
+        )
+
+    def next_cursor(self) -> str | None:
+        if not self._has_next:
+            return None
+        return self._cursor(self.object_list[-1], "next", self.start + len(self.object_list))
+
+    def previous_cursor(self) -> str | None:
+        if not self._has_previous:
+            return None
+        return self._cursor(self.object_list[0], "prev", self.start)
+
+
+class KeysetPaginator:
+    """
+    Pagina um queryset de Trade por (executed_at, id) decrescente.
+    O queryset não deve ter ordenação própria (é substituída).
+    count: (total, aproximado?) já conhecido (ex.: em cache); senão usa estimated_count.
+    """
+
+    def __init__(self, queryset, per_page: int, count: tuple[int, bool] | None = None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count = count
+
+    def get_page(self, token: str | None) -> KeysetPage:
+        cursor = decode_cursor(token)
+        count, approximate = self.count or estimated_count(self.queryset)
+        if cursor is None:
+            return self._first_page(count, approximate)
+
+        ts, pk = cursor["executed_at"], cursor["pk"]
+        if cursor["direction"] == "next":
+            after = Q(executed_at__lt=ts) | Q(executed_at=ts, pk__lt=pk)
+            rows = list(
+                self.queryset.filter(after).order_by("-executed_at", "-pk")[: self.per_page + 1]
+            )
+            return KeysetPage(
+                rows[: self.per_page],
+                cursor["start"],
+                has_previous=True,
+                has_next=len(rows) > self.per_page,
+                count=count,
+                count_is_approximate=approximate,
+            )
+
+        before = Q(executed_at__gt=ts) | Q(executed_at=ts, pk__gt=pk)
+        rows = list(self.queryset.filter(before).order_by("executed_at", "pk")[: self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        if not has_previous:
+            # Voltou ao início (ou trades foram apagados no meio): recomeça da primeira página
+            return self._first_page(count, approximate)
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return KeysetPage(
+            rows,
+            max(1, cursor["start"] - self.per_page),
+            has_previous=True,
+            has_next=True,
+            count=count,
+            count_is_approximate=approximate,
+        )
+
+    def _first_page(self, count: int, approximate: bool) -> KeysetPage:
+        rows = list(self.queryset.order_by("-executed_at", "-pk")[: self.per_page + 1])
+        return KeysetPage(
+            rows[: self.per_page],
+            1,
+            has_previous=False,
+            has_next=len(rows) > self.per_page,
+            count=count,
+            count_is_approximate=approximate,
+        )
@@ -0,0 +1,187 @@
+"""
+Agregado diário de trades (TradeDailyRollup): manutenção incremental e consultas.
+
+Grão: usuário + dia + hora (fuso local) + mercado. Os signals de Trade aplicam deltas
+com F(); séries de saldo e gráficos por hora/mercado leem daqui, varrendo dias em vez
+de trades. Para janelas com last_reset_at, o dia do reset (parcial) vem dos trades
+brutos e os dias seguintes do agregado.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import ResultType, Trade, TradeDailyRollup
+
+METRICS = ("count", "wins", "losses", "breakevens", "profit", "gain", "loss", "technical")
+
+_RESULT_COUNTERS = {
+    ResultType.GAIN: "wins",
+    ResultType.LOSS: "losses",
+    ResultType.BREAK_EVEN: "breakevens",
+}
+
+
+def _bucket(state: dict[str, Any]) -> tuple:
+    local = timezone.localtime(state["executed_at"])
+    return (state["user_id"], local.date(), local.hour, state["market"])
+
+
+def _deltas(state: dict[str, Any], sign: int) -> dict[str, Any]:
+    profit = state["profit_amount"] or Decimal("0")
+    delta: dict[str, Any] = {
+        "count": sign,
+        "wins": 0,
+        "losses": 0,
+        "breakevens": 0,
+        "profit": sign * profit,
+        "gain": sign * profit if profit > 0 else Decimal("0"),
+        "loss": sign * profit if profit < 0 else Decimal("0"),
+        "technical": sign * (state["technical_gain"] or Decimal("0")),
+    }
+    counter = _RESULT_COUNTERS.get(state["result_type"])
+    if counter:
+        delta[counter] = sign
+    return delta
+
+
+def _apply_delta(bucket: tuple, delta: dict[str, Any]) -> None:
+    user_id, day, hour, market = bucket
+    rows = TradeDailyRollup.objects.filter(user_id=user_id, day=day, hour=hour, market=market)
+    updates = {field: F(field) + value for field, value in delta.items() if value}
+    with transaction.atomic():
+        if rows.update(**updates):
+            rows.filter(count__lte=0).delete()
+            return
+        if delta["count"] <= 0:
+            return  # linha já ausente: nada a remover
+        try:
+            with transaction.atomic():
+                TradeDailyRollup.objects.create(
+                    user_id=user_id, day=day, hour=hour, market=market, **delta
+                )
+        except IntegrityError:
+            # Outro processo criou a linha entre o UPDATE e o INSERT
+            rows.update(**updates)
+
+
+def apply_rollup_change(old: dict[str, Any] | None, new: dict[str, Any] | None) -> None:
+    """Aplica a troca de estado de um trade (old=None em criação, new=None em exclusão)."""
+    changes: dict[tuple, dict[str, Any]] = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if not state:
+            continue
+        delta = _deltas(state, sign)
+        current = changes.setdefault(_bucket(state), dict.fromkeys(METRICS, 0))
+        for field, value in delta.items():
+            current[field] += value
+    for bucket, delta in changes.items():
+        if any(delta.values()):
+            _apply_delta(bucket, delta)
+
+
+def _aggregated_trades(trades_qs):
+    """Trades agrupados no grão do agregado (mesmas chaves de TradeDailyRollup)."""
+    zero = Decimal("0")
+    return (
+        trades_qs.order_by()
+        .annotate(day=TruncDate("executed_at"), hour=ExtractHour("executed_at"))
+        .values("user_id", "day", "hour", "market")
+        .annotate(
+            count=Count("id"),
+            wins=Count("id", filter=Q(result_type=ResultType.GAIN)),
+            losses=Count("id", filter=Q(result_type=ResultType.LOSS)),
+            breakevens=Count("id", filter=Q(result_type=ResultType.BREAK_EVEN)),
+            profit=Coalesce(Sum("profit_amount"), zero),
+            gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), zero),
+            loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), zero),
+            technical=Coalesce(Sum("technical_gain"), zero),
+        )
+    )
+
+
+@transaction.atomic
+def rebuild_rollups(user_id: int | None = None, batch_size: int = 2000) -> int:
+    """Recria o agregado a partir dos trades (de um usuário ou de todos). Retorna nº de linhas."""
+    trades = Trade.objects.all()
+    rollups = TradeDailyRollup.objects.all()
+    if user_id is not None:
+        trades = trades.filter(user_id=user_id)
+        rollups = rollups.filter(user_id=user_id)
+    rollups.delete()
+    rows = [TradeDailyRollup(**row) for row in _aggregated_trades(trades).iterator()]
+    TradeDailyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _window(user_id: int | None, since: datetime | None):
+    """(agregados dos dias inteiros da janela, trades brutos do dia parcial do reset ou None)."""
+    rollups = TradeDailyRollup.objects.all()
+    if user_id is not None:
+        rollups = rollups.filter(user_id=user_id)
+    if since is None:
+        return rollups, None
+
+    since_day = timezone.localtime(since).date()
+    next_day_start = timezone.make_aware(datetime.combine(since_day + timedelta(days=1), time.min))
+    partial = Trade.objects.filter(executed_at__gte=since, executed_at__lt=next_day_start)
+    if user_id is not None:
+        partial = partial.filter(user_id=user_id)
+    return rollups.filter(day__gt=since_day), partial
+
+
+def _grouped(user_id: int | None, since: datetime | None, key: str) -> list[tuple[Any, dict]]:
+    """Soma de profit/gain/loss por chave ("day", "hour" ou "market"), ordenada pela chave."""
+    zero = Decimal("0")
+    rollups, partial = _window(user_id, since)
+    totals: dict[Any, dict[str, Decimal]] = {}
+
+    def _add(rows):
+        for row in rows:
+            entry = totals.setdefault(row[key], {"profit": zero, "gain": zero, "loss": zero})
+            for metric in entry:
+                entry[metric] += row[metric]
+
+    _add(
+        rollups.values(key)
+        .annotate(
+            profit=Coalesce(Sum("profit"), zero),
+            gain=Coalesce(Sum("gain"), zero),
+            loss=Coalesce(Sum("loss"), zero),
+        )
+        .order_by()
+    )
+    if partial is not None:
+        _add(
+            _aggregated_trades(partial)
+            .values(key)
+            .annotate(
+                profit=Coalesce(Sum("profit_amount"), zero),
+                gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), zero),
+                loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), zero),
+            )
+            .order_by()
+        )
+    return sorted(totals.items())
+
+
+def daily_profit(user_id: int | None = None, since: datetime | None = None):
+    """[(dia, resultado do dia)] em ordem cronológica."""
+    return [(day, entry["profit"]) for day, entry in _grouped(user_id, since, "day")]
+
+
+def hourly_totals(user_id: int | None = None, since: datetime | None = None):
+    """[(hora, {"profit", "gain", "loss"})] em ordem de hora."""
+    return _grouped(user_id, since, "hour")
+
+
+def market_totals(user_id: int | None = None, since: datetime | None = None):
+    """{mercado: {"profit", "gain", "loss"}}."""
+    return dict(_grouped(user_id, since, "market"))
@@ -1,23 +1,33 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from decimal import Decimal
+from typing import Any, Iterator, Optional
 
-from django.db.models import Sum
-from django.db.models.signals import post_delete, post_save
+from django.contrib.auth import get_user_model
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from accounts.models import Profile
 
+from .cache import invalidate_user
 from .models import Trade
+from .rollups import apply_rollup_change, rebuild_rollups
+from .snapshots import STATE_FIELDS, apply_trade_change, rebuild_snapshot, trade_state
 
+# Usuários tocados dentro de batch_trade_updates() (None = fora de lote)
+_batch_users: ContextVar[Optional[set[int]]] = ContextVar("trade_batch_users", default=None)
 
-def _recalculate_profile_balance(user) -> None:
-    try:
-        profile: Profile = user.profile
-    except Profile.DoesNotExist:
+
+def _recalculate_profile_balance(user_id: int) -> None:
+    """Recalcula o saldo somando todos os trades da janela (usado na reconciliação de lotes)."""
+    profile = Profile.objects.filter(user_id=user_id).first()
+    if profile is None:
         return
 
-    trades_qs = user.trades.all()
+    trades_qs = Trade.objects.filter(user_id=user_id)
     if profile.last_reset_at:
         trades_qs = trades_qs.filter(executed_at__gte=profile.last_reset_at)
 
@@ -26,11 +36,137 @@ def _recalculate_profile_balance(user) -> None:
     profile.save(update_fields=["current_balance"])
 
 
+def _windowed_profit(state: dict[str, Any]) -> Case:
+    """profit_amount do trade se ele está na janela do perfil (executed_at >= last_reset_at)."""
+    return Case(
+        When(
+            Q(last_reset_at__isnull=True) | Q(last_reset_at__lte=state["executed_at"]),
+            then=Value(state["profit_amount"] or Decimal("0")),
+        ),
+        default=Value(Decimal("0")),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+
+
+def _apply_balance_delta(old: dict[str, Any] | None, new: dict[str, Any] | None) -> None:
+    """
+    Atualiza current_balance com o delta do trade (novo - antigo) num único UPDATE com F():
+    O(1) por save e atômico frente a saves concorrentes do mesmo usuário.
+    """
+    terms: dict[int, list[tuple[int, dict[str, Any]]]] = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state:
+            terms.setdefault(state["user_id"], []).append((sign, state))
+
+    for user_id, user_terms in terms.items():
+        if len(user_terms) == 2 and old == new:
+            continue
+        expression = F("current_balance")
+        for sign, state in user_terms:
+            if sign > 0:
+                expression = expression + _windowed_profit(state)
+            else:
+                expression = expression - _windowed_profit(state)
+        Profile.objects.filter(user_id=user_id).update(current_balance=expression)
+
+
+def _sync_cached_profile(instance: Trade) -> None:
+    """Mantém o Profile já carregado em memória (instance.user.profile) coerente com o banco."""
+    if not Trade.user.is_cached(instance):
+        return
+    user = instance.user
+    if get_user_model().profile.is_cached(user):
+        user.profile.refresh_from_db(fields=["current_balance"])
+
+
+def reconcile_user(user_id: int) -> None:
+    """Recalcula saldo, snapshot, agregado diário e cache do usuário a partir do banco."""
+    _recalculate_profile_balance(user_id)
+    rebuild_snapshot(user_id)
+    rebuild_rollups(user_id)
+    invalidate_user(user_id)
+
+
+def mark_batch_user(user_id: int) -> None:
+    """Registra usuário a reconciliar no fim do lote (ex.: trades criados via bulk_create)."""
+    users = _batch_users.get()
+    if users is not None:
+        users.add(user_id)
+
+
+@contextmanager
+def batch_trade_updates() -> Iterator[None]:
+    """
+    Suspende a manutenção por trade (saldo, snapshot, agregados, cache) durante importações
+    em lote e reconcilia uma única vez por usuário ao final. Aninhável: só o bloco externo
+    reconcilia.
+    """
+    if _batch_users.get() is not None:
+        yield
+        return
+    users: set[int] = set()
+    token = _batch_users.set(users)
+    try:
+        yield
+    finally:
+        _batch_users.reset(token)
+    for user_id in sorted(users):
+        reconcile_user(user_id)
+
+
+def _in_batch(*states: dict[str, Any] | None) -> bool:
+    users = _batch_users.get()
+    if users is None:
+        return False
+    users.update(state["user_id"] for state in states if state)
+    return True
+
+
+@receiver(pre_save, sender=Trade)
+def capture_previous_trade_state(sender, instance: Trade, **kwargs) -> None:
+    """Guarda o estado gravado no banco antes do save (para aplicar deltas no post_save)."""
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            Trade.objects.filter(pk=instance.pk).values(*STATE_FIELDS).first()
+        )
+
+
 @receiver(post_save, sender=Trade)
-def update_balance_after_trade_save(sender, instance: Trade, **kwargs) -> None:
-    _recalculate_profile_balance(instance.user)
+def update_stats_after_trade_save(sender, instance: Trade, **kwargs) -> None:
+    previous = getattr(instance, "_previous_state", None)
+    current = trade_state(instance)
+    if _in_batch(previous, current):
+        return
+    _apply_balance_delta(previous, current)
+    _sync_cached_profile(instance)
+    apply_trade_change(previous, current)
+    apply_rollup_change(previous, current)
+    invalidate_user(instance.user_id)
+    if previous and previous["user_id"] != instance.user_id:
+        invalidate_user(previous["user_id"])
 
 
 @receiver(post_delete, sender=Trade)
-def update_balance_after_trade_delete(sender, instance: Trade, **kwargs) -> None:
-    _recalculate_profile_balance(instance.user)
+def update_stats_after_trade_delete(sender, instance: Trade, **kwargs) -> None:
+    state = trade_state(instance)
+    if _in_batch(state):
+        return
+    _apply_balance_delta(state, None)
+    _sync_cached_profile(instance)
+    apply_trade_change(state, None)
+    apply_rollup_change(state, None)
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def rebuild_snapshot_after_reset(sender, instance: Profile, update_fields=None, **kwargs) -> None:
+    """Profile.reset_balance muda a janela (last_reset_at): o snapshot é reconstruído."""
+    if update_fields and "last_reset_at" in update_fields:
+        rebuild_snapshot(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_dashboards_after_profile_save(sender, instance: Profile, **kwargs) -> None:
+    """Saldo inicial/atual e janela de reset aparecem nos dashboards em cache."""
+    invalidate_user(instance.user_id)
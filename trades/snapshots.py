@@ -0,0 +1,276 @@
+"""
+Snapshot materializado das estatísticas de trades por usuário (TradeStatsSnapshot).
+
+Os signals de Trade aplicam deltas (remove o estado antigo, soma o novo) e os
+dashboards leem o snapshot sem varrer os trades. Quando o snapshot não existe ou
+a janela (last_reset_at) mudou, ele é reconstruído a partir do banco.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDay
+from django.utils import timezone
+
+from accounts.models import Profile
+
+from .analytics import (
+    DIMENSIONS,
+    _balance_points,
+    _breakdown_rows,
+    _build_user_dashboard,
+    aggregate_breakdowns,
+    compute_summary,
+)
+from .models import ResultType, Trade, TradeStatsSnapshot
+
+STATE_FIELDS = (
+    "user_id",
+    "executed_at",
+    "result_type",
+    "profit_amount",
+    "technical_gain",
+    *DIMENSIONS,
+)
+
+_RESULT_COUNTERS = {
+    ResultType.GAIN: "wins",
+    ResultType.LOSS: "losses",
+    ResultType.BREAK_EVEN: "breakevens",
+}
+
+
+def _dec(value: Any) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _window(user_id: int, since) -> Any:
+    trades = Trade.objects.filter(user_id=user_id)
+    if since:
+        trades = trades.filter(executed_at__gte=since)
+    return trades
+
+
+def trade_state(trade: Trade) -> dict[str, Any]:
+    """Campos do trade que alimentam o snapshot (capturados antes/depois do save)."""
+    return {field: getattr(trade, field) for field in STATE_FIELDS}
+
+
+def _in_window(snapshot: TradeStatsSnapshot, state: dict[str, Any]) -> bool:
+    return snapshot.since is None or state["executed_at"] >= snapshot.since
+
+
+def _apply(snapshot: TradeStatsSnapshot, state: dict[str, Any], sign: int) -> bool:
+    """
+    Soma (sign=1) ou remove (sign=-1) um trade do snapshot.
+    Retorna True quando melhor/pior trade precisam ser recalculados.
+    """
+    profit = _dec(state["profit_amount"])
+    technical = _dec(state["technical_gain"])
+
+    snapshot.total_trades += sign
+    counter = _RESULT_COUNTERS.get(state["result_type"])
+    if counter:
+        setattr(snapshot, counter, getattr(snapshot, counter) + sign)
+    if profit > 0:
+        snapshot.gain_count += sign
+        snapshot.gross_gain += sign * profit
+    elif profit < 0:
+        snapshot.loss_count += sign
+        snapshot.gross_loss += sign * profit
+    snapshot.total_profit += sign * profit
+    snapshot.total_technical += sign * technical
+
+    day = timezone.localtime(state["executed_at"]).date().isoformat()
+    entry = snapshot.daily.setdefault(day, {"count": 0, "profit": "0"})
+    entry["count"] += sign
+    entry["profit"] = str(_dec(entry["profit"]) + sign * profit)
+    if entry["count"] <= 0:
+        snapshot.daily.pop(day)
+
+    for field in DIMENSIONS:
+        values = snapshot.buckets.setdefault(field, {})
+        value = state[field] or ""
+        bucket = values.setdefault(
+            value,
+            {"total": 0, "wins": 0, "losses": 0, "breakevens": 0, "profit": "0", "technical": "0"},
+        )
+        bucket["total"] += sign
+        if counter:
+            bucket[counter] += sign
+        bucket["profit"] = str(_dec(bucket["profit"]) + sign * profit)
+        bucket["technical"] = str(_dec(bucket["technical"]) + sign * technical)
+        if bucket["total"] <= 0:
+            values.pop(value)
+
+    if sign > 0:
+        if snapshot.best_trade is None or profit > snapshot.best_trade:
+            snapshot.best_trade = profit
+        if snapshot.worst_trade is None or profit < snapshot.worst_trade:
+            snapshot.worst_trade = profit
+        return False
+    return profit == snapshot.best_trade or profit == snapshot.worst_trade
+
+
+def _refresh_extremes(snapshot: TradeStatsSnapshot) -> None:
+    agg = _window(snapshot.user_id, snapshot.since).aggregate(
+        best=Max("profit_amount"), worst=Min("profit_amount")
+    )
+    snapshot.best_trade = agg["best"]
+    snapshot.worst_trade = agg["worst"]
+
+
+def apply_trade_change(old: dict[str, Any] | None, new: dict[str, Any] | None) -> None:
+    """
+    Atualiza o(s) snapshot(s) afetados pela troca de estado de um trade.
+    old=None em criação; new=None em exclusão.
+    """
+    user_ids = {state["user_id"] for state in (old, new) if state}
+    for user_id in user_ids:
+        with transaction.atomic():
+            snapshot = (
+                TradeStatsSnapshot.objects.select_for_update().filter(user_id=user_id).first()
+            )
+            if snapshot is None:
+                rebuild_snapshot(user_id)
+                continue
+            refresh = False
+            if old and old["user_id"] == user_id and _in_window(snapshot, old):
+                refresh = _apply(snapshot, old, -1)
+            if new and new["user_id"] == user_id and _in_window(snapshot, new):
+                _apply(snapshot, new, 1)
+            if refresh:
+                _refresh_extremes(snapshot)
+            snapshot.save()
+
+
+def rebuild_snapshot(user) -> TradeStatsSnapshot:
+    """Recalcula o snapshot do usuário a partir dos trades (desde o último reset)."""
+    user_id = getattr(user, "pk", user)
+    since = Profile.objects.filter(user_id=user_id).values_list("last_reset_at", flat=True).first()
+    trades = _window(user_id, since)
+
+    agg = compute_summary(trades)
+    has_trades = bool(agg["total_trades"])
+
+    daily_rows = (
+        trades.annotate(day=TruncDay("executed_at"))
+        .values("day")
+        .annotate(count=Count("id"), profit=Coalesce(Sum("profit_amount"), Decimal("0")))
+        .order_by("day")
+    )
+    daily = {
+        row["day"].date().isoformat(): {"count": row["count"], "profit": str(row["profit"])}
+        for row in daily_rows
+    }
+
+    # Todas as dimensões numa única consulta (GROUPING SETS / UNION ALL)
+    buckets = {
+        field: {
+            row[field] or "": {
+                "total": row["total"],
+                "wins": row["wins"],
+                "losses": row["losses"],
+                "breakevens": row["breakevens"],
+                "profit": str(row["total_profit"]),
+                "technical": str(row["total_technical"]),
+            }
+            for row in rows
+        }
+        for field, rows in aggregate_breakdowns(trades, DIMENSIONS).items()
+    }
+
+    snapshot, _ = TradeStatsSnapshot.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "since": since,
+            "total_trades": agg["total_trades"],
+            "wins": agg["wins"],
+            "losses": agg["losses"],
+            "breakevens": agg["breakevens"],
+            "gain_count": agg["gain_count"],
+            "loss_count": agg["loss_count"],
+            "total_profit": agg["total_profit"],
+            "gross_gain": agg["gross_gain"],
+            "gross_loss": agg["gross_loss"],
+            "total_technical": agg["total_technical"],
+            "best_trade": agg["best_trade"] if has_trades else None,
+            "worst_trade": agg["worst_trade"] if has_trades else None,
+            "daily": daily,
+            "buckets": buckets,
+        },
+    )
+    return snapshot
+
+
+def get_user_snapshot(user) -> TradeStatsSnapshot:
+    """Retorna o snapshot do usuário, reconstruindo se ausente ou com janela desatualizada."""
+    snapshot = TradeStatsSnapshot.objects.filter(user=user).first()
+    if snapshot is None or snapshot.since != user.profile.last_reset_at:
+        snapshot = rebuild_snapshot(user)
+    return snapshot
+
+
+def snapshot_summary(snapshot: TradeStatsSnapshot) -> dict[str, Any]:
+    """Agregados no mesmo formato de compute_summary, lidos do snapshot."""
+    zero = Decimal("0")
+    total = snapshot.total_trades
+    return {
+        "total_trades": total,
+        "gain_count": snapshot.gain_count,
+        "loss_count": snapshot.loss_count,
+        "wins": snapshot.wins,
+        "losses": snapshot.losses,
+        "breakevens": snapshot.breakevens,
+        "total_profit": snapshot.total_profit,
+        "avg_profit": snapshot.total_profit / total if total else zero,
+        "gross_gain": snapshot.gross_gain,
+        "gross_loss": snapshot.gross_loss,
+        "avg_gain": snapshot.gross_gain / snapshot.gain_count if snapshot.gain_count else zero,
+        "avg_loss": snapshot.gross_loss / snapshot.loss_count if snapshot.loss_count else zero,
+        "best_trade": snapshot.best_trade if snapshot.best_trade is not None else zero,
+        "worst_trade": snapshot.worst_trade if snapshot.worst_trade is not None else zero,
+        "total_technical": snapshot.total_technical,
+    }
+
+
+def snapshot_breakdown(snapshot: TradeStatsSnapshot, field: str) -> list[dict[str, Any]]:
+    """Tabela por dimensão (mesmo formato de _aggregate_by) lida do snapshot."""
+    rows = []
+    for value, bucket in snapshot.buckets.get(field, {}).items():
+        total = bucket["total"]
+        rows.append(
+            {
+                field: value,
+                "total": total,
+                "wins": bucket["wins"],
+                "losses": bucket["losses"],
+                "breakevens": bucket["breakevens"],
+                "avg_profit": _dec(bucket["profit"]) / total,
+                "avg_technical": _dec(bucket["technical"]) / total,
+            }
+        )
+    rows.sort(key=lambda row: (-row["total"], row[field]))
+    return _breakdown_rows(rows, field, dict(DIMENSIONS[field].choices))
+
+
+def snapshot_dashboard(user, snapshot: TradeStatsSnapshot | None = None) -> dict[str, Any]:
+    """Equivalente a compute_user_dashboard, lido do snapshot (O(1) no número de trades)."""
+    profile = user.profile
+    snapshot = snapshot or get_user_snapshot(user)
+
+    days = sorted(snapshot.daily)
+    balance_series = _balance_points(
+        days, [_dec(snapshot.daily[day]["profit"]) for day in days], profile.initial_balance
+    )
+
+    breakdowns = {
+        "by_market": snapshot_breakdown(snapshot, "market"),
+        "by_setup": snapshot_breakdown(snapshot, "setup"),
+        "by_entry_type": snapshot_breakdown(snapshot, "entry_type"),
+    }
+    return _build_user_dashboard(profile, snapshot_summary(snapshot), balance_series, breakdowns)
@@ -2,26 +2,43 @@
 Testes do app trades - CRUD, analytics, forms, views e llm_service.
 """
 
+import random
+import unittest
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from accounts.models import Plan
+from accounts.models import Plan, Profile
 from accounts.tests import create_profile, create_user
 
+from . import cache as dashboard_cache
 from .analytics import (
+    DIMENSIONS,
+    _aggregate_by,
+    _daily_balance_series,
+    aggregate_breakdowns,
     compute_advanced_metrics,
+    compute_breakdowns,
     compute_drawdown_series,
     compute_global_dashboard,
     compute_profit_factor_payoff,
     compute_streaks,
+    compute_summary,
     compute_user_dashboard,
+    rollup_balance_series,
 )
+from .filters import AdvancedTradeFilterSet, BasicTradeFilterSet
 from .forms import TradeForm
 from .llm_service import AnalyticsLLMError, run_analytics_llm, run_global_analytics_llm
 from .models import (
@@ -38,9 +55,16 @@ from .models import (
     Setup,
     SMCPanel,
     Trade,
+    TradeDailyRollup,
+    TradeStatsSnapshot,
     Trend,
     Trigger,
 )
+from .pagination import KeysetPaginator, encode_cursor, estimated_count
+from .rollups import METRICS as ROLLUP_METRICS
+from .rollups import hourly_totals, market_totals, rebuild_rollups
+from .signals import batch_trade_updates
+from .snapshots import get_user_snapshot, snapshot_breakdown, snapshot_dashboard
 
 User = get_user_model()
 
@@ -145,6 +169,75 @@ class TradeModelTest(TestCase):
         self.assertIn("Compra", str(trade))
 
 
+# ---------------------------------------------------------------------------
+# Signals - saldo do perfil
+# ---------------------------------------------------------------------------
+
+
+class ProfileBalanceSignalTest(TestCase):
+    """Saldo mantido por delta (F()) e modo em lote com reconciliação única."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.profile = create_profile(self.user, initial_balance=Decimal("1000"))
+        self.profile.current_balance = Decimal("1000")
+        self.profile.save()
+
+    def balance(self):
+        return Profile.objects.get(pk=self.profile.pk).current_balance
+
+    def test_criacao_edicao_e_exclusao_aplicam_delta(self):
+        trade = create_trade(self.user, profit_amount=Decimal("150"))
+        self.assertEqual(self.balance(), Decimal("1150"))
+        trade.profit_amount = Decimal("-30")
+        trade.save()
+        self.assertEqual(self.balance(), Decimal("970"))
+        trade.delete()
+        self.assertEqual(self.balance(), Decimal("1000"))
+
+    def test_save_nao_soma_todos_os_trades(self):
+        create_trade(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            create_trade(self.user, profit_amount=Decimal("50"))
+        sums = [q["sql"] for q in ctx.captured_queries if 'SUM("trades_trade"' in q["sql"]]
+        self.assertEqual(sums, [])
+        self.assertEqual(self.balance(), Decimal("1150"))
+
+    def test_trade_movido_para_antes_do_reset_sai_do_saldo(self):
+        self.profile.reset_balance(Decimal("500"))
+        trade = create_trade(self.user, profit_amount=Decimal("80"))
+        self.assertEqual(self.balance(), Decimal("580"))
+        trade.executed_at = self.profile.last_reset_at - timezone.timedelta(days=1)
+        trade.save()
+        self.assertEqual(self.balance(), Decimal("500"))
+
+    def test_trade_trocado_de_usuario_ajusta_os_dois_saldos(self):
+        other = create_user(email="outro@example.com")
+        other_profile = create_profile(other, initial_balance=Decimal("0"))
+        trade = create_trade(self.user, profit_amount=Decimal("40"))
+        trade.user = other
+        trade.save()
+        self.assertEqual(self.balance(), Decimal("1000"))
+        self.assertEqual(Profile.objects.get(pk=other_profile.pk).current_balance, Decimal("40"))
+
+    def test_lote_reconcilia_uma_vez_ao_final(self):
+        with batch_trade_updates():
+            with batch_trade_updates():
+                for _ in range(3):
+                    create_trade(self.user, profit_amount=Decimal("10"))
+            self.assertEqual(self.balance(), Decimal("1000"))
+        self.assertEqual(self.balance(), Decimal("1030"))
+        self.assertEqual(get_user_snapshot(self.user).total_trades, 3)
+
+    def test_populate_trades_usa_lote(self):
+        call_command(
+            "populate_trades", user=str(self.user.pk), count=5, no_reset=True, stdout=StringIO()
+        )
+        total = sum(Trade.objects.filter(user=self.user).values_list("profit_amount", flat=True))
+        self.assertEqual(self.balance(), Decimal("1000") + total)
+        self.assertEqual(get_user_snapshot(self.user).total_trades, 5)
+
+
 # ---------------------------------------------------------------------------
 # Forms
 # ---------------------------------------------------------------------------
@@ -258,6 +351,93 @@ class ComputeDrawdownSeriesTest(TestCase):
         self.assertLess(max_dd, 0)
 
 
+def _reference_streaks(profit_amounts):
+    """Implementação original (laço em Python) usada como referência de paridade."""
+    longest_win = longest_loss = current_win = current_loss = 0
+    for amount in profit_amounts:
+        if amount > 0:
+            current_win += 1
+            current_loss = 0
+        elif amount < 0:
+            current_loss += 1
+            current_win = 0
+        else:
+            current_win = 0
+            current_loss = 0
+        longest_win = max(longest_win, current_win)
+        longest_loss = max(longest_loss, current_loss)
+    return longest_win, longest_loss
+
+
+def _reference_drawdown(balance_series, initial_balance):
+    """Implementação original (Decimal por ponto) usada como referência de paridade."""
+    peak = Decimal(str(initial_balance))
+    dd_series = []
+    max_dd = Decimal("0")
+    max_dd_pct = Decimal("0")
+    for point in balance_series:
+        bal = Decimal(str(point["balance"]))
+        peak = max(peak, bal)
+        dd = bal - peak
+        dd_pct = (dd / peak * 100) if peak else Decimal("0")
+        max_dd = min(max_dd, dd)
+        max_dd_pct = min(max_dd_pct, dd_pct)
+        dd_series.append(float(dd))
+    return dd_series, max_dd, max_dd_pct
+
+
+class AnalyticsKernelParityTest(TestCase):
+    """Núcleo NumPy deve reproduzir exatamente as implementações em Python puro."""
+
+    def random_profits(self, rng, size):
+        return [
+            Decimal(rng.randint(-50000, 50000)) / 100 if rng.random() > 0.1 else Decimal("0")
+            for _ in range(size)
+        ]
+
+    def test_streaks_em_sequencias_aleatorias(self):
+        rng = random.Random(42)
+        for size in (0, 1, 2, 17, 500):
+            profits = self.random_profits(rng, size)
+            self.assertEqual(compute_streaks(profits), _reference_streaks(profits))
+
+    def test_drawdown_em_series_aleatorias(self):
+        rng = random.Random(7)
+        for initial in (Decimal("0"), Decimal("1000"), Decimal("250.55"), Decimal("-100")):
+            for size in (0, 1, 30, 400):
+                balance = initial
+                series = []
+                for profit in self.random_profits(rng, size):
+                    balance += profit
+                    series.append({"balance": round(float(balance), 2)})
+                expected = _reference_drawdown(series, initial)
+                self.assertEqual(compute_drawdown_series(series, initial), expected)
+
+    def test_serie_de_saldo_igual_ao_acumulado_em_decimal(self):
+        user = create_user()
+        create_profile(user, initial_balance=Decimal("1000.10"))
+        rng = random.Random(3)
+        now = timezone.now()
+        for profit in self.random_profits(rng, 40):
+            create_trade(
+                user,
+                profit_amount=profit,
+                executed_at=now - timezone.timedelta(days=rng.randint(0, 20)),
+            )
+        series = compute_user_dashboard(user)["balance_series"]
+        running = Decimal("1000.10")
+        for point in series:
+            day_profit = sum(
+                Trade.objects.filter(user=user, executed_at__date=point["date"]).values_list(
+                    "profit_amount", flat=True
+                ),
+                Decimal("0"),
+            )
+            running += day_profit
+            self.assertEqual(point["balance"], round(float(running), 2))
+            self.assertEqual(point["daily_profit"], round(float(day_profit), 2))
+
+
 class ComputeAdvancedMetricsTest(TestCase):
     """Testes de compute_advanced_metrics."""
 
@@ -281,6 +461,36 @@ class ComputeAdvancedMetricsTest(TestCase):
         self.assertEqual(result["longest_loss_streak"], 0)
 
 
+class ComputeSummaryTest(TestCase):
+    """Testes de compute_summary (agregação em consulta única)."""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def test_calcula_resumo_em_uma_unica_consulta(self):
+        create_trade(self.user, profit_amount=Decimal("100"), result_type=ResultType.GAIN)
+        create_trade(self.user, profit_amount=Decimal("300"), result_type=ResultType.GAIN)
+        create_trade(self.user, profit_amount=Decimal("-50"), result_type=ResultType.LOSS)
+        create_trade(self.user, profit_amount=Decimal("0"), result_type=ResultType.BREAK_EVEN)
+        with self.assertNumQueries(1):
+            agg = compute_summary(Trade.objects.filter(user=self.user))
+        self.assertEqual(agg["total_trades"], 4)
+        self.assertEqual((agg["wins"], agg["losses"], agg["breakevens"]), (2, 1, 1))
+        self.assertEqual(agg["total_profit"], Decimal("350"))
+        self.assertEqual(agg["gross_gain"], Decimal("400"))
+        self.assertEqual(agg["gross_loss"], Decimal("-50"))
+        self.assertEqual(agg["avg_gain"], Decimal("200"))
+        self.assertEqual(agg["avg_loss"], Decimal("-50"))
+        self.assertEqual(agg["best_trade"], Decimal("300"))
+        self.assertEqual(agg["worst_trade"], Decimal("-50"))
+
+    def test_retorna_zeros_sem_trades(self):
+        agg = compute_summary(Trade.objects.none())
+        self.assertEqual(agg["total_trades"], 0)
+        self.assertEqual(agg["total_profit"], Decimal("0"))
+        self.assertEqual(agg["avg_gain"], Decimal("0"))
+
+
 class ComputeUserDashboardTest(TestCase):
     """Testes de compute_user_dashboard."""
 
@@ -305,6 +515,211 @@ class ComputeUserDashboardTest(TestCase):
         self.assertEqual(result["summary"]["total_profit"], 50.0)
 
 
+class BreakdownEngineTest(TestCase):
+    """Todas as dimensões numa consulta, no mesmo formato de _aggregate_by."""
+
+    def setUp(self):
+        self.user = create_user()
+        create_profile(self.user)
+        create_trade(self.user, profit_amount=Decimal("100"), technical_gain=Decimal("120"))
+        create_trade(
+            self.user,
+            profit_amount=Decimal("-40"),
+            result_type=ResultType.LOSS,
+            market=Market.FOREX,
+            setup=Setup.CHOCH,
+        )
+        create_trade(
+            self.user,
+            profit_amount=Decimal("0"),
+            result_type=ResultType.BREAK_EVEN,
+            trend=Trend.BEARISH,
+        )
+
+    def test_uma_unica_consulta_para_todas_as_dimensoes(self):
+        with self.assertNumQueries(1):
+            tables = aggregate_breakdowns(Trade.objects.all())
+        self.assertEqual(set(tables), set(DIMENSIONS))
+
+    def test_mesmo_resultado_de_aggregate_by(self):
+        tables = compute_breakdowns(Trade.objects.all())
+        for field, choices in DIMENSIONS.items():
+            expected = _aggregate_by(Trade.objects.all(), field, dict(choices.choices))
+            self.assertEqual(tables[field], expected, field)
+
+    def test_respeita_filtros_do_queryset(self):
+        tables = aggregate_breakdowns(Trade.objects.filter(profit_amount__gt=0), ["market"])
+        self.assertEqual(len(tables["market"]), 1)
+        self.assertEqual(tables["market"][0]["total"], 1)
+        self.assertEqual(tables["market"][0]["total_technical"], Decimal("120"))
+
+    def test_queryset_vazio(self):
+        tables = aggregate_breakdowns(Trade.objects.none(), ["setup", "trend"])
+        self.assertEqual(tables, {"setup": [], "trend": []})
+
+
+class TradeStatsSnapshotTest(TestCase):
+    """Snapshot incremental deve bater com o cálculo direto (compute_user_dashboard)."""
+
+    def setUp(self):
+        self.user = create_user()
+        create_profile(self.user, initial_balance=Decimal("1000"))
+        now = timezone.now()
+        self.t1 = create_trade(
+            self.user,
+            profit_amount=Decimal("100"),
+            executed_at=now - timezone.timedelta(days=2),
+        )
+        self.t2 = create_trade(
+            self.user,
+            profit_amount=Decimal("-40"),
+            result_type=ResultType.LOSS,
+            market=Market.FOREX,
+            executed_at=now - timezone.timedelta(days=1),
+        )
+        self.t3 = create_trade(
+            self.user,
+            profit_amount=Decimal("250"),
+            setup=Setup.CHOCH,
+            executed_at=now - timezone.timedelta(days=1),
+        )
+
+    def assertSnapshotMatches(self):
+        self.user.refresh_from_db()
+        self.assertEqual(snapshot_dashboard(self.user), compute_user_dashboard(self.user))
+
+    def test_snapshot_igual_ao_calculo_direto_apos_criacao(self):
+        self.assertSnapshotMatches()
+
+    def test_snapshot_atualiza_em_edicao_do_melhor_trade(self):
+        self.t3.profit_amount = Decimal("10")
+        self.t3.market = Market.CRYPTO
+        self.t3.save()
+        self.assertSnapshotMatches()
+        self.assertEqual(snapshot_dashboard(self.user)["summary"]["best_trade"], 100.0)
+
+    def test_snapshot_atualiza_em_exclusao(self):
+        self.t2.delete()
+        self.assertSnapshotMatches()
+        self.assertEqual(snapshot_dashboard(self.user)["summary"]["losses"], 0)
+
+    def test_reset_balance_reconstroi_snapshot(self):
+        self.user.profile.reset_balance(Decimal("500"))
+        snapshot = get_user_snapshot(self.user)
+        self.assertEqual(snapshot.total_trades, 0)
+        self.assertEqual(snapshot.since, self.user.profile.last_reset_at)
+        self.assertSnapshotMatches()
+
+    def test_breakdown_por_dimensao(self):
+        rows = snapshot_breakdown(get_user_snapshot(self.user), "setup")
+        self.assertEqual([r["label"] for r in rows], ["Flip", "Choch"])
+        self.assertEqual(rows[0]["count"], 2)
+
+    def test_leitura_nao_varre_trades(self):
+        get_user_snapshot(self.user)
+        self.user.refresh_from_db()
+        self.user.profile
+        with self.assertNumQueries(1):
+            snapshot_dashboard(self.user)
+
+
+class TradeDailyRollupTest(TestCase):
+    """Agregado diário mantido pelos signals deve bater com a agregação direta dos trades."""
+
+    def setUp(self):
+        self.user = create_user()
+        create_profile(self.user, initial_balance=Decimal("1000"))
+        self.now = timezone.now().replace(microsecond=0)
+        self.t1 = create_trade(
+            self.user,
+            profit_amount=Decimal("100"),
+            executed_at=self.now - timezone.timedelta(days=2),
+        )
+        self.t2 = create_trade(
+            self.user,
+            profit_amount=Decimal("-40"),
+            result_type=ResultType.LOSS,
+            market=Market.FOREX,
+            executed_at=self.now - timezone.timedelta(days=1, hours=3),
+        )
+        self.t3 = create_trade(
+            self.user,
+            profit_amount=Decimal("250"),
+            executed_at=self.now - timezone.timedelta(days=1),
+        )
+
+    def assertRollupMatchesTrades(self):
+        maintained = list(
+            TradeDailyRollup.objects.order_by("user_id", "day", "hour", "market").values(
+                "user_id", "day", "hour", "market", *ROLLUP_METRICS
+            )
+        )
+        rebuild_rollups()
+        rebuilt = list(
+            TradeDailyRollup.objects.order_by("user_id", "day", "hour", "market").values(
+                "user_id", "day", "hour", "market", *ROLLUP_METRICS
+            )
+        )
+        self.assertEqual(maintained, rebuilt)
+
+    def test_signals_mantem_agregado_em_criacao_edicao_e_exclusao(self):
+        self.assertRollupMatchesTrades()
+        self.t3.executed_at = self.now - timezone.timedelta(days=5)
+        self.t3.market = Market.CRYPTO
+        self.t3.profit_amount = Decimal("-10")
+        self.t3.result_type = ResultType.LOSS
+        self.t3.save()
+        self.assertRollupMatchesTrades()
+        self.t1.delete()
+        self.assertRollupMatchesTrades()
+        self.assertFalse(TradeDailyRollup.objects.filter(market=Market.CRYPTO, wins__gt=0))
+
+    def test_exclusao_do_ultimo_trade_do_grupo_remove_linha(self):
+        self.t2.delete()
+        self.assertFalse(TradeDailyRollup.objects.filter(market=Market.FOREX).exists())
+
+    def test_serie_de_saldo_igual_a_agregacao_direta(self):
+        trades = Trade.objects.filter(user=self.user)
+        self.assertEqual(
+            rollup_balance_series(self.user.pk, None, Decimal("1000")),
+            _daily_balance_series(trades, Decimal("1000")),
+        )
+        self.assertEqual(
+            rollup_balance_series(None, None, Decimal("0")),
+            _daily_balance_series(Trade.objects.all(), Decimal("0")),
+        )
+
+    def test_janela_de_reset_no_meio_do_dia_usa_trades_brutos(self):
+        since = self.t2.executed_at + timezone.timedelta(minutes=1)
+        trades = Trade.objects.filter(user=self.user, executed_at__gte=since)
+        self.assertEqual(
+            rollup_balance_series(self.user.pk, since, Decimal("500")),
+            _daily_balance_series(trades, Decimal("500")),
+        )
+
+    def test_graficos_por_hora_e_mercado(self):
+        hours = dict(hourly_totals(self.user.pk))
+        t2_hour = timezone.localtime(self.t2.executed_at).hour
+        self.assertEqual(hours[t2_hour]["loss"], Decimal("-40"))
+        markets = market_totals(self.user.pk)
+        self.assertEqual(markets[Market.STOCKS]["gain"], Decimal("350"))
+        self.assertEqual(markets[Market.FOREX]["profit"], Decimal("-40"))
+
+    def test_lote_reconstroi_agregado_ao_final(self):
+        with batch_trade_updates():
+            create_trade(self.user, profit_amount=Decimal("7"))
+            self.assertEqual(TradeDailyRollup.objects.aggregate(n=Sum("count"))["n"], 3)
+        self.assertRollupMatchesTrades()
+        self.assertEqual(TradeDailyRollup.objects.aggregate(n=Sum("count"))["n"], 4)
+
+    def test_comando_rebuild_trade_rollups(self):
+        TradeDailyRollup.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_trade_rollups", user=str(self.user.pk), stdout=out)
+        self.assertIn("3 linha(s)", out.getvalue())
+        self.assertEqual(TradeDailyRollup.objects.aggregate(n=Sum("count"))["n"], 3)
+
+
 class ComputeGlobalDashboardTest(TestCase):
     """Testes de compute_global_dashboard."""
 
@@ -529,6 +944,126 @@ class DashboardViewTest(TestCase):
         self.assertIn("dashboard", response.context)
         self.assertIn("summary", response.context["dashboard"])
 
+    def test_paginacao_de_trades_por_cursor(self):
+        create_profile(self.user)
+        now = timezone.now()
+        for i in range(12):
+            create_trade(self.user, executed_at=now - timezone.timedelta(hours=i))
+        self.client.force_login(self.user)
+        first = self.client.get(reverse("trades:dashboard"), {"market": Market.STOCKS})
+        page = first.context["trades_page"]
+        self.assertEqual(len(page), 10)
+        self.assertContains(first, f"?trade_page={page.next_cursor()}&")
+        self.assertEqual(first.context["trade_filters_query"], "market=stocks")
+        second = self.client.get(reverse("trades:dashboard"), {"trade_page": page.next_cursor()})
+        self.assertEqual(second.context["trades_page"].start_index(), 11)
+        self.assertEqual(len(second.context["trades_page"]), 2)
+
+
+class KeysetPaginatorTest(TestCase):
+    """Paginação por (executed_at, id) com cursores opacos."""
+
+    def setUp(self):
+        self.user = create_user()
+        create_profile(self.user)
+        now = timezone.now()
+        # Pares com o mesmo executed_at: o desempate é pelo id
+        for i in range(23):
+            create_trade(self.user, executed_at=now - timezone.timedelta(hours=i // 2))
+        self.queryset = Trade.objects.filter(user=self.user)
+        self.expected = list(
+            self.queryset.order_by("-executed_at", "-pk").values_list("pk", flat=True)
+        )
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        paginator = KeysetPaginator(self.queryset, 5)
+        page = paginator.get_page(None)
+        seen, starts = [], []
+        while True:
+            seen.extend(t.pk for t in page)
+            starts.append(page.start_index())
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor())
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(starts, [1, 6, 11, 16, 21])
+        self.assertEqual((page.count, page.count_is_approximate), (23, False))
+
+    def test_volta_pela_pagina_anterior(self):
+        paginator = KeysetPaginator(self.queryset, 5)
+        third = paginator.get_page(
+            paginator.get_page(paginator.get_page(None).next_cursor()).next_cursor()
+        )
+        second = paginator.get_page(third.previous_cursor())
+        self.assertEqual([t.pk for t in second], self.expected[5:10])
+        self.assertEqual(second.start_index(), 6)
+        first = paginator.get_page(second.previous_cursor())
+        self.assertFalse(first.has_previous())
+        self.assertEqual([t.pk for t in first], self.expected[:5])
+
+    def test_pagina_profunda_nao_usa_offset(self):
+        paginator = KeysetPaginator(self.queryset, 5)
+        cursor = paginator.get_page(None).next_cursor()
+        with CaptureQueriesContext(connection) as ctx:
+            paginator.get_page(cursor)
+        self.assertFalse(any("OFFSET" in q["sql"] for q in ctx.captured_queries))
+
+    def test_cursor_invalido_ou_numero_de_pagina_volta_para_primeira(self):
+        paginator = KeysetPaginator(self.queryset, 5)
+        for token in ("3", "nao-e-cursor", encode_cursor({"t": "x", "i": 1, "d": "next"})):
+            self.assertEqual([t.pk for t in paginator.get_page(token)], self.expected[:5])
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "estimativa do planejador")
+    def test_total_aproximado_pelo_planejador(self):
+        with patch("trades.pagination.EXACT_COUNT_THRESHOLD", 0):
+            count, approximate = estimated_count(self.queryset)
+        self.assertTrue(approximate)
+        self.assertGreater(count, 0)
+
+
+class TradeFilterSetTest(TestCase):
+    """Filtros declarativos das tabelas de trades."""
+
+    def setUp(self):
+        self.user = create_user()
+        create_profile(self.user)
+        create_trade(self.user, symbol="PETR4")
+        create_trade(self.user, symbol="VALE3", market=Market.FOREX, direction=Direction.SELL)
+
+    def test_valores_invalidos_sao_descartados(self):
+        filters = AdvancedTradeFilterSet({"market": "inexistente", "direction": Direction.SELL})
+        self.assertEqual(filters.selected["market"], "")
+        self.assertEqual(filters.active, {"direction": Direction.SELL})
+        self.assertEqual(list(filters.selected), [*AdvancedTradeFilterSet.choice_fields, "symbol"])
+
+    def test_compoe_um_unico_q(self):
+        filters = AdvancedTradeFilterSet(
+            {"market": Market.FOREX, "direction": Direction.SELL, "symbol": " vale "}
+        )
+        trades = filters.apply(Trade.objects.all())
+        self.assertEqual(list(trades.values_list("symbol", flat=True)), ["VALE3"])
+        self.assertEqual(BasicTradeFilterSet({"direction": Direction.SELL}).active, {})
+
+    def test_cache_key_canonico(self):
+        a = BasicTradeFilterSet({"market": Market.STOCKS, "symbol": "petr"})
+        b = BasicTradeFilterSet({"symbol": "PETR", "market": Market.STOCKS, "setup": "x"})
+        self.assertEqual(a.cache_key, b.cache_key)
+        self.assertNotEqual(a.cache_key, BasicTradeFilterSet({"symbol": "petr"}).cache_key)
+        self.assertEqual(BasicTradeFilterSet({}).cache_key, "all")
+
+    def test_contagem_da_tabela_em_cache_por_filtro(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        url = reverse("trades:dashboard")
+        self.client.get(url, {"market": Market.FOREX})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"market": Market.FOREX})
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+        self.assertEqual(response.context["trades_page"].count, 1)
+        create_trade(self.user, symbol="EURUSD", market=Market.FOREX)
+        response = self.client.get(url, {"market": Market.FOREX})
+        self.assertEqual(response.context["trades_page"].count, 2)
+
 
 # ---------------------------------------------------------------------------
 # LLM Service
@@ -612,3 +1147,124 @@ class GlobalAnalyticsIAViewErrorHandlingTest(TestCase):
         self.assertEqual(response.status_code, 302)
         run = GlobalAIAnalyticsRun.objects.order_by("-requested_at").first()
         self.assertIn("Erro na geração do relatório", run.result)
+
+
+# ---------------------------------------------------------------------------
+# Índices / EXPLAIN
+# ---------------------------------------------------------------------------
+
+
+class TradeIndexesTest(TestCase):
+    """Índices de Trade e comando explain_dashboard_queries."""
+
+    def test_indices_criados_pela_migration(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Trade._meta.db_table)
+        for name in ("trades_user_executed_idx", "trades_mural_idx"):
+            self.assertIn(name, constraints)
+        # Tabelas por dimensão: GROUPING SETS varre a tabela uma vez, sem índice por dimensão
+        self.assertNotIn("trades_setup_cov_idx", constraints)
+        self.assertEqual(
+            constraints["trades_user_executed_idx"]["columns"], ["user_id", "executed_at"]
+        )
+
+    def test_explain_lista_plano_de_cada_query(self):
+        user = create_user()
+        create_profile(user)
+        create_trade(user)
+        TradeStatsSnapshot.objects.filter(user=user).delete()
+        out = StringIO()
+        call_command("explain_dashboard_queries", user=str(user.pk), stdout=out)
+        output = out.getvalue()
+        self.assertIn("== Dashboard pessoal (cálculo direto)", output)
+        self.assertIn("== Mural", output)
+        self.assertIn("== Tabelas globais por dimensão", output)
+        if connection.vendor == "sqlite":
+            # No PostgreSQL, tabelas minúsculas usam seq scan; só o SQLite é determinístico aqui
+            self.assertIn("trades_user_executed_idx", output)
+            self.assertIn("trades_mural_idx", output)
+        # Rebuild do snapshot roda em transação desfeita
+        self.assertFalse(TradeStatsSnapshot.objects.filter(user=user).exists())
+
+
+# ---------------------------------------------------------------------------
+# Cache dos dashboards
+# ---------------------------------------------------------------------------
+
+try:
+    from fakeredis import FakeConnection
+except ImportError:  # fakeredis é dependência de desenvolvimento
+    FakeConnection = None
+
+
+class DashboardCacheTest(TestCase):
+    """Dashboards em cache por versão; signals de Trade/Profile invalidam."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        create_profile(self.user, initial_balance=Decimal("1000"))
+        self.trade = create_trade(self.user, profit_amount=Decimal("100"))
+
+    def test_segunda_leitura_nao_consulta_banco(self):
+        first = dashboard_cache.user_advanced_dashboard(self.user)
+        dashboard_cache.user_dashboard(self.user)
+        with self.assertNumQueries(0):
+            second = dashboard_cache.user_advanced_dashboard(self.user)
+            dashboard_cache.user_dashboard(self.user)
+        self.assertEqual(first, second)
+
+    def test_trade_salvo_invalida_usuario_e_global(self):
+        self.assertEqual(dashboard_cache.user_dashboard(self.user)["summary"]["total_trades"], 1)
+        self.assertEqual(
+            dashboard_cache.global_advanced_dashboard()["dashboard"]["summary"]["total_trades"], 1
+        )
+        create_trade(self.user, profit_amount=Decimal("-20"))
+        self.assertEqual(dashboard_cache.user_dashboard(self.user)["summary"]["total_trades"], 2)
+        self.assertEqual(
+            dashboard_cache.global_advanced_dashboard()["dashboard"]["summary"]["total_trades"], 2
+        )
+
+    def test_exclusao_e_reset_invalidam(self):
+        dashboard_cache.user_dashboard(self.user)
+        self.trade.delete()
+        self.assertEqual(dashboard_cache.user_dashboard(self.user)["summary"]["total_trades"], 0)
+        self.user.profile.reset_balance(Decimal("500"))
+        summary = dashboard_cache.user_dashboard(self.user)["summary"]
+        self.assertEqual(summary["initial_balance"], 500.0)
+
+    def test_outro_usuario_nao_e_invalidado(self):
+        other = create_user(email="outro@example.com")
+        create_profile(other)
+        dashboard_cache.user_dashboard(other)
+        create_trade(self.user)
+        with self.assertNumQueries(0):
+            dashboard_cache.user_dashboard(other)
+
+    def test_paginacao_do_dashboard_usa_cache(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("trades:dashboard"))
+        with patch("trades.cache.snapshot_dashboard") as mock_dashboard:
+            response = self.client.get(reverse("trades:dashboard"), {"balance_page": 2})
+        self.assertEqual(response.status_code, 200)
+        mock_dashboard.assert_not_called()
+
+
+@unittest.skipIf(FakeConnection is None, "fakeredis não instalado")
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://localhost:6379/15",
+            "OPTIONS": {"connection_class": FakeConnection},
+        }
+    }
+)
+class DashboardRedisCacheTest(DashboardCacheTest):
+    """Mesmos cenários com o backend Redis (fakeredis), como em produção."""
+
+    def test_versao_fica_no_redis(self):
+        scope = dashboard_cache.user_scope(self.user)
+        version = dashboard_cache.get_version(scope)
+        create_trade(self.user)
+        self.assertGreater(cache.get(f"trades:dash:version:{scope}"), version)
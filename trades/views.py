@@ -8,7 +8,7 @@ from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
 from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
-from django.db.models.functions import Coalesce, ExtractHour
+from django.db.models.functions import Coalesce
 from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
@@ -20,13 +20,15 @@ from django.views.generic import CreateView, TemplateView, UpdateView
 from accounts.mixins import PlanRequiredMixin, StaffRequiredMixin
 from accounts.models import Plan
 
-from .analytics import (
-    _aggregate_by,
-    compute_advanced_metrics,
-    compute_drawdown_series,
-    compute_global_dashboard,
-    compute_user_dashboard,
+from .cache import (
+    GLOBAL_SCOPE,
+    filtered_trade_count,
+    global_advanced_dashboard,
+    user_advanced_dashboard,
+    user_dashboard,
+    user_scope,
 )
+from .filters import AdvancedTradeFilterSet, BasicTradeFilterSet
 from .forms import TradeForm
 from .llm_service import AnalyticsLLMError
 from .models import (
@@ -45,6 +47,38 @@ from .models import (
     Trend,
     Trigger,
 )
+from .pagination import KeysetPaginator
+from .rollups import hourly_totals, market_totals
+
+
+def _chart_hour_data(user_id=None, since=None) -> list[dict]:
+    """Ganho, perda e lucro por hora do dia (todos os usuários quando user_id é None)."""
+    return [
+        {
+            "label": f"{hour:02d}:00",
+            "gain": float(r["gain"]),
+            "loss": float(r["loss"]),
+            "net": float(r["gain"]) + float(r["loss"]),
+        }
+        for hour, r in hourly_totals(user_id, since)
+    ]
+
+
+def _chart_market_data(user_id=None, since=None) -> list[dict]:
+    """Ganho, perda e lucro por mercado (5 mercados, sempre na ordem de Market.choices)."""
+    totals = market_totals(user_id, since)
+    data = []
+    for market_value, market_label in Market.choices:
+        r = totals.get(market_value, {"gain": Decimal("0"), "loss": Decimal("0")})
+        data.append(
+            {
+                "market_label": market_label,
+                "gain": float(r["gain"]),
+                "loss": abs(float(r["loss"])),
+                "net": float(r["gain"]) + float(r["loss"]),
+            }
+        )
+    return data
 
 
 def _mural_display_name(trade: Trade) -> str:
@@ -200,7 +234,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        dashboard = compute_user_dashboard(self.request.user)
+        dashboard = user_dashboard(self.request.user)
         context["dashboard"] = dashboard
 
         balance_series = dashboard["balance_series"]
@@ -224,30 +258,18 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         if profile and profile.last_reset_at:
             trades_qs = trades_qs.filter(executed_at__gte=profile.last_reset_at)
 
-        selected_filters = {
-            "market": self.request.GET.get("market") or "",
-            "setup": self.request.GET.get("setup") or "",
-            "entry_type": self.request.GET.get("entry_type") or "",
-            "result_type": self.request.GET.get("result_type") or "",
-            "symbol": self.request.GET.get("symbol") or "",
-        }
+        filters = BasicTradeFilterSet(self.request.GET)
+        selected_filters = filters.selected
+        trades_qs = filters.apply(trades_qs)
 
-        if selected_filters["market"]:
-            trades_qs = trades_qs.filter(market=selected_filters["market"])
-        if selected_filters["setup"]:
-            trades_qs = trades_qs.filter(setup=selected_filters["setup"])
-        if selected_filters["entry_type"]:
-            trades_qs = trades_qs.filter(entry_type=selected_filters["entry_type"])
-        if selected_filters["result_type"]:
-            trades_qs = trades_qs.filter(result_type=selected_filters["result_type"])
-        if selected_filters["symbol"]:
-            trades_qs = trades_qs.filter(symbol__icontains=selected_filters["symbol"])
+        count = filtered_trade_count(user_scope(self.request.user), filters, trades_qs)
+        trades_paginator = KeysetPaginator(trades_qs, 10, count=count)
+        context["trades_page"] = trades_paginator.get_page(self.request.GET.get("trade_page"))
 
-        trades_qs = trades_qs.order_by("-executed_at")
-
-        trades_paginator = Paginator(trades_qs, 10)
-        trades_page_number = self.request.GET.get("trade_page")
-        context["trades_page"] = trades_paginator.get_page(trades_page_number)
+        filters_qs = self.request.GET.copy()
+        if "trade_page" in filters_qs:
+            filters_qs.pop("trade_page")
+        context["trade_filters_query"] = filters_qs.urlencode()
 
         context["trade_filters"] = selected_filters
         context["trade_choices"] = {
@@ -314,26 +336,17 @@ class AdvancedDashboardView(PlanRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        base = compute_user_dashboard(self.request.user)
+        # Métricas em cache (invalidadas pelos signals); paginação não recalcula nada
+        cached = user_advanced_dashboard(self.request.user)
+        base = cached["dashboard"]
         context["dashboard"] = base
 
-        trades_qs = Trade.objects.filter(user=self.request.user).order_by("executed_at")
-        profile = getattr(self.request.user, "profile", None)
-        if profile and profile.last_reset_at:
-            trades_qs = trades_qs.filter(executed_at__gte=profile.last_reset_at)
-
         balance_series = base.get("balance_series", [])
-        initial_balance = base["summary"]["initial_balance"]
-        advanced = compute_advanced_metrics(
-            trades_qs, balance_series, initial_balance, base["summary"]
-        )
-        dd_series, _, _ = compute_drawdown_series(balance_series, initial_balance)
-
-        context["advanced"] = advanced
+        context["advanced"] = cached["advanced"]
         context["advanced_chart"] = {
             "labels": [point["date"] for point in balance_series],
             "balance": [point["balance"] for point in balance_series],
-            "drawdown": dd_series,
+            "drawdown": cached["drawdown"],
         }
 
         # Reaproveita tabelas por mercado/setup/entrada (já com Result/ Técnico)
@@ -341,63 +354,22 @@ class AdvancedDashboardView(PlanRequiredMixin, TemplateView):
         context["by_setup"] = base.get("by_setup", [])
         context["by_entry_type"] = base.get("by_entry_type", [])
 
-        # Tabelas por HTF, tendência, painel SMC, região HTF e gatilho
-        context["by_htf"] = _aggregate_by(trades_qs, "high_time_frame", dict(HighTimeFrame.choices))
-        context["by_trend"] = _aggregate_by(trades_qs, "trend", dict(Trend.choices))
-        context["by_smc_panel"] = _aggregate_by(trades_qs, "smc_panel", dict(SMCPanel.choices))
-        context["by_region_htf"] = _aggregate_by(trades_qs, "region_htf", dict(RegionHTF.choices))
-        context["by_trigger"] = _aggregate_by(trades_qs, "trigger", dict(Trigger.choices))
+        # Tabelas por HTF, tendência, painel SMC, região HTF e gatilho (do snapshot)
+        context.update(cached["breakdowns"])
 
         # Lista de trades com filtros avançados
+        profile = getattr(self.request.user, "profile", None)
         table_qs = Trade.objects.filter(user=self.request.user)
         if profile and profile.last_reset_at:
             table_qs = table_qs.filter(executed_at__gte=profile.last_reset_at)
 
-        selected_filters = {
-            "market": self.request.GET.get("market") or "",
-            "setup": self.request.GET.get("setup") or "",
-            "entry_type": self.request.GET.get("entry_type") or "",
-            "result_type": self.request.GET.get("result_type") or "",
-            "direction": self.request.GET.get("direction") or "",
-            "high_time_frame": self.request.GET.get("high_time_frame") or "",
-            "region_htf": self.request.GET.get("region_htf") or "",
-            "trend": self.request.GET.get("trend") or "",
-            "smc_panel": self.request.GET.get("smc_panel") or "",
-            "trigger": self.request.GET.get("trigger") or "",
-            "partial_trade": self.request.GET.get("partial_trade") or "",
-            "symbol": self.request.GET.get("symbol") or "",
-        }
+        filters = AdvancedTradeFilterSet(self.request.GET)
+        selected_filters = filters.selected
+        table_qs = filters.apply(table_qs)
 
-        if selected_filters["market"]:
-            table_qs = table_qs.filter(market=selected_filters["market"])
-        if selected_filters["setup"]:
-            table_qs = table_qs.filter(setup=selected_filters["setup"])
-        if selected_filters["entry_type"]:
-            table_qs = table_qs.filter(entry_type=selected_filters["entry_type"])
-        if selected_filters["result_type"]:
-            table_qs = table_qs.filter(result_type=selected_filters["result_type"])
-        if selected_filters["direction"]:
-            table_qs = table_qs.filter(direction=selected_filters["direction"])
-        if selected_filters["high_time_frame"]:
-            table_qs = table_qs.filter(high_time_frame=selected_filters["high_time_frame"])
-        if selected_filters["region_htf"]:
-            table_qs = table_qs.filter(region_htf=selected_filters["region_htf"])
-        if selected_filters["trend"]:
-            table_qs = table_qs.filter(trend=selected_filters["trend"])
-        if selected_filters["smc_panel"]:
-            table_qs = table_qs.filter(smc_panel=selected_filters["smc_panel"])
-        if selected_filters["trigger"]:
-            table_qs = table_qs.filter(trigger=selected_filters["trigger"])
-        if selected_filters["partial_trade"]:
-            table_qs = table_qs.filter(partial_trade=selected_filters["partial_trade"])
-        if selected_filters["symbol"]:
-            table_qs = table_qs.filter(symbol__icontains=selected_filters["symbol"])
-
-        table_qs = table_qs.order_by("-executed_at")
-
-        trades_paginator = Paginator(table_qs, 12)
-        trades_page_number = self.request.GET.get("trade_page")
-        trades_page = trades_paginator.get_page(trades_page_number)
+        count = filtered_trade_count(user_scope(self.request.user), filters, table_qs)
+        trades_paginator = KeysetPaginator(table_qs, 12, count=count)
+        trades_page = trades_paginator.get_page(self.request.GET.get("trade_page"))
 
         filters_qs = self.request.GET.copy()
         if "trade_page" in filters_qs:
@@ -444,7 +416,8 @@ class AnalyticsIAView(PlanRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
-        base = compute_user_dashboard(user)
+        cached = user_advanced_dashboard(user)
+        base = cached["dashboard"]
         context["dashboard"] = base
 
         trades_qs = Trade.objects.filter(user=user).order_by("executed_at")
@@ -452,11 +425,7 @@ class AnalyticsIAView(PlanRequiredMixin, TemplateView):
         if profile and profile.last_reset_at:
             trades_qs = trades_qs.filter(executed_at__gte=profile.last_reset_at)
 
-        balance_series = base.get("balance_series", [])
-        initial_balance = base["summary"]["initial_balance"]
-        context["advanced"] = compute_advanced_metrics(
-            trades_qs, balance_series, initial_balance, base["summary"]
-        )
+        context["advanced"] = cached["advanced"]
         context["by_market"] = base.get("by_market", [])
         context["by_setup"] = base.get("by_setup", [])
         context["by_entry_type"] = base.get("by_entry_type", [])
@@ -537,10 +506,7 @@ class AnalyticsIAView(PlanRequiredMixin, TemplateView):
         context["improvement_pct"] = improvement_pct
 
         # % resultado/ganho técnico (global) para as regras fixas da análise
-        agg_tech = trades_qs.aggregate(
-            total_technical=Coalesce(Sum("technical_gain"), Decimal("0")),
-        )
-        total_technical = agg_tech["total_technical"]
+        total_technical = cached["total_technical"]
         if total_technical and float(total_technical) != 0:
             context["result_vs_technical_pct"] = round(
                 float(total_profit) / float(total_technical) * 100, 2
@@ -548,25 +514,10 @@ class AnalyticsIAView(PlanRequiredMixin, TemplateView):
         else:
             context["result_vs_technical_pct"] = None
 
-        # Gráfico por horário (ganho, perda, lucro por hora)
-        hourly = (
-            trades_qs.annotate(hour=ExtractHour("executed_at"))
-            .values("hour")
-            .annotate(
-                gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), Decimal("0")),
-                loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), Decimal("0")),
-            )
-            .order_by("hour")
-        )
-        context["chart_hour_data"] = [
-            {
-                "label": f"{r['hour']:02d}:00",
-                "gain": float(r["gain"]),
-                "loss": float(r["loss"]),
-                "net": float(r["gain"]) + float(r["loss"]),
-            }
-            for r in hourly
-        ]
+        # Gráficos por horário e por mercado: lidos do agregado diário (TradeDailyRollup)
+        since = profile.last_reset_at if profile else None
+        context["chart_hour_data"] = _chart_hour_data(user.pk, since)
+        context["chart_market_data"] = _chart_market_data(user.pk, since)
 
         # Gráfico por símbolo (até 20 ativos por quantidade de trades)
         symbol_top = (
@@ -588,24 +539,6 @@ class AnalyticsIAView(PlanRequiredMixin, TemplateView):
             for r in symbol_top
         ]
 
-        # Gráfico pizza por mercado (5 mercados: ganho, perda, lucro)
-        context["chart_market_data"] = []
-        for market_value, market_label in Market.choices:
-            qs_m = trades_qs.filter(market=market_value)
-            agg = qs_m.aggregate(
-                gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), Decimal("0")),
-                loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), Decimal("0")),
-            )
-            total_m = float(agg["gain"]) + float(agg["loss"])
-            context["chart_market_data"].append(
-                {
-                    "market_label": market_label,
-                    "gain": float(agg["gain"]),
-                    "loss": abs(float(agg["loss"])),
-                    "net": total_m,
-                }
-            )
-
         can_request, next_available, last_run, has_new_trades, seven_days_passed = (
             _can_request_ai_analysis(user)
         )
@@ -685,77 +618,31 @@ class GlobalDashboardView(StaffRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        trades_qs = Trade.objects.all().order_by("executed_at")
-        base = compute_global_dashboard(trades_qs)
+        cached = global_advanced_dashboard()
+        base = cached["dashboard"]
         context["dashboard"] = base
 
         balance_series = base.get("balance_series", [])
-        initial_balance = Decimal("0")
-        advanced = compute_advanced_metrics(
-            trades_qs, balance_series, initial_balance, base["summary"]
-        )
-        dd_series, _, _ = compute_drawdown_series(balance_series, initial_balance)
-
-        context["advanced"] = advanced
+        context["advanced"] = cached["advanced"]
         context["advanced_chart"] = {
             "labels": [point["date"] for point in balance_series],
             "balance": [point["balance"] for point in balance_series],
-            "drawdown": dd_series,
+            "drawdown": cached["drawdown"],
         }
 
         context["by_market"] = base.get("by_market", [])
         context["by_setup"] = base.get("by_setup", [])
         context["by_entry_type"] = base.get("by_entry_type", [])
-        context["by_htf"] = _aggregate_by(trades_qs, "high_time_frame", dict(HighTimeFrame.choices))
-        context["by_trend"] = _aggregate_by(trades_qs, "trend", dict(Trend.choices))
-        context["by_smc_panel"] = _aggregate_by(trades_qs, "smc_panel", dict(SMCPanel.choices))
-        context["by_region_htf"] = _aggregate_by(trades_qs, "region_htf", dict(RegionHTF.choices))
-        context["by_trigger"] = _aggregate_by(trades_qs, "trigger", dict(Trigger.choices))
+        context.update(cached["breakdowns"])
 
         table_qs = Trade.objects.all()
-        selected_filters = {
-            "market": self.request.GET.get("market") or "",
-            "setup": self.request.GET.get("setup") or "",
-            "entry_type": self.request.GET.get("entry_type") or "",
-            "result_type": self.request.GET.get("result_type") or "",
-            "direction": self.request.GET.get("direction") or "",
-            "high_time_frame": self.request.GET.get("high_time_frame") or "",
-            "region_htf": self.request.GET.get("region_htf") or "",
-            "trend": self.request.GET.get("trend") or "",
-            "smc_panel": self.request.GET.get("smc_panel") or "",
-            "trigger": self.request.GET.get("trigger") or "",
-            "partial_trade": self.request.GET.get("partial_trade") or "",
-            "symbol": self.request.GET.get("symbol") or "",
-        }
-        if selected_filters["market"]:
-            table_qs = table_qs.filter(market=selected_filters["market"])
-        if selected_filters["setup"]:
-            table_qs = table_qs.filter(setup=selected_filters["setup"])
-        if selected_filters["entry_type"]:
-            table_qs = table_qs.filter(entry_type=selected_filters["entry_type"])
-        if selected_filters["result_type"]:
-            table_qs = table_qs.filter(result_type=selected_filters["result_type"])
-        if selected_filters["direction"]:
-            table_qs = table_qs.filter(direction=selected_filters["direction"])
-        if selected_filters["high_time_frame"]:
-            table_qs = table_qs.filter(high_time_frame=selected_filters["high_time_frame"])
-        if selected_filters["region_htf"]:
-            table_qs = table_qs.filter(region_htf=selected_filters["region_htf"])
-        if selected_filters["trend"]:
-            table_qs = table_qs.filter(trend=selected_filters["trend"])
-        if selected_filters["smc_panel"]:
-            table_qs = table_qs.filter(smc_panel=selected_filters["smc_panel"])
-        if selected_filters["trigger"]:
-            table_qs = table_qs.filter(trigger=selected_filters["trigger"])
-        if selected_filters["partial_trade"]:
-            table_qs = table_qs.filter(partial_trade=selected_filters["partial_trade"])
-        if selected_filters["symbol"]:
-            table_qs = table_qs.filter(symbol__icontains=selected_filters["symbol"])
-
-        table_qs = table_qs.order_by("-executed_at")
-        trades_paginator = Paginator(table_qs, 12)
-        trades_page_number = self.request.GET.get("trade_page")
-        trades_page = trades_paginator.get_page(trades_page_number)
+        filters = AdvancedTradeFilterSet(self.request.GET)
+        selected_filters = filters.selected
+        table_qs = filters.apply(table_qs)
+
+        count = filtered_trade_count(GLOBAL_SCOPE, filters, table_qs)
+        trades_paginator = KeysetPaginator(table_qs, 12, count=count)
+        trades_page = trades_paginator.get_page(self.request.GET.get("trade_page"))
 
         filters_qs = self.request.GET.copy()
         if "trade_page" in filters_qs:
@@ -812,14 +699,10 @@ class GlobalAnalyticsIAView(StaffRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         trades_qs = Trade.objects.all().order_by("executed_at")
-        base = compute_global_dashboard(trades_qs)
+        cached = global_advanced_dashboard()
+        base = cached["dashboard"]
         context["dashboard"] = base
-
-        balance_series = base.get("balance_series", [])
-        initial_balance = Decimal("0")
-        context["advanced"] = compute_advanced_metrics(
-            trades_qs, balance_series, initial_balance, base["summary"]
-        )
+        context["advanced"] = cached["advanced"]
         context["by_market"] = base.get("by_market", [])
         context["by_setup"] = base.get("by_setup", [])
         context["by_entry_type"] = base.get("by_entry_type", [])
@@ -896,24 +779,8 @@ class GlobalAnalyticsIAView(StaffRequiredMixin, TemplateView):
         page_num = self.request.GET.get("analytics_page", 1)
         context["analytics_trades_page"] = paginator_table.get_page(page_num)
 
-        hourly = (
-            trades_qs.annotate(hour=ExtractHour("executed_at"))
-            .values("hour")
-            .annotate(
-                gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), Decimal("0")),
-                loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), Decimal("0")),
-            )
-            .order_by("hour")
-        )
-        context["chart_hour_data"] = [
-            {
-                "label": f"{r['hour']:02d}:00",
-                "gain": float(r["gain"]),
-                "loss": float(r["loss"]),
-                "net": float(r["gain"]) + float(r["loss"]),
-            }
-            for r in hourly
-        ]
+        context["chart_hour_data"] = _chart_hour_data()
+        context["chart_market_data"] = _chart_market_data()
 
         symbol_top = (
             trades_qs.values("symbol")
@@ -934,23 +801,6 @@ class GlobalAnalyticsIAView(StaffRequiredMixin, TemplateView):
             for r in symbol_top
         ]
 
-        context["chart_market_data"] = []
-        for market_value, market_label in Market.choices:
-            qs_m = trades_qs.filter(market=market_value)
-            agg = qs_m.aggregate(
-                gain=Coalesce(Sum("profit_amount", filter=Q(profit_amount__gt=0)), Decimal("0")),
-                loss=Coalesce(Sum("profit_amount", filter=Q(profit_amount__lt=0)), Decimal("0")),
-            )
-            total_m = float(agg["gain"]) + float(agg["loss"])
-            context["chart_market_data"].append(
-                {
-                    "market_label": market_label,
-                    "gain": float(agg["gain"]),
-                    "loss": abs(float(agg["loss"])),
-                    "net": total_m,
-                }
-            )
-
         can_request, next_available, last_run, has_new_trades, seven_days_passed = (
             _can_request_global_ai_analysis(self.request.user)
         )